@@ -35,6 +35,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # ASGI runserver, so `manage.py runserver` also serves the chat WebSockets
     'corsheaders',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -83,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'CIMAS.wsgi.application'
+ASGI_APPLICATION = 'CIMAS.asgi.application'
 
 
 # Database
@@ -102,6 +104,63 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) for multi-node setups.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'cimas-default'),
+    }
+}
+
+# Analytics dashboards are cached per role/user and invalidated on writes (analytics/cache.py)
+ANALYTICS_CACHE_ALIAS = 'default'
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 300))
+
+
+# Channels (chat WebSockets)
+# https://channels.readthedocs.io/en/stable/topics/channel_layers.html
+# The in-memory layer only reaches sockets served by the same process; set
+# CHANNEL_LAYER_BACKEND (e.g. channels_redis.core.RedisChannelLayer) and
+# CHANNEL_LAYER_HOSTS (comma separated) when running more than one node.
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': os.getenv('CHANNEL_LAYER_BACKEND', 'channels.layers.InMemoryChannelLayer'),
+    }
+}
+if os.getenv('CHANNEL_LAYER_HOSTS'):
+    CHANNEL_LAYERS['default']['CONFIG'] = {'hosts': os.getenv('CHANNEL_LAYER_HOSTS').split(',')}
+
+# Seconds a user's allowed chat contacts stay cached (chat/permissions.py)
+CHAT_CONTACTS_CACHE_TTL = int(os.getenv('CHAT_CONTACTS_CACHE_TTL', 60))
+
+
+# Resumable evidence uploads (evidence/uploads.py)
+# Chunks are appended to a local staging file and the finished file is
+# streamed to the evidence storage once, when the last chunk arrives.
+
+EVIDENCE_UPLOAD_DIR = os.getenv('EVIDENCE_UPLOAD_DIR', str(BASE_DIR / 'upload_staging'))
+EVIDENCE_UPLOAD_CHUNK_SIZE = int(os.getenv('EVIDENCE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+EVIDENCE_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('EVIDENCE_UPLOAD_MAX_CHUNK_SIZE', 32 * 1024 * 1024))
+EVIDENCE_UPLOAD_MAX_SIZE = int(os.getenv('EVIDENCE_UPLOAD_MAX_SIZE', 50 * 1024 ** 3))
+EVIDENCE_UPLOAD_TTL_HOURS = int(os.getenv('EVIDENCE_UPLOAD_TTL_HOURS', 24))  # unfinished uploads are purged after this
+
+# Evidence downloads (evidence/downloads.py): "django" streams the file from
+# the worker; "nginx" (X-Accel-Redirect to an internal location aliased to
+# MEDIA_ROOT) or "sendfile" (X-Sendfile) hand the transfer to the web server.
+EVIDENCE_DOWNLOAD_BACKEND = os.getenv('EVIDENCE_DOWNLOAD_BACKEND', 'django')
+EVIDENCE_ACCEL_REDIRECT_PREFIX = os.getenv('EVIDENCE_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Background evidence work such as previews (evidence/tasks.py, evidence/previews.py)
+EVIDENCE_TASK_QUEUE = os.getenv('EVIDENCE_TASK_QUEUE', 'evidence.tasks.ThreadQueue')
+EVIDENCE_PREVIEW_SIZE = int(os.getenv('EVIDENCE_PREVIEW_SIZE', 320))  # longest edge, pixels
+EVIDENCE_PREVIEW_MAX_PIXELS = int(os.getenv('EVIDENCE_PREVIEW_MAX_PIXELS', 50_000_000))  # larger images get no preview
+EVIDENCE_PREVIEW_MAX_PDF_BYTES = int(os.getenv('EVIDENCE_PREVIEW_MAX_PDF_BYTES', 50 * 1024 * 1024))  # PDFs without a local path
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,66 @@
+"""
+Opt-in streaming for large JSON listings.
+
+Views pass an iterator of dicts (usually built on ``QuerySet.iterator``) and
+get back a ``StreamingHttpResponse``, so only one chunk of rows is held in
+memory at a time instead of the whole table.
+
+    ?stream=1       -> a single JSON array (same shape as the non-streamed list)
+    ?stream=ndjson  -> one JSON object per line
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+STREAM_CHUNK_SIZE = 2000  # rows fetched per database round trip
+WRITE_BUFFER_SIZE = 64 * 1024  # bytes buffered before handing a chunk to the server
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+
+def stream_format(request):
+    """Return "json", "ndjson" or None when the caller did not ask for streaming."""
+    value = (request.GET.get('stream') or '').lower()
+    if value == 'ndjson':
+        return 'ndjson'
+    if value in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= WRITE_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _json_array(rows):
+    yield '['
+    first = True
+    for row in rows:
+        if not first:
+            yield ','
+        first = False
+        yield _encoder.encode(row)
+    yield ']'
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield _encoder.encode(row)
+        yield '\n'
+
+
+def streaming_json_response(rows, fmt='json'):
+    if fmt == 'ndjson':
+        return StreamingHttpResponse(_buffered(_ndjson(rows)), content_type='application/x-ndjson')
+    return StreamingHttpResponse(_buffered(_json_array(rows)), content_type='application/json')
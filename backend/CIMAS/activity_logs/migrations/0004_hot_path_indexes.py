@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_logs', '0003_alter_activitylog_log_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['target_table', 'target_id'], name='activity_log_target_idx'),
+        ),
+    ]
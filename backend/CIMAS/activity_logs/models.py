@@ -11,3 +11,6 @@ class ActivityLog(models.Model):
 
     class Meta:
         db_table = 'activity_log'
+        indexes = [
+            models.Index(fields=['target_table', 'target_id'], name='activity_log_target_idx'),
+        ]
@@ -1,3 +1,41 @@
+import json
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from .models import ActivityLog
+
+
+class StreamedLogsTests(TestCase):
+    """GET /api/logs?stream=... streams the same rows as the buffered response."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        for i in range(3):
+            ActivityLog.objects.create(
+                user=self.admin, action="login", timestamp=timezone.now(), target_table="users", target_id=i
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_json_array_stream(self):
+        response = self.client.get("/api/logs", {"stream": "1"})
+        self.assertTrue(response.streaming)
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(sorted(row["target_id"] for row in rows), [0, 1, 2])
+        self.assertEqual(rows[0]["user"], "admin@example.com")
+
+    def test_ndjson_stream(self):
+        response = self.client.get("/api/logs", {"stream": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(sorted(json.loads(line)["target_id"] for line in lines), [0, 1, 2])
 
-# Create your tests here.
+    def test_buffered_response_unchanged(self):
+        response = self.client.get("/api/logs")
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.json()), 3)
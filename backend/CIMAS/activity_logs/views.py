@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from .models import ActivityLog
+from CIMAS.streaming import STREAM_CHUNK_SIZE, stream_format, streaming_json_response
 
 def get_user_role(user):
     if getattr(user, "is_superuser", False):
@@ -21,7 +22,8 @@ def get_logs(request):
     else:
         logs = ActivityLog.objects.filter(user=request.user)
 
-    data = [
+    logs = logs.select_related("user")
+    rows = (
         {
             "id": log.id,
             "user": log.user.email if hasattr(log.user, "email") else log.user.username,
@@ -30,9 +32,13 @@ def get_logs(request):
             "target_table": log.target_table,
             "target_id": log.target_id,
         }
-        for log in logs
-    ]
-    return Response(data)
+        for log in logs.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+
+    fmt = stream_format(request)
+    if fmt:
+        return streaming_json_response(rows, fmt)
+    return Response(list(rows))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -0,0 +1,86 @@
+"""
+Caching for analytics payloads.
+
+Entries live in the cache named by settings.ANALYTICS_CACHE_ALIAS (the
+"default" cache unless configured otherwise) and are keyed by view, scope
+(role or role:user_id) and a generation number. Any write to incidents,
+assignments or evidence bumps the generation (see analytics.signals), which
+invalidates every cached dashboard at once without having to enumerate keys.
+Hit and miss counters are kept in the same cache so that they add up across
+worker processes when a shared backend is used.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = 'analytics:generation'
+HITS_KEY = 'analytics:hits'
+MISSES_KEY = 'analytics:misses'
+
+
+def _cache():
+    return caches[getattr(settings, 'ANALYTICS_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'ANALYTICS_CACHE_TTL', 300)
+
+
+def _incr(key):
+    cache = _cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (first use or evicted): add() keeps a concurrent writer's value
+        if not cache.add(key, 1, None):
+            return cache.incr(key)
+        return 1
+
+
+def generation():
+    cache = _cache()
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, 1, None)
+        value = cache.get(GENERATION_KEY, 1)
+    return value
+
+
+def invalidate():
+    """Drop every cached analytics payload."""
+    _incr(GENERATION_KEY)
+
+
+def get_or_compute(view, scope, compute):
+    """
+    Return the cached payload for (view, scope), computing and storing it on a
+    miss. Payloads that compute to None (e.g. permission failures) are not stored.
+    """
+    cache = _cache()
+    key = f'analytics:{view}:{scope}:g{generation()}'
+    data = cache.get(key)
+    if data is not None:
+        _incr(HITS_KEY)
+        return data
+
+    _incr(MISSES_KEY)
+    data = compute()
+    if data is not None:
+        cache.set(key, data, _timeout())
+    return data
+
+
+def stats():
+    cache = _cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": (hits / total * 100) if total else 0,
+        "generation": generation(),
+    }
+
+
+def reset_stats():
+    _cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('awareness', '0006_remove_awarenessresource_flair_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentRollupMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('incident_id', models.BigIntegerField(unique=True)),
+                ('reported_day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('crime_type_id', models.IntegerField(blank=True, null=True)),
+                ('city', models.CharField(blank=True, max_length=100, null=True)),
+                ('resolved_day', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'analytics_incident_rollup_membership',
+            },
+        ),
+        migrations.CreateModel(
+            name='IncidentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reported', 'Reported'), ('resolved', 'Resolved')], max_length=10)),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('city', models.CharField(blank=True, max_length=100, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('crime_type', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='awareness.crimetypes')),
+            ],
+            options={
+                'db_table': 'analytics_incident_daily_rollup',
+                'indexes': [models.Index(fields=['kind', 'day'], name='rollup_kind_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    """Fold rows created twice for one bucket into the oldest row, then drop empty buckets."""
+    Rollup = apps.get_model('analytics', 'IncidentDailyRollup')
+    key = ['kind', 'day', 'status', 'crime_type_id', 'city']
+    duplicates = (
+        Rollup.objects.values(*key)
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1)
+    )
+    for bucket in duplicates:
+        # filter(city=None) matches NULL, so NULL keys group as one bucket here too
+        rows = Rollup.objects.filter(**{field: bucket[field] for field in key})
+        rows.exclude(id=bucket['keep']).delete()
+        Rollup.objects.filter(id=bucket['keep']).update(count=bucket['total'])
+    Rollup.objects.filter(count__lte=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_rollup_updated_at_index'),
+        ('awareness', '0006_remove_awarenessresource_flair_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='incidentdailyrollup',
+            constraint=models.UniqueConstraint(fields=('kind', 'day', 'status', 'crime_type', 'city'), name='unique_rollup_bucket', nulls_distinct=False),
+        ),
+    ]
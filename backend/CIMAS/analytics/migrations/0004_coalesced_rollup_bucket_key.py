@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:36
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    """
+    Store an empty city as NULL, then fold rows created twice for one bucket
+    into the oldest row: where 0003's NULLS NOT DISTINCT constraint was
+    skipped (PostgreSQL before 15) NULL-keyed buckets could still duplicate.
+    """
+    Rollup = apps.get_model('analytics', 'IncidentDailyRollup')
+    Membership = apps.get_model('analytics', 'IncidentRollupMembership')
+    Rollup.objects.filter(city='').update(city=None)
+    Membership.objects.filter(city='').update(city=None)
+
+    key = ['kind', 'day', 'status', 'crime_type_id', 'city']
+    duplicates = (
+        Rollup.objects.values(*key)
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1)
+    )
+    for bucket in duplicates:
+        rows = Rollup.objects.filter(**{field: bucket[field] for field in key})
+        rows.exclude(id=bucket['keep']).delete()
+        Rollup.objects.filter(id=bucket['keep']).update(count=bucket['total'])
+    Rollup.objects.filter(count__lte=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_unique_rollup_bucket'),
+        ('awareness', '0006_remove_awarenessresource_flair_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='incidentdailyrollup',
+            name='unique_rollup_bucket',
+        ),
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='incidentdailyrollup',
+            constraint=models.UniqueConstraint(models.F('kind'), models.F('day'), models.F('status'), django.db.models.functions.comparison.Coalesce('crime_type', models.Value(0)), django.db.models.functions.comparison.Coalesce('city', models.Value('')), name='unique_rollup_bucket_key'),
+        ),
+    ]
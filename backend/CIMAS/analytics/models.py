@@ -1,3 +1,68 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 
-# Create your models here.
+
+class IncidentDailyRollup(models.Model):
+    """
+    Incident counts per day x status x crime type x city, maintained
+    incrementally by analytics.rollups and rebuilt with `rebuild_rollups`.
+
+    "reported" rows are keyed by the day the incident was reported and its
+    current status; "resolved" rows by the day its assignment was resolved.
+    Weekly and monthly series are summed from these rows.
+    """
+    KIND_CHOICES = [
+        ("reported", "Reported"),
+        ("resolved", "Resolved"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    # No FK constraint: buckets keep their key if a crime type is removed
+    crime_type = models.ForeignKey(
+        'awareness.CrimeTypes',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    city = models.CharField(max_length=100, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # drives chart ETag/Last-Modified
+
+    class Meta:
+        db_table = 'analytics_incident_daily_rollup'
+        indexes = [
+            models.Index(fields=['kind', 'day'], name='rollup_kind_day_idx'),
+        ]
+        constraints = [
+            # One row per bucket. NULL keys are coalesced to sentinels (crime type
+            # ids start at 1, an empty city is stored as NULL) so they collide on
+            # every database, not only where NULLS NOT DISTINCT exists.
+            models.UniqueConstraint(
+                F('kind'), F('day'), F('status'), Coalesce('crime_type', Value(0)), Coalesce('city', Value('')),
+                name='unique_rollup_bucket_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.day} {self.status}: {self.count}"
+
+
+class IncidentRollupMembership(models.Model):
+    """
+    The rollup buckets an incident is currently counted in, so a write can
+    move it between buckets without knowing its previous state.
+    """
+    incident_id = models.BigIntegerField(unique=True)  # no FK: outlives the incident until its counts are removed
+    reported_day = models.DateField()
+    status = models.CharField(max_length=20)
+    crime_type_id = models.IntegerField(null=True, blank=True)
+    city = models.CharField(max_length=100, null=True, blank=True)
+    resolved_day = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_incident_rollup_membership'
@@ -0,0 +1,118 @@
+"""
+Resolution-time distribution (resolved_at - assigned_at) for resolved cases.
+
+On PostgreSQL the whole distribution -- overall, per priority and per crime
+type, each with count/mean/p50/p90/p99 -- comes back from a single
+GROUPING SETS query using percentile_cont. Other databases (e.g. SQLite in
+local development) fall back to computing the same figures in Python.
+"""
+from django.db import connection
+from django.db.models import DurationField, ExpressionWrapper, F
+
+from incidents.models import IncidentAssignments
+
+PERCENTILES = (0.5, 0.9, 0.99)
+UNKNOWN_CRIME_TYPE = "Unknown"
+
+
+def resolved_durations(**filters):
+    """Resolved assignments with priority, crime type name and resolution duration."""
+    return (
+        IncidentAssignments.objects
+        .filter(
+            incident__status='resolved',
+            assigned_at__isnull=False,
+            resolved_at__isnull=False,
+            resolved_at__gte=F('assigned_at'),
+            **filters
+        )
+        .annotate(
+            duration=ExpressionWrapper(F('resolved_at') - F('assigned_at'), output_field=DurationField()),
+            crime=F('incident__crime_type__crime_type_name'),
+        )
+        .values('priority', 'crime', 'duration')
+    )
+
+
+def _summary(count, mean_seconds, percentiles_seconds):
+    hours = lambda seconds: round(seconds / 3600, 2) if seconds is not None else None
+    return {
+        "count": count,
+        "mean_hours": hours(mean_seconds),
+        "p50_hours": hours(percentiles_seconds[0]),
+        "p90_hours": hours(percentiles_seconds[1]),
+        "p99_hours": hours(percentiles_seconds[2]),
+    }
+
+
+def _empty():
+    return {"overall": _summary(0, None, [None] * len(PERCENTILES)), "by_priority": {}, "by_crime_type": {}}
+
+
+def _postgres_distribution(queryset):
+    inner_sql, params = queryset.query.sql_with_params()
+    sql = f"""
+        SELECT GROUPING(d.priority), GROUPING(d.crime), d.priority, d.crime,
+               COUNT(*), AVG(d.seconds),
+               percentile_cont(ARRAY[{', '.join(str(p) for p in PERCENTILES)}])
+                   WITHIN GROUP (ORDER BY d.seconds)
+        FROM (
+            SELECT r.priority, r.crime, EXTRACT(EPOCH FROM r.duration) AS seconds
+            FROM ({inner_sql}) r
+        ) d
+        GROUP BY GROUPING SETS ((), (d.priority), (d.crime))
+    """
+    result = _empty()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for grouped_priority, grouped_crime, priority, crime, count, mean, percentiles in cursor.fetchall():
+            summary = _summary(count, float(mean) if mean is not None else None, percentiles or [None] * len(PERCENTILES))
+            if grouped_priority and grouped_crime:
+                result["overall"] = summary
+            elif not grouped_priority:
+                result["by_priority"][priority] = summary
+            else:
+                result["by_crime_type"][crime or UNKNOWN_CRIME_TYPE] = summary
+    return result
+
+
+def _percentile(ordered, fraction):
+    # Linear interpolation, matching PostgreSQL's percentile_cont
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _python_distribution(queryset):
+    groups = {"overall": {None: []}, "by_priority": {}, "by_crime_type": {}}
+    for row in queryset.iterator():
+        seconds = row['duration'].total_seconds()
+        groups["overall"][None].append(seconds)
+        groups["by_priority"].setdefault(row['priority'], []).append(seconds)
+        groups["by_crime_type"].setdefault(row['crime'] or UNKNOWN_CRIME_TYPE, []).append(seconds)
+
+    def summarize(values):
+        values.sort()
+        mean = sum(values) / len(values) if values else None
+        return _summary(len(values), mean, [_percentile(values, p) for p in PERCENTILES])
+
+    result = _empty()
+    result["overall"] = summarize(groups["overall"][None])
+    result["by_priority"] = {key: summarize(values) for key, values in groups["by_priority"].items()}
+    result["by_crime_type"] = {key: summarize(values) for key, values in groups["by_crime_type"].items()}
+    return result
+
+
+def resolution_time_distribution(**filters):
+    """
+    {"overall": {...}, "by_priority": {priority: {...}}, "by_crime_type": {name: {...}}}
+    where each summary holds count, mean_hours, p50_hours, p90_hours and p99_hours.
+    ``filters`` narrow the resolved assignments, e.g. resolved_at__month=3.
+    """
+    queryset = resolved_durations(**filters)
+    if connection.vendor == 'postgresql':
+        return _postgres_distribution(queryset)
+    return _python_distribution(queryset)
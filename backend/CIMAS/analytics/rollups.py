@@ -0,0 +1,156 @@
+"""
+Incremental maintenance of IncidentDailyRollup.
+
+Each incident contributes one "reported" bucket and, once resolved with a
+resolution date, one "resolved" bucket. sync_incident() compares the buckets
+stored in IncidentRollupMembership with the incident's current state and
+applies +1/-1 deltas, so it is idempotent and safe to call from any signal.
+An incident is only counted by the sync that creates its membership row, so
+two concurrent first syncs cannot both add it. Buckets whose count drops to
+zero are deleted.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from incidents.models import Incidents
+from .models import IncidentDailyRollup, IncidentRollupMembership
+
+
+def _day(moment):
+    return timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+
+
+def incident_buckets(incident, assignment):
+    """Rollup keys (kind, day, status, crime_type_id, city) an incident counts towards."""
+    city = (incident.location.city or None) if incident.location else None  # '' is no city, as in the constraint
+    buckets = [("reported", _day(incident.reported_at), incident.status, incident.crime_type_id, city)]
+    if incident.status == "resolved" and assignment and assignment.resolved_at:
+        buckets.append(("resolved", _day(assignment.resolved_at), incident.status, incident.crime_type_id, city))
+    return buckets
+
+
+def membership_buckets(membership):
+    if membership is None:
+        return []
+    buckets = [("reported", membership.reported_day, membership.status, membership.crime_type_id, membership.city)]
+    if membership.resolved_day:
+        buckets.append(("resolved", membership.resolved_day, membership.status, membership.crime_type_id, membership.city))
+    return buckets
+
+
+def _bump(bucket, delta):
+    kind, day, status, crime_type_id, city = bucket
+    key = {"kind": kind, "day": day, "status": status, "crime_type_id": crime_type_id, "city": city}
+    rows = IncidentDailyRollup.objects.filter(**key)
+    if not rows.update(count=F('count') + delta, updated_at=timezone.now()):
+        try:
+            with transaction.atomic():
+                IncidentDailyRollup.objects.create(**key, count=delta)
+            return
+        except IntegrityError:
+            # Another writer created the bucket first (unique_rollup_bucket): add to theirs
+            rows.update(count=F('count') + delta, updated_at=timezone.now())
+    if delta < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def _membership_fields(buckets):
+    kind, reported_day, status, crime_type_id, city = buckets[0]
+    return {
+        "reported_day": reported_day,
+        "status": status,
+        "crime_type_id": crime_type_id,
+        "city": city,
+        "resolved_day": buckets[1][1] if len(buckets) > 1 else None,
+    }
+
+
+def _locked_membership(incident_id):
+    return IncidentRollupMembership.objects.select_for_update().filter(incident_id=incident_id).first()
+
+
+def _current_buckets(incident_id):
+    incident = Incidents.objects.select_related('location', 'assignment').filter(pk=incident_id).first()
+    if incident is None:
+        return []
+    return incident_buckets(incident, getattr(incident, 'assignment', None))
+
+
+def sync_incident(incident_id):
+    with transaction.atomic():
+        membership = _locked_membership(incident_id)
+        current = _current_buckets(incident_id)
+        if membership is None:
+            if not current:
+                return
+            # Claim the incident before counting it: a concurrent first sync
+            # blocks on the unique incident_id and then takes the diff path.
+            membership, created = IncidentRollupMembership.objects.get_or_create(
+                incident_id=incident_id, defaults=_membership_fields(current)
+            )
+            if created:
+                for bucket in current:
+                    _bump(bucket, 1)
+                return
+            membership = _locked_membership(incident_id)
+            current = _current_buckets(incident_id)
+
+        previous = membership_buckets(membership)
+        if current == previous:
+            return
+        for bucket in previous:
+            if bucket not in current:
+                _bump(bucket, -1)
+        for bucket in current:
+            if bucket not in previous:
+                _bump(bucket, 1)
+
+        if not current:
+            membership.delete()
+            return
+        IncidentRollupMembership.objects.filter(pk=membership.pk).update(**_membership_fields(current))
+
+
+def rebuild_all(batch_size=1000):
+    """Recompute every rollup bucket and membership from the source tables."""
+    totals = Counter()
+    memberships = []
+    incident_count = 0
+
+    with transaction.atomic():
+        IncidentDailyRollup.objects.all().delete()
+        IncidentRollupMembership.objects.all().delete()
+        incidents = Incidents.objects.select_related('location', 'assignment').order_by('id')
+        for incident in incidents.iterator(chunk_size=batch_size):
+            buckets = incident_buckets(incident, getattr(incident, 'assignment', None))
+            totals.update(buckets)
+            incident_count += 1
+            memberships.append(IncidentRollupMembership(incident_id=incident.id, **_membership_fields(buckets)))
+            if len(memberships) >= batch_size:
+                IncidentRollupMembership.objects.bulk_create(memberships)
+                memberships = []
+        IncidentRollupMembership.objects.bulk_create(memberships)
+        IncidentDailyRollup.objects.bulk_create([
+            IncidentDailyRollup(kind=kind, day=day, status=status, crime_type_id=crime_type_id, city=city, count=count)
+            for (kind, day, status, crime_type_id, city), count in totals.items()
+        ], batch_size=batch_size)
+    return incident_count, len(totals)
+
+
+def rollup_total(kind="reported", **filters):
+    """Sum of rollup counts matching the given filters (e.g. status__in=..., day__gte=...)."""
+    return IncidentDailyRollup.objects.filter(kind=kind, **filters).aggregate(total=Sum('count'))['total'] or 0
+
+
+def rollup_series(kind, trunc, **filters):
+    """{period_start: count} for rollup rows grouped by a Trunc* function applied to the day."""
+    rows = (
+        IncidentDailyRollup.objects.filter(kind=kind, **filters)
+        .annotate(period=trunc('day'))
+        .values('period')
+        .annotate(count=Sum('count'))
+    )
+    return {row['period']: row['count'] for row in rows}
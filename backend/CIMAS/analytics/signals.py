@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from evidence.models import Evidence
+from incidents.models import Incidents, IncidentAssignments, Locations
+from . import cache, rollups
+
+
+@receiver(post_save, sender=Incidents)
+@receiver(post_delete, sender=Incidents)
+@receiver(post_save, sender=IncidentAssignments)
+@receiver(post_delete, sender=IncidentAssignments)
+@receiver(post_save, sender=Evidence)
+@receiver(post_delete, sender=Evidence)
+def invalidate_analytics(sender, **kwargs):
+    cache.invalidate()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_on_new_user(sender, created=False, **kwargs):
+    # Only sign-ups change the "new users" figures; logins also save the user row
+    if created:
+        cache.invalidate()
+
+
+@receiver(post_save, sender=Incidents)
+@receiver(post_delete, sender=Incidents)
+def sync_incident_rollup(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rollups.sync_incident(instance.pk)
+
+
+@receiver(post_save, sender=IncidentAssignments)
+@receiver(post_delete, sender=IncidentAssignments)
+def sync_assignment_rollup(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rollups.sync_incident(instance.incident_id)
+
+
+@receiver(post_save, sender=Locations)
+def sync_location_rollups(sender, instance, created=False, raw=False, **kwargs):
+    # A renamed city moves every incident reported at this location
+    if raw or created:
+        return
+    for incident_id in Incidents.objects.filter(location=instance).values_list('id', flat=True):
+        rollups.sync_incident(incident_id)
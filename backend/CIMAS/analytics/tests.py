@@ -1,3 +1,279 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache as default_cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from awareness.models import CrimeTypes
+from incidents.models import Incidents, IncidentAssignments, Locations
+from users.models import CustomUser
+from . import cache, rollups
+from .models import IncidentDailyRollup, IncidentRollupMembership
+from .resolution import resolution_time_distribution
+from .rollups import rollup_total
+
+
+class AnalyticsCacheTests(TestCase):
+    """Dashboard payloads are served from cache until an incident write invalidates them."""
+
+    def setUp(self):
+        default_cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        Incidents.objects.create(user=self.victim, description="desc")
+        cache.reset_stats()
+        self.client = APIClient()
+
+    def get_summary(self, user):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/analytics/summary")
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_reload_is_served_from_cache(self):
+        first, first_queries = self.get_summary(self.admin)
+        second, second_queries = self.get_summary(self.admin)
+        self.assertGreater(first_queries, 0)
+        self.assertEqual(second_queries, 0)
+        self.assertEqual(first, second)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_scopes_are_separate_and_writes_invalidate(self):
+        admin_view, _ = self.get_summary(self.admin)
+        victim_view, _ = self.get_summary(self.victim)
+        self.assertEqual(admin_view["total_cases"], 1)
+        self.assertEqual(victim_view["in_progress_cases"], 1)
+
+        Incidents.objects.create(user=self.victim, description="another")
+        admin_view, queries = self.get_summary(self.admin)
+        self.assertGreater(queries, 0)
+        self.assertEqual(admin_view["total_cases"], 2)
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.client.force_authenticate(self.victim)
+        self.assertEqual(self.client.get("/api/analytics/cache-stats").status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.assertIn("hit_rate", self.client.get("/api/analytics/cache-stats").json())
+
+
+class IncidentRollupTests(TestCase):
+    """Rollups follow incident writes and match a full rebuild."""
+
+    def setUp(self):
+        default_cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.phishing = CrimeTypes.objects.create(crime_type_name="Phishing")
+        self.pune = Locations.objects.create(address="1 Main St", city="Pune", state="MH", country="IN")
+
+    def snapshot(self):
+        return sorted(
+            (row.kind, row.day, row.status, row.crime_type_id, row.city, row.count)
+            for row in IncidentDailyRollup.objects.all()
+        )
+
+    def test_incremental_matches_rebuild(self):
+        incident = Incidents.objects.create(
+            user=self.admin, description="desc", crime_type=self.phishing, location=self.pune
+        )
+        Incidents.objects.create(user=self.admin, description="desc")
+        self.assertEqual(rollup_total(), 2)
+        self.assertEqual(rollup_total(city="Pune"), 1)
+
+        assignment = IncidentAssignments.objects.create(
+            incident=incident, assigned_to=self.investigator, resolved_at=timezone.now()
+        )
+        incident.status = "resolved"
+        incident.save()
+        self.assertEqual(rollup_total(status="resolved"), 1)
+        self.assertEqual(rollup_total(kind="resolved"), 1)
+
+        self.pune.city = "Mumbai"
+        self.pune.save()
+        self.assertEqual(rollup_total(city="Mumbai"), 1)
+
+        incremental = self.snapshot()
+        call_command("rebuild_rollups", stdout=StringIO())
+        self.assertEqual(self.snapshot(), incremental)
+
+        assignment.delete()
+        self.assertEqual(rollup_total(kind="resolved"), 0)
+        incident.delete()
+        self.assertEqual(rollup_total(), 1)
+        # Emptied buckets are removed, so rankings never list zero rows
+        self.assertEqual(IncidentDailyRollup.objects.count(), 1)
+        self.assertFalse(IncidentDailyRollup.objects.filter(count__lte=0).exists())
+
+    def test_buckets_with_null_keys_are_unique(self):
+        IncidentDailyRollup.objects.create(kind="reported", day=date(2026, 1, 1), status="reported", count=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            IncidentDailyRollup.objects.create(kind="reported", day=date(2026, 1, 1), status="reported", count=1)
+
+    def test_concurrent_first_syncs_count_an_incident_once(self):
+        incident = Incidents.objects.create(user=self.admin, description="desc", location=self.pune)
+        self.assertEqual(rollup_total(), 1)
+
+        # A second first sync that looked before the membership row was committed
+        locked_membership = rollups._locked_membership
+        lookups = []
+
+        def stale_first_lookup(incident_id):
+            lookups.append(incident_id)
+            return None if len(lookups) == 1 else locked_membership(incident_id)
+
+        with mock.patch.object(rollups, "_locked_membership", side_effect=stale_first_lookup):
+            rollups.sync_incident(incident.id)
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(rollup_total(), 1)
+        self.assertEqual(IncidentRollupMembership.objects.count(), 1)
+
+    def test_detailed_charts_read_rollups(self):
+        Incidents.objects.create(user=self.admin, description="desc", crime_type=self.phishing, location=self.pune)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        body = self.client.get("/api/analytics/detailed").json()
+        self.assertEqual(body["category_graph"], {"categories": ["Phishing"], "counts": [1]})
+        self.assertEqual(body["hotspot_graph"], {"cities": ["Pune"], "counts": [1]})
+        self.assertEqual(sum(body["incident_trend_graph"]["created"]), 1)
+
+        summary = self.client.get("/api/analytics/summary").json()
+        self.assertEqual(summary["total_cases"], 1)
+        self.assertEqual(summary["graph_data"]["created"][-1], 1)
+
+
+class ResolutionTimeTests(TestCase):
+    """Resolution time is measured from assigned_at to resolved_at."""
+
+    def setUp(self):
+        default_cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        phishing = CrimeTypes.objects.create(crime_type_name="Phishing")
+        assigned_at = timezone.now() - timedelta(days=10)
+        for hours, priority in [(10, "high"), (20, "high"), (40, "low")]:
+            incident = Incidents.objects.create(
+                user=self.admin, description="desc", status="resolved", crime_type=phishing
+            )
+            IncidentAssignments.objects.create(
+                incident=incident, priority=priority,
+                assigned_at=assigned_at, resolved_at=assigned_at + timedelta(hours=hours),
+            )
+        # Open cases are ignored
+        open_incident = Incidents.objects.create(user=self.admin, description="desc")
+        IncidentAssignments.objects.create(incident=open_incident, assigned_at=assigned_at)
+
+    def test_distribution(self):
+        distribution = resolution_time_distribution()
+        self.assertEqual(distribution["overall"]["count"], 3)
+        self.assertAlmostEqual(distribution["overall"]["mean_hours"], 23.33, places=2)
+        self.assertEqual(distribution["overall"]["p50_hours"], 20)
+        self.assertEqual(distribution["by_priority"]["high"]["p50_hours"], 15)
+        self.assertEqual(distribution["by_crime_type"]["Phishing"]["count"], 3)
+
+    def test_detailed_time_taken_is_report_to_assignment(self):
+        assigned_at = timezone.now().replace(day=15, hour=12, minute=0, second=0, microsecond=0)
+        for hours, priority in [(2, "high"), (4, "high"), (6, "low")]:
+            incident = Incidents.objects.create(user=self.admin, description="desc", status="assigned")
+            Incidents.objects.filter(pk=incident.pk).update(reported_at=assigned_at - timedelta(hours=hours))
+            IncidentAssignments.objects.create(incident=incident, priority=priority, assigned_at=assigned_at)
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        graph = client.get("/api/analytics/detailed").json()["time_taken_graph"]
+        self.assertEqual(graph["time_taken"]["high"], [3.0])
+        self.assertEqual(graph["counts"]["high"], [2])
+        self.assertEqual(graph["time_taken"]["low"], [6.0])
+        self.assertEqual(graph["months"]["low"], [assigned_at.strftime("%B %Y")])
+
+    def test_update_case_stamps_resolution(self):
+        incident = Incidents.objects.get(status="in_progress")
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        client.patch(f"/api/cases/{incident.id}/update/", {"status": "resolved"}, format="json")
+        assignment = IncidentAssignments.objects.get(incident=incident)
+        self.assertLess(timezone.now() - assignment.resolved_at, timedelta(minutes=1))
+
+
+class ChartEndpointTests(TestCase):
+    """Trends, hotspots and categories read the rollups and support conditional requests."""
+
+    def setUp(self):
+        default_cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        phishing = CrimeTypes.objects.create(crime_type_name="Phishing")
+        pune = Locations.objects.create(address="1 Main St", city="Pune", state="MH", country="IN")
+        today = timezone.now()
+        for days_ago in (0, 0, 1, 40):
+            Incidents.objects.create(
+                user=self.admin, description="desc", crime_type=phishing, location=pune,
+                reported_at=today - timedelta(days=days_ago),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_trends_by_day(self):
+        today = timezone.localdate()
+        body = self.client.get("/api/analytics/trends", {
+            "granularity": "day", "from": str(today - timedelta(days=2)), "to": str(today),
+        }).json()
+        self.assertEqual(len(body["periods"]), 3)
+        self.assertEqual(body["created"], [0, 1, 2])
+
+    def test_breakdowns(self):
+        hotspots = self.client.get("/api/analytics/hotspots", {"granularity": "month"}).json()
+        self.assertEqual(hotspots["cities"], ["Pune"])
+        self.assertEqual(hotspots["counts"], [4])
+        self.assertEqual(sum(hotspots["series"]["Pune"]), 4)
+
+        categories = self.client.get("/api/analytics/categories", {"from": str(timezone.localdate())}).json()
+        self.assertEqual(categories["categories"], ["Phishing"])
+        self.assertEqual(categories["counts"], [2])
+
+    def test_bad_granularity(self):
+        response = self.client.get("/api/analytics/trends", {"granularity": "hour"})
+        self.assertEqual(response.status_code, 400)
+        for limit in ("0", "-3"):
+            response = self.client.get("/api/analytics/hotspots", {"limit": limit})
+            self.assertEqual(response.status_code, 400)
+
+    def test_non_admins_get_no_etag(self):
+        etag = self.client.get("/api/analytics/trends")["ETag"]
+        victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.client.force_authenticate(victim)
+        for url in ("/api/analytics/trends", "/api/analytics/hotspots", "/api/analytics/categories"):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 403)
+            self.assertNotIn("ETag", response)
+
+    def test_revalidation(self):
+        first = self.client.get("/api/analytics/trends")
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+
+        cached = self.client.get("/api/analytics/trends", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
 
-# Create your tests here.
+        Incidents.objects.create(user=self.admin, description="new")
+        refreshed = self.client.get("/api/analytics/trends", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed["ETag"], first["ETag"])
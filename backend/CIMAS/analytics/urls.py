@@ -7,4 +7,5 @@ urlpatterns = [
 	path('api/analytics/trends', views.analytics_trends, name='analytics_trends'),
 	path('api/analytics/hotspots', views.analytics_hotspots, name='analytics_hotspots'),
 	path('api/analytics/categories', views.analytics_categories, name='analytics_categories'),
+	path('api/analytics/cache-stats', views.analytics_cache_stats, name='analytics_cache_stats'),
 ]
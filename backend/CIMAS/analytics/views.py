@@ -1,52 +1,51 @@
+import hashlib
 from datetime import datetime
+from functools import wraps
 from django.shortcuts import render
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from incidents.models import IncidentAssignments,Incidents
 from evidence.models import Evidence
-from django.db.models.functions import TruncWeek
-from django.db.models import Count, Avg
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Sum
 from datetime import timedelta
 from users.models import CustomUser as User
 from awareness.models import CrimeTypes
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import condition
+from .cache import get_or_compute, stats as cache_stats
+from .models import IncidentDailyRollup
+from .resolution import resolution_time_distribution
+from .rollups import rollup_series, rollup_total
 
-@permission_classes([IsAuthenticated])
-@api_view(['GET'])
-def analytics_summary(request):
-	role = request.user.role
+def summary_payload(user):
+	"""Dashboard summary for ``user``'s role, or None when the role has no dashboard."""
+	role = user.role
 	if role == "admin":
-		total_cases = Incidents.objects.all().count()
+		# Counts and the weekly graph come from the daily rollups (analytics/rollups.py)
+		total_cases = rollup_total()
 		critical_cases = IncidentAssignments.objects.filter(priority='high').count()
-		solved_cases = Incidents.objects.filter(status='resolved').count()
-		in_progress_cases = Incidents.objects.filter(status__in=['in_progress', 'assigned']).count()
-		resolved_cases = Incidents.objects.filter(status='resolved').count()
+		solved_cases = rollup_total(status='resolved')
+		in_progress_cases = rollup_total(status__in=['in_progress', 'assigned'])
+		resolved_cases = solved_cases
 		rejected=0
 
-		# Group incidents by week for created and resolved
-		created_data = Incidents.objects.annotate(week=TruncWeek('reported_at')).values('week').annotate(count=Count('id')).order_by('week')
-		resolved_data = IncidentAssignments.objects.filter(incident__status='resolved').annotate(week=TruncWeek('resolved_at')).values('week').annotate(count=Count('id')).order_by('week')
-
-		# Combine weeks from both datasets
-		all_weeks = sorted(set(data['week'] for data in created_data) | set(data['week'] for data in resolved_data))[-4:]  # Limit to the last 4 weeks
-
-		# Prepare graph data with zero-filled values
-		created_dict = {data['week']: data['count'] for data in created_data}
-		resolved_dict = {data['week']: data['count'] for data in resolved_data}
 		# Get the current date and calculate the start of the current week
-		today = datetime.now()
+		today = timezone.localdate()
 		start_of_week = today - timedelta(days=today.weekday())
 		weeks = [start_of_week - timedelta(weeks=i) for i in range(3, -1, -1)]  # Last 4 weeks including current week
 
-		# Prepare graph data with zero-filled values for continuous weeks
-		created_dict = {data['week']: data['count'] for data in created_data}
-		resolved_dict = {data['week']: data['count'] for data in resolved_data}
+		# Group rollup days by week for created and resolved, zero-filling missing weeks
+		created_dict = rollup_series("reported", TruncWeek, day__gte=weeks[0])
+		resolved_dict = rollup_series("resolved", TruncWeek, day__gte=weeks[0])
 		graph_data = {
 			"weeks": [f"Week {((week.day - 1) // 7) + 1} {week.strftime('%B %Y')}" for week in weeks],
 			"created": [created_dict.get(week, 0) for week in weeks],
 			"resolved": [resolved_dict.get(week, 0) for week in weeks]
 		}
-		return Response({
+		return {
 			"total_cases": total_cases,
 			"critical_cases": critical_cases,
 			"solved_cases": solved_cases,
@@ -54,15 +53,15 @@ def analytics_summary(request):
 			"resolved_cases": resolved_cases,
 			"rejected": rejected,
 			"graph_data": graph_data
-		})
+		}
 	elif role == "investigator":
-		total_cases = IncidentAssignments.objects.filter(assigned_to=request.user).count()
-		in_progress_cases = IncidentAssignments.objects.filter(assigned_to=request.user, incident__status__in=['in_progress', 'assigned']).count()
-		resolved_cases = IncidentAssignments.objects.filter(assigned_to=request.user, incident__status='resolved').count()
+		total_cases = IncidentAssignments.objects.filter(assigned_to=user).count()
+		in_progress_cases = IncidentAssignments.objects.filter(assigned_to=user, incident__status__in=['in_progress', 'assigned']).count()
+		resolved_cases = IncidentAssignments.objects.filter(assigned_to=user, incident__status='resolved').count()
 		success_rate = (resolved_cases / total_cases * 100) if total_cases > 0 else 0
-		cases_this_month = IncidentAssignments.objects.filter(assigned_to=request.user, assigned_at__month=datetime.now().month).count()
-		upcoming_deadlines = IncidentAssignments.objects.filter(assigned_to=request.user, assigned_deadline__gte=datetime.now()).order_by('assigned_deadline')[:3]
-		return Response({
+		cases_this_month = IncidentAssignments.objects.filter(assigned_to=user, assigned_at__month=datetime.now().month).count()
+		upcoming_deadlines = IncidentAssignments.objects.filter(assigned_to=user, assigned_deadline__gte=datetime.now()).select_related('incident').order_by('assigned_deadline')[:3]
+		return {
 			"total_assigned_cases": total_cases,
 			"in_progress_cases": in_progress_cases,
 			"resolved_cases": resolved_cases,
@@ -75,13 +74,13 @@ def analytics_summary(request):
 				"assigned_at": assignment.assigned_at
 			} for assignment in upcoming_deadlines]
 
-		})
+		}
 	elif role=="victim":
-		active_cases = Incidents.objects.filter(user=request.user, status__in=['reported', 'in_progress', 'assigned']).count()
-		in_progress_cases = Incidents.objects.filter(user=request.user, status__in=['in_progress', 'assigned']).count()
-		resolved_cases = Incidents.objects.filter(user=request.user, status='resolved').count()
-		evidence_submitted = Evidence.objects.filter(submitted_by=request.user).count()
-		return Response({
+		active_cases = Incidents.objects.filter(user=user, status__in=['reported', 'in_progress', 'assigned']).count()
+		in_progress_cases = Incidents.objects.filter(user=user, status__in=['in_progress', 'assigned']).count()
+		resolved_cases = Incidents.objects.filter(user=user, status='resolved').count()
+		evidence_submitted = Evidence.objects.filter(submitted_by=user).count()
+		return {
 			"active_cases": active_cases,
 			"in_progress_cases": in_progress_cases,
 			"resolved_cases": resolved_cases,
@@ -90,66 +89,66 @@ def analytics_summary(request):
 				"title": incident.title if incident.title else "No Title",
 				"status": incident.status if incident.status else "N/A",
 				"reported_at": incident.reported_at if incident.reported_at else "N/A",
-				"assigned_investigator": incident.assignment.assigned_to.first_name + " " + incident.assignment.assigned_to.last_name if hasattr(incident, 'assignment') else "Not Assigned",
+				"assigned_investigator": incident.assignment.assigned_to.first_name + " " + incident.assignment.assigned_to.last_name if hasattr(incident, 'assignment') and incident.assignment.assigned_to else "Not Assigned",
 				"priority": incident.assignment.priority if hasattr(incident, 'assignment') else "N/A",
 				"progress": "50%" if incident.status == "in_progress" else "75%" if incident.status == "assigned" else "0%"
-			} for incident in Incidents.objects.filter(user=request.user, status__in=['reported', 'in_progress', 'assigned']).order_by('-reported_at')[:3]]
-		})
-	return Response({"error": "You do not have permission to view this."}, status=403)
+			} for incident in Incidents.objects.filter(user=user, status__in=['reported', 'in_progress', 'assigned']).select_related('assignment__assigned_to').order_by('-reported_at')[:3]]
+		}
+	return None
 
 @permission_classes([IsAuthenticated])
 @api_view(['GET'])
-def analytics_detailed(request):
-	if request.user.role != "admin":
+def analytics_summary(request):
+	user = request.user
+	# Every admin sees the same dashboard; investigators and victims get their own
+	scope = user.role if user.role == "admin" else f"{user.role}:{user.id}"
+	data = get_or_compute("summary", scope, lambda: summary_payload(user))
+	if data is None:
 		return Response({"error": "You do not have permission to view this."}, status=403)
-	case_solved = Incidents.objects.filter(status='resolved').count()
+	return Response(data)
+
+def detailed_payload():
+	case_solved = rollup_total(status='resolved')
 	new_users = User.objects.filter(date_joined__month=datetime.now().month).count()
-	avg_resolution_time = IncidentAssignments.objects.filter(incident__status='resolved').annotate(
-		resolution_time=Count('resolved_at') - Count('assigned_at')
-	).aggregate(Avg('resolution_time'))['resolution_time__avg']
+
+	# Real resolution durations (resolved_at - assigned_at), in hours, with the
+	# full distribution per priority and crime type from one query
+	resolution_distribution = resolution_time_distribution()
+	avg_resolution_time = resolution_distribution["overall"]["mean_hours"]
 
 	# Compare with last month
 	last_month = datetime.now().month - 1 if datetime.now().month > 1 else 12
 	last_month_year = datetime.now().year if datetime.now().month > 1 else datetime.now().year - 1
 
-	last_month_case_solved = Incidents.objects.filter(status='resolved', reported_at__month=last_month, reported_at__year=last_month_year).count()
+	last_month_case_solved = rollup_total(status='resolved', day__month=last_month, day__year=last_month_year)
+	last_month_total_cases = rollup_total(day__month=last_month, day__year=last_month_year)
 	last_month_new_users = User.objects.filter(date_joined__month=last_month, date_joined__year=last_month_year).count()
-	last_month_avg_resolution_time = IncidentAssignments.objects.filter(
-		incident__status='resolved',
+	last_month_avg_resolution_time = resolution_time_distribution(
 		resolved_at__month=last_month,
 		resolved_at__year=last_month_year
-	).annotate(
-		resolution_time=Count('resolved_at') - Count('assigned_at')
-	).aggregate(Avg('resolution_time'))['resolution_time__avg']
+	)["overall"]["mean_hours"]
 
 	# Calculate changes
 	case_solved_change = case_solved - last_month_case_solved
 	new_users_change = new_users - last_month_new_users
 	avg_resolution_time_change = avg_resolution_time - last_month_avg_resolution_time if avg_resolution_time and last_month_avg_resolution_time else 0
 	
-	total_cases = Incidents.objects.count()
+	total_cases = rollup_total()
 	efficincy = (case_solved / total_cases * 100) if total_cases > 0 else 0
 	
 	# Calculate last month's efficiency
-	last_month = datetime.now().month - 1 if datetime.now().month > 1 else 12
-	last_month_year = datetime.now().year if datetime.now().month > 1 else datetime.now().year - 1
-	last_month_cases_solved = Incidents.objects.filter(status='resolved', reported_at__month=last_month, reported_at__year=last_month_year).count()
-	last_month_total_cases = Incidents.objects.filter(reported_at__month=last_month, reported_at__year=last_month_year).count()
-	last_month_efficiency = (last_month_cases_solved / last_month_total_cases * 100) if last_month_total_cases > 0 else 0
+	last_month_efficiency = (last_month_case_solved / last_month_total_cases * 100) if last_month_total_cases > 0 else 0
 	
 	efficincy_change = efficincy - last_month_efficiency
 
 	# Incident Trend graph data
-	# Group incidents by month for created and resolved
-	created_data = Incidents.objects.annotate(month=TruncWeek('reported_at', kind='month')).values('month').annotate(count=Count('id')).order_by('month')
-	resolved_data = IncidentAssignments.objects.filter(incident__status='resolved').annotate(month=TruncWeek('resolved_at', kind='month')).values('month').annotate(count=Count('id')).order_by('month')
+	# Group rollup days by month for created and resolved
+	created_dict = rollup_series("reported", TruncMonth)
+	resolved_dict = rollup_series("resolved", TruncMonth)
 
 	# Combine months from both datasets
-	all_months = sorted(set(data['month'] for data in created_data) | set(data['month'] for data in resolved_data))[-6:]  # Limit to the last 6 months
+	all_months = sorted(set(created_dict) | set(resolved_dict))[-6:]  # Limit to the last 6 months
 
-	# Prepare graph data with zero-filled values
-	created_dict = {data['month']: data['count'] for data in created_data}
-	resolved_dict = {data['month']: data['count'] for data in resolved_data}
 	graph_data = {
 		"months": [month.strftime('%B %Y') for month in all_months],
 		"created": [created_dict.get(month, 0) for month in all_months],
@@ -157,7 +156,7 @@ def analytics_detailed(request):
 	}
 
 	# Prepare a crime category and number of incidents per category graph data
-	category_data = Incidents.objects.values('crime_type__crime_type_name').annotate(count=Count('id')).order_by('-count')
+	category_data = IncidentDailyRollup.objects.filter(kind='reported').values('crime_type__crime_type_name').annotate(count=Sum('count')).order_by('-count')
 	category_dict = {data['crime_type__crime_type_name']: data['count'] for data in category_data}
 	category_graph_data = {
 		"categories": list(category_dict.keys()),
@@ -165,59 +164,232 @@ def analytics_detailed(request):
 	}
 
 	# Respond Analysis Data
-	# Prepare graph data for time taken vs incident count divided by priority
-	time_taken_data = IncidentAssignments.objects.filter(incident__status__in=['in_progress', 'assigned']).annotate(
-		time_taken=Count('assigned_at') - Count('incident__reported_at')
-	).values('priority', 'time_taken').annotate(count=Count('id')).order_by('priority', 'time_taken')
+	# Mean time from report to assignment (in hours) and assignment count per
+	# priority, by month of assignment like the incident trend graph
+	time_taken_data = IncidentAssignments.objects.filter(
+		incident__status__in=['in_progress', 'assigned'], assigned_at__isnull=False, incident__reported_at__isnull=False
+	).annotate(month=TruncMonth('assigned_at')).values('priority', 'month').annotate(
+		time_taken=Avg(ExpressionWrapper(F('assigned_at') - F('incident__reported_at'), output_field=DurationField())),
+		count=Count('id')
+	).order_by('priority', 'month')
 
 	# Organize data for the graph
 	priority_dict = {}
 	for data in time_taken_data:
-		priority = data['priority']
-		time_taken = data['time_taken']
-		count = data['count']
-		if priority not in priority_dict:
-			priority_dict[priority] = {}
-		priority_dict[priority][time_taken] = count
+		priority_dict.setdefault(data['priority'], []).append(data)
 
 	# Prepare graph data
 	time_taken_graph_data = {
 		"priorities": list(priority_dict.keys()),
+		"months": {
+			priority: [data['month'].strftime('%B %Y') for data in rows] for priority, rows in priority_dict.items()
+		},
 		"time_taken": {
-			priority: list(priority_dict[priority].keys()) for priority in priority_dict
+			priority: [round(data['time_taken'].total_seconds() / 3600, 2) for data in rows]
+			for priority, rows in priority_dict.items()
 		},
 		"counts": {
-			priority: list(priority_dict[priority].values()) for priority in priority_dict
+			priority: [data['count'] for data in rows] for priority, rows in priority_dict.items()
 		}
 	}
 
 	# Incident Hotspots graph data
-	hotspot_data = Incidents.objects.values('location__city').annotate(count=Count('id')).order_by('-count')
+	hotspot_data = IncidentDailyRollup.objects.filter(kind='reported').values('city').annotate(count=Sum('count')).order_by('-count')
 	hotspot_graph_data = {
-		"cities": [data['location__city'] for data in hotspot_data],
+		"cities": [data['city'] for data in hotspot_data],
 		"counts": [data['count'] for data in hotspot_data]
 	}
 
-	return Response({
+	return {
 		"case_solved": case_solved,
 		"case_solved_change": case_solved_change,
 		"new_users": new_users,
 		"new_users_change": new_users_change,
 		"avg_resolution_time": avg_resolution_time,
 		"avg_resolution_time_change": avg_resolution_time_change,
+		"resolution_time_distribution": resolution_distribution,
 		"efficiency": efficincy,
 		"efficiency_change": efficincy_change,
 		"incident_trend_graph": graph_data,
 		"category_graph": category_graph_data,
 		"time_taken_graph": time_taken_graph_data,
 		"hotspot_graph": hotspot_graph_data
-	})
+	}
 
+@permission_classes([IsAuthenticated])
+@api_view(['GET'])
+def analytics_detailed(request):
+	if request.user.role != "admin":
+		return Response({"error": "You do not have permission to view this."}, status=403)
+	return Response(get_or_compute("detailed", "admin", detailed_payload))
+
+@permission_classes([IsAuthenticated])
+@api_view(['GET'])
+def analytics_cache_stats(request):
+	if request.user.role != "admin":
+		return Response({"error": "You do not have permission to view this."}, status=403)
+	return Response(cache_stats())
+
+CHART_GRANULARITIES = {
+	"day": F,
+	"week": TruncWeek,
+	"month": TruncMonth,
+}
+DEFAULT_CHART_DAYS = 90
+
+def parse_chart_params(request):
+	"""(start, end, granularity) from ?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month."""
+	granularity = request.GET.get("granularity", "week")
+	if granularity not in CHART_GRANULARITIES:
+		raise ValueError("granularity must be one of day, week, month")
+	end = parse_date(request.GET["to"]) if request.GET.get("to") else timezone.localdate()
+	start = parse_date(request.GET["from"]) if request.GET.get("from") else end - timedelta(days=DEFAULT_CHART_DAYS)
+	if start is None or end is None:
+		raise ValueError("from/to must be dates formatted YYYY-MM-DD")
+	if start > end:
+		raise ValueError("from must not be after to")
+	return start, end, granularity
+
+def parse_chart_limit(request):
+	"""How many cities/categories a breakdown returns (?limit=, default 10)."""
+	limit = int(request.GET.get("limit", 10))
+	if limit <= 0:
+		raise ValueError("limit must be a positive integer")
+	return limit
+
+def chart_periods(start, end, granularity):
+	"""Every period start between start and end, so charts can be zero-filled."""
+	if granularity == "week":
+		start = start - timedelta(days=start.weekday())
+	elif granularity == "month":
+		start = start.replace(day=1)
+	periods = []
+	current = start
+	while current <= end:
+		periods.append(current)
+		if granularity == "day":
+			current += timedelta(days=1)
+		elif granularity == "week":
+			current += timedelta(weeks=1)
+		else:
+			current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+	return periods
+
+def chart_breakdown(field, start, end, granularity, limit):
+	"""Reported-incident counts per ``field`` value (top ``limit``) with a per-period series for each."""
+	rows = (
+		IncidentDailyRollup.objects.filter(kind="reported", day__gte=start, day__lte=end)
+		.annotate(period=CHART_GRANULARITIES[granularity]("day"))
+		.values(field, "period")
+		.annotate(count=Sum("count"))
+	)
+	periods = chart_periods(start, end, granularity)
+	index = {period: i for i, period in enumerate(periods)}
+	totals = {}
+	series = {}
+	for row in rows:
+		key = row[field]
+		totals[key] = totals.get(key, 0) + row["count"]
+		series.setdefault(key, [0] * len(periods))[index[row["period"]]] += row["count"]
+	top = sorted(totals, key=lambda key: totals[key], reverse=True)[:limit]
+	return periods, top, [totals[key] for key in top], {str(key): series[key] for key in top}
+
+def rollup_state(request):
+	"""Newest rollup bucket write and bucket count, looked up once per request."""
+	if not hasattr(request, "_rollup_state"):
+		request._rollup_state = IncidentDailyRollup.objects.aggregate(latest=Max("updated_at"), rows=Count("id"))
+	return request._rollup_state
+
+def last_rollup_write(request, *args, **kwargs):
+	"""When chart data last changed: the newest rollup bucket write."""
+	return rollup_state(request)["latest"]
+
+def chart_etag(request, *args, **kwargs):
+	state = rollup_state(request)
+	if state["latest"] is None:
+		return None
+	# The bucket count catches emptied buckets being deleted, which moves no updated_at
+	key = f"{request.path}?{request.GET.urlencode()}|{state['latest'].isoformat()}|{state['rows']}"
+	return hashlib.md5(key.encode()).hexdigest()
+
+def admin_only(view):
+	"""Refuse non-admins before @condition below it can answer them with a 304."""
+	@wraps(view)
+	def wrapper(request, *args, **kwargs):
+		if request.user.role != "admin":
+			return Response({"error": "You do not have permission to view this."}, status=403)
+		return view(request, *args, **kwargs)
+	return wrapper
+
+def chart_response(data):
+	response = Response(data)
+	# Let clients keep the payload but revalidate it with If-None-Match/If-Modified-Since
+	response["Cache-Control"] = "private, no-cache"
+	return response
+
+@permission_classes([IsAuthenticated])
+@api_view(['GET'])
+@admin_only
+@condition(etag_func=chart_etag, last_modified_func=last_rollup_write)
 def analytics_trends(request):
-	pass
+	try:
+		start, end, granularity = parse_chart_params(request)
+	except ValueError as e:
+		return Response({"error": str(e)}, status=400)
+
+	trunc = CHART_GRANULARITIES[granularity]
+	created = rollup_series("reported", trunc, day__gte=start, day__lte=end)
+	resolved = rollup_series("resolved", trunc, day__gte=start, day__lte=end)
+	periods = chart_periods(start, end, granularity)
+	return chart_response({
+		"granularity": granularity,
+		"from": start,
+		"to": end,
+		"periods": periods,
+		"created": [created.get(period, 0) for period in periods],
+		"resolved": [resolved.get(period, 0) for period in periods]
+	})
 
+@permission_classes([IsAuthenticated])
+@api_view(['GET'])
+@admin_only
+@condition(etag_func=chart_etag, last_modified_func=last_rollup_write)
 def analytics_hotspots(request):
-	pass
+	try:
+		start, end, granularity = parse_chart_params(request)
+		limit = parse_chart_limit(request)
+	except ValueError as e:
+		return Response({"error": str(e)}, status=400)
 
+	periods, cities, counts, series = chart_breakdown("city", start, end, granularity, limit)
+	return chart_response({
+		"granularity": granularity,
+		"from": start,
+		"to": end,
+		"periods": periods,
+		"cities": cities,
+		"counts": counts,
+		"series": series
+	})
+
+@permission_classes([IsAuthenticated])
+@api_view(['GET'])
+@admin_only
+@condition(etag_func=chart_etag, last_modified_func=last_rollup_write)
 def analytics_categories(request):
-	pass
+	try:
+		start, end, granularity = parse_chart_params(request)
+		limit = parse_chart_limit(request)
+	except ValueError as e:
+		return Response({"error": str(e)}, status=400)
+
+	periods, categories, counts, series = chart_breakdown("crime_type__crime_type_name", start, end, granularity, limit)
+	return chart_response({
+		"granularity": granularity,
+		"from": start,
+		"to": end,
+		"periods": periods,
+		"categories": categories,
+		"counts": counts,
+		"series": series
+	})
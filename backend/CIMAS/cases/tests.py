@@ -1,3 +1,48 @@
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from incidents.models import IncidentAssignments, Incidents
+from users.models import CustomUser
+
+
+class OneAssignmentPerIncidentTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.incident = Incidents.objects.create(user=self.victim, title="Fake bank SMS", description="desc")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_second_assignment_is_rejected(self):
+        IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+
+    def test_priority_placeholder_then_assign(self):
+        self.client.put(f"/api/cases/{self.incident.id}/update/", {"priority": "high"}, format="json")
+        unassigned = self.client.get("/api/cases/unassigned").json()
+        self.assertEqual([(case["id"], case["priority"]) for case in unassigned], [(self.incident.id, "high")])
+
+        response = self.client.post(f"/api/cases/{self.incident.id}/assign/{self.investigator.id}")
+        self.assertEqual(response.status_code, 201)
+        assignment = IncidentAssignments.objects.get(incident=self.incident)
+        self.assertEqual((assignment.assigned_to, assignment.priority), (self.investigator, "high"))
+        self.assertEqual(self.client.get("/api/cases/unassigned").json(), [])
+
+    def test_unassigned_cases_use_one_query(self):
+        for i in range(5):
+            incident = Incidents.objects.create(user=self.victim, title=f"Incident {i}", description="desc")
+            IncidentAssignments.objects.create(incident=incident, priority="low")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/cases/unassigned")
+        self.assertEqual(len(response.json()), 6)
+        self.assertEqual(len([q for q in ctx.captured_queries if "incidents" in q["sql"]]), 1)
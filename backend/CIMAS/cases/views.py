@@ -7,32 +7,30 @@ from rest_framework.response import Response
 from incidents.models import IncidentAssignments, Incidents
 from rest_framework.permissions import IsAuthenticated,IsAdminUser
 
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from incidents.models import stamp_resolution
+
 @api_view(['PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def update_case(request, id):
     incident = get_object_or_404(Incidents, pk=id)
+    previous_status = incident.status
 
     incident.title = request.data.get("title", incident.title)
     incident.description = request.data.get("description", incident.description)
     incident.status = request.data.get("status", incident.status)
+    if incident.status == "resolved" and previous_status != "resolved":
+        stamp_resolution(incident)
     incident.save()
 
-    # Handle priority update
+    # Handle priority update. For unassigned cases this creates an assignment
+    # with priority but no assigned_to, so priority is tracked before assignment
     if "priority" in request.data:
-        try:
-            assignment = IncidentAssignments.objects.get(incident=incident)
-            assignment.priority = request.data.get("priority", assignment.priority)
-            assignment.save()
-        except IncidentAssignments.DoesNotExist:
-            # For unassigned cases, create assignment with priority but no assigned_to
-            # This allows tracking priority even before assignment
-            priority = request.data.get("priority", "medium")
-            IncidentAssignments.objects.create(
-                incident=incident,
-                priority=priority,
-                assigned_to=None
-            )
+        IncidentAssignments.objects.update_or_create(
+            incident=incident,
+            defaults={"priority": request.data.get("priority") or "medium"},
+        )
 
     return Response({"message": "Case updated successfully!"}, status=status.HTTP_200_OK)
 
@@ -76,7 +74,9 @@ def assign_case(request, id, userId):
 	if incident.status == 'resolved':
 		return Response({"error": "Incident is not open for assignment"}, status=status.HTTP_400_BAD_REQUEST)
 
-	if IncidentAssignments.objects.filter(incident=incident).exists():
+	# A placeholder assignment (priority set, nobody assigned yet) gets filled in
+	assignment = IncidentAssignments.objects.filter(incident=incident).first()
+	if assignment is not None and assignment.assigned_to_id is not None:
 		return Response({"error": "Incident is already assigned"}, status=status.HTTP_400_BAD_REQUEST)
 
 	try:
@@ -85,7 +85,11 @@ def assign_case(request, id, userId):
 	except CustomUser.DoesNotExist:
 		return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-	assignment = IncidentAssignments.objects.create(incident=incident, assigned_to=user)
+	if assignment is None:
+		assignment = IncidentAssignments.objects.create(incident=incident, assigned_to=user)
+	else:
+		assignment.assigned_to = user
+		assignment.save()
 	incident.status = 'Assigned'
 	incident.save()
 
@@ -101,7 +105,9 @@ def assign_case(request, id, userId):
 @permission_classes([IsAuthenticated])
 def get_assigned_cases_me(request):
 	userId = request.user.id
-	assigned_cases = IncidentAssignments.objects.filter(assigned_to__id=userId)
+	assigned_cases = IncidentAssignments.objects.filter(assigned_to__id=userId).select_related(
+		'incident', 'incident__crime_type', 'incident__user', 'incident__location'
+	)
 	data = [{
 		"id": ac.incident.id if ac.incident.id else 0,
 		"title": ac.incident.title if ac.incident.title else "No Title",
@@ -135,12 +141,7 @@ def reassign_case(request, id, userId):
 	except CustomUser.DoesNotExist:
 		return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-	try:
-		assignment = IncidentAssignments.objects.get(incident=incident)
-		assignment.assigned_to = user
-		assignment.save()
-	except IncidentAssignments.DoesNotExist:
-		assignment = IncidentAssignments.objects.create(incident=incident, assigned_to=user)
+	assignment, _ = IncidentAssignments.objects.update_or_create(incident=incident, defaults={"assigned_to": user})
 
 	incident.status = 'Assigned'
 	incident.save()
@@ -154,19 +155,16 @@ def reassign_case(request, id, userId):
 
 @api_view(['GET'])
 def get_unassigned_cases(request):
-	# Get unassigned cases (cases without assigned_to in IncidentAssignments)
+	# Get unassigned cases (no assignment, or a placeholder without assigned_to),
+	# joined with their optional assignment in the same query
 	unassigned_cases = (Incidents.objects.exclude(status="resolved")
-                        .exclude(id__in=IncidentAssignments.objects.filter(assigned_to__isnull=False)
-                                .values_list('incident_id', flat=True)))
+                        .filter(Q(assignment__isnull=True) | Q(assignment__assigned_to__isnull=True))
+                        .select_related('assignment', 'crime_type', 'user', 'location'))
 	
 	data = []
 	for uc in unassigned_cases:
-		# Try to get priority from IncidentAssignments if it exists
-		try:
-			assignment = IncidentAssignments.objects.get(incident=uc)
-			priority = assignment.priority if assignment.priority else "medium"
-		except IncidentAssignments.DoesNotExist:
-			priority = "medium"
+		assignment = getattr(uc, 'assignment', None)
+		priority = assignment.priority if assignment and assignment.priority else "medium"
 		
 		data.append({
 			"case_id": uc.id,
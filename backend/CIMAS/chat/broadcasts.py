@@ -0,0 +1,42 @@
+"""
+Broadcast delivery by audience and per-user read watermarks.
+
+Broadcasts are stored once (Message.is_broadcast) and selected by
+broadcast_type for the reader's role; whether a given user has read one is
+``message.id <= BroadcastReadWatermark.last_read_id`` instead of the shared
+Message.read flag.
+"""
+from .models import BroadcastReadWatermark, Message
+from .permissions import broadcast_types_for
+
+
+def audience_broadcasts(role):
+    """Broadcasts a user with ``role`` receives (admins see every broadcast)."""
+    broadcasts = Message.objects.filter(is_broadcast=True)
+    if role in ('admin', 'superadmin'):
+        return broadcasts
+    return broadcasts.filter(broadcast_type__in=broadcast_types_for(role))
+
+
+def watermark_for(user):
+    return (
+        BroadcastReadWatermark.objects.filter(user=user).values_list('last_read_id', flat=True).first() or 0
+    )
+
+
+def request_watermark(request):
+    """watermark_for(request.user), looked up once per request."""
+    if not hasattr(request, '_broadcast_watermark'):
+        request._broadcast_watermark = watermark_for(request.user)
+    return request._broadcast_watermark
+
+
+def advance_watermark(user, message_id):
+    """Mark every broadcast up to ``message_id`` read for ``user``; never moves backwards."""
+    if not BroadcastReadWatermark.objects.filter(user=user, last_read_id__lt=message_id).update(last_read_id=message_id):
+        BroadcastReadWatermark.objects.get_or_create(user=user, defaults={'last_read_id': message_id})
+    return watermark_for(user)
+
+
+def unread_broadcast_count(user):
+    return audience_broadcasts(user.role).filter(id__gt=watermark_for(user)).count()
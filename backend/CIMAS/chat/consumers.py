@@ -0,0 +1,99 @@
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from rest_framework.exceptions import APIException, NotFound
+
+from .broadcasts import advance_watermark
+from .models import Message
+from .permissions import broadcast_types_for, check_can_access, check_can_update, new_message_fields
+
+
+def user_group(user_id):
+    return f"chat.user.{user_id}"
+
+
+def broadcast_group(broadcast_type):
+    return f"chat.broadcast.{broadcast_type or 'all'}"
+
+
+def send_to_groups(groups, event):
+    """Synchronously deliver ``event`` to every group; a no-op without a channel layer."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    send = async_to_sync(channel_layer.group_send)
+    for group in groups:
+        send(group, event)
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/chat/?token=<access token>
+
+    Server -> client:
+        {"type": "message", "message": {...MessageSerializer...}}
+        {"type": "read", "id": <message id>, "reader": <user id>}
+        {"type": "read_up_to", "reader": <user id>, "sender": <user id>, "up_to_id": <message id>}
+        {"type": "error", "detail": "..."}
+
+    Client -> server (optional, the REST endpoints keep working):
+        {"type": "message.send", "receiver": <id>, "content": "...", "is_broadcast": bool, "broadcast_type": "..."}
+        {"type": "message.read", "id": <message id>}
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.joined_groups = [user_group(self.user.id)]
+        self.joined_groups += [broadcast_group(t) for t in broadcast_types_for(self.user.role)]
+        for group in self.joined_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in getattr(self, 'joined_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        handlers = {'message.send': self.send_message, 'message.read': self.mark_read}
+        handler = handlers.get(content.get('type'))
+        if handler is None:
+            await self.send_json({"type": "error", "detail": "Unknown event type."})
+            return
+        try:
+            # Delivery back to this socket happens through chat.signals, like REST writes
+            await handler(content)
+        except APIException as exc:
+            await self.send_json({"type": "error", "detail": str(exc.detail)})
+
+    @database_sync_to_async
+    def send_message(self, content):
+        Message.objects.create(**new_message_fields(self.user, content))
+
+    @database_sync_to_async
+    def mark_read(self, content):
+        message = Message.objects.filter(id=content.get('id')).first()
+        if message is None:
+            raise NotFound("Message not found.")
+        check_can_access(self.user, message)
+        check_can_update(self.user, message)
+        if message.is_broadcast:
+            advance_watermark(self.user, message.id)
+        elif not message.read:
+            message.read = True
+            message.save(update_fields=['read', 'read_at'])
+
+    async def chat_message(self, event):
+        await self.send_json({"type": "message", "message": event["message"]})
+
+    async def chat_read(self, event):
+        await self.send_json({"type": "read", "id": event["id"], "reader": event["reader"]})
+
+    async def chat_read_up_to(self, event):
+        await self.send_json({
+            "type": "read_up_to", "reader": event["reader"], "sender": event["sender"], "up_to_id": event["up_to_id"],
+        })
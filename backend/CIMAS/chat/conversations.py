@@ -0,0 +1,101 @@
+"""
+Maintenance of the Conversation inbox summary.
+
+record_message() runs for every new direct message (chat.signals) and
+touches the two participant rows with O(1) updates; refresh_unread()
+recounts one owner's unread messages from a peer after read changes, so
+the counter cannot drift however reads are applied. forget_message()
+recomputes both rows when a message is deleted.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .consumers import send_to_groups, user_group
+from .models import Conversation, Message
+from .notifier import notifier, user_key
+
+
+def _touch_conversation(owner_id, peer_id, message, increment):
+    values = {'last_message': message, 'last_message_at': message.timestamp}
+    rows = Conversation.objects.filter(owner_id=owner_id, peer_id=peer_id)
+    if rows.update(unread_count=F('unread_count') + increment, **values):
+        return
+    try:
+        with transaction.atomic():
+            Conversation.objects.create(owner_id=owner_id, peer_id=peer_id, unread_count=increment, **values)
+    except IntegrityError:
+        # The first message of the other direction created the row concurrently
+        rows.update(unread_count=F('unread_count') + increment, **values)
+
+
+def record_message(message):
+    if message.is_broadcast or message.receiver_id is None:
+        return
+    unread = 0 if message.read else 1
+    for owner_id, peer_id, increment in (
+        (message.sender_id, message.receiver_id, 0),
+        (message.receiver_id, message.sender_id, unread),
+    ):
+        _touch_conversation(owner_id, peer_id, message, increment)
+        if owner_id == peer_id:
+            # Messages to oneself are a single conversation row
+            break
+
+
+def forget_message(message):
+    """
+    Recompute both participants' rows after ``message`` was deleted: the newest
+    remaining message and the unread count, or no row once nothing is left.
+    """
+    if message.is_broadcast or message.receiver_id is None:
+        return
+    last = (
+        Message.objects.filter(
+            Q(sender_id=message.sender_id, receiver_id=message.receiver_id)
+            | Q(sender_id=message.receiver_id, receiver_id=message.sender_id)
+        )
+        .order_by('-id')
+        .first()
+    )
+    for owner_id, peer_id in {(message.sender_id, message.receiver_id), (message.receiver_id, message.sender_id)}:
+        rows = Conversation.objects.filter(owner_id=owner_id, peer_id=peer_id)
+        if last is None:
+            rows.delete()
+        else:
+            rows.update(
+                last_message=last, last_message_at=last.timestamp, unread_count=unread_from(owner_id, peer_id)
+            )
+
+
+def unread_from(owner_id, peer_id):
+    return Message.objects.filter(sender_id=peer_id, receiver_id=owner_id, read=False).count()
+
+
+def refresh_unread(owner_id, peer_id):
+    Conversation.objects.filter(owner_id=owner_id, peer_id=peer_id).update(
+        unread_count=unread_from(owner_id, peer_id)
+    )
+
+
+def mark_conversation_read(owner_id, peer_id, up_to_id):
+    """
+    Mark every message ``peer_id`` sent to ``owner_id`` with id <= up_to_id as
+    read in one UPDATE, refresh the owner's Conversation row and tell both
+    participants. Returns (marked, unread) where unread is what is left.
+    """
+    marked = Message.objects.filter(
+        sender_id=peer_id, receiver_id=owner_id, read=False, id__lte=up_to_id
+    ).update(read=True, read_at=timezone.now())
+
+    unread = unread_from(owner_id, peer_id)
+    Conversation.objects.filter(owner_id=owner_id, peer_id=peer_id).update(unread_count=unread)
+
+    if marked:
+        # QuerySet.update() skips post_save, so push the receipt chat.signals would have sent
+        event = {"type": "chat.read_up_to", "reader": owner_id, "sender": peer_id, "up_to_id": up_to_id}
+        groups = {user_group(owner_id), user_group(peer_id)}
+        keys = [user_key(owner_id), user_key(peer_id)]
+        transaction.on_commit(lambda: send_to_groups(groups, event))
+        transaction.on_commit(lambda: notifier.notify(keys))
+    return marked, unread
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from chat.models import Conversation, Message
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Conversation inbox summaries from direct messages"
+
+    def handle(self, *args, **options):
+        # Per (sender, receiver) direction: newest message id and unread count
+        directions = (
+            Message.objects.filter(is_broadcast=False, receiver__isnull=False)
+            .order_by()
+            .values('sender_id', 'receiver_id')
+            .annotate(last_id=Max('id'), unread=Count('id', filter=Q(read=False)))
+        )
+
+        summaries = {}
+        for row in directions.iterator():
+            sender_id, receiver_id = row['sender_id'], row['receiver_id']
+            for owner_id, peer_id, unread in ((sender_id, receiver_id, 0), (receiver_id, sender_id, row['unread'])):
+                summary = summaries.setdefault((owner_id, peer_id), {'last_id': 0, 'unread': 0})
+                summary['last_id'] = max(summary['last_id'], row['last_id'])
+                summary['unread'] += unread
+                if owner_id == peer_id:
+                    break
+
+        timestamps = dict(
+            Message.objects.filter(id__in={s['last_id'] for s in summaries.values()}).values_list('id', 'timestamp')
+        )
+        with transaction.atomic():
+            Conversation.objects.all().delete()
+            Conversation.objects.bulk_create([
+                Conversation(
+                    owner_id=owner_id,
+                    peer_id=peer_id,
+                    last_message_id=summary['last_id'],
+                    last_message_at=timestamps.get(summary['last_id']),
+                    unread_count=summary['unread'],
+                )
+                for (owner_id, peer_id), summary in summaries.items()
+            ], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {len(summaries)} conversation summaries"))
@@ -22,11 +22,63 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     delivered = models.BooleanField(default=False)  # optional flag
     read = models.BooleanField(default=False)       # optional flag
+    read_at = models.DateTimeField(null=True, blank=True)  # set with read, drives "since" sync
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Inbox and conversation reads
+            models.Index(fields=['receiver', 'timestamp'], name='message_receiver_ts_idx'),
+            # Incremental sync: id > since_id on either side of a conversation
+            models.Index(fields=['receiver', 'id'], name='message_receiver_id_idx'),
+            models.Index(fields=['sender', 'id'], name='message_sender_id_idx'),
+            # Broadcasts by audience; direct messages never hit this partial index
+            models.Index(
+                fields=['broadcast_type', 'timestamp'],
+                condition=models.Q(is_broadcast=True),
+                name='message_broadcast_idx',
+            ),
+        ]
 
     def __str__(self):
         if self.is_broadcast:
             return f"[Broadcast {self.broadcast_type}] {self.sender} : {self.content[:30]}"
         return f"{self.sender} -> {self.receiver}: {self.content[:30]}"
+
+
+class Conversation(models.Model):
+    """
+    Inbox summary of a direct-message conversation, one row per participant
+    (owner) so a user's inbox is a single index range read. Maintained by
+    chat.conversations from Message writes; rebuild with backfill_conversations.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations')
+    peer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)  # messages from peer the owner has not read
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'peer'], name='unique_conversation_participants'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-last_message_at'], name='conversation_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversation of {self.owner_id} with {self.peer_id}"
+
+
+class BroadcastReadWatermark(models.Model):
+    """
+    Per-user read state for broadcasts: every broadcast with id <= last_read_id
+    counts as read by ``user``. Broadcasts stay single Message rows, so sending
+    one is O(1) writes however many users it reaches.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='broadcast_watermark')
+    last_read_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Broadcasts read by {self.user_id} up to {self.last_read_id}"
@@ -0,0 +1,79 @@
+"""
+In-process wake-ups for the long-poll endpoint (chat.views.wait_for_messages).
+
+Waiters subscribe to keys -- ("user", <id>) for their own conversations and
+("broadcast", <type>) for the broadcast audiences they receive -- and get
+their future resolved when a Message post_save (chat.signals) notifies one
+of those keys. Signals fire on request threads while waiters live on event
+loops, so wake-ups go through loop.call_soon_threadsafe.
+
+Only waiters in the same process are woken; the view re-checks the database
+every LONG_POLL_RECHECK_SECONDS so writes made by other processes are still
+picked up.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+
+def user_key(user_id):
+    return ("user", user_id)
+
+
+def broadcast_key(broadcast_type):
+    return ("broadcast", broadcast_type or "all")
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class Waiter:
+    def __init__(self, keys):
+        self.keys = keys
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+
+class MessageNotifier:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(set)
+
+    def subscribe(self, keys):
+        """Register a waiter on ``keys``; must be called from the waiting event loop."""
+        waiter = Waiter(list(keys))
+        with self._lock:
+            for key in waiter.keys:
+                self._waiters[key].add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter):
+        with self._lock:
+            for key in waiter.keys:
+                waiters = self._waiters.get(key)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[key]
+
+    def notify(self, keys):
+        """Wake every waiter subscribed to any of ``keys``. Safe from any thread."""
+        with self._lock:
+            woken = set()
+            for key in keys:
+                woken.update(self._waiters.get(key, ()))
+        for waiter in woken:
+            try:
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            except RuntimeError:
+                # The waiter's loop has already closed (request finished)
+                pass
+
+    def waiter_count(self):
+        with self._lock:
+            return len({waiter for waiters in self._waiters.values() for waiter in waiters})
+
+
+notifier = MessageNotifier()
@@ -0,0 +1,182 @@
+"""
+Chat access rules shared by the REST views and the WebSocket consumer.
+
+Both transports validate outgoing messages and read receipts here, so a
+message that the REST API would reject cannot be sent over the socket, and
+the reverse is also true.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError, PermissionDenied
+
+from incidents.models import IncidentAssignments
+from .models import Message
+
+User = get_user_model()
+
+BROADCAST_AUDIENCES = {
+    'admin': ['all', 'investigators', 'victims'],
+    'superadmin': ['all', 'investigators', 'victims'],
+    'investigator': ['all', 'investigators'],
+    'victim': ['all', 'victims'],
+}
+
+
+def broadcast_types_for(role):
+    """broadcast_type values a user with ``role`` may receive."""
+    return BROADCAST_AUDIENCES.get(role, ['all'])
+
+
+def in_broadcast_audience(role, message):
+    """Whether a user with ``role`` receives broadcast ``message`` (admins receive every broadcast)."""
+    return role in ('admin', 'superadmin') or message.broadcast_type in broadcast_types_for(role)
+
+
+def inbox_messages(user):
+    """A user's direct messages plus the broadcasts their role receives."""
+    role = user.role
+    # Admin: all messages (or only broadcasts and those sent to admin)
+    if role == 'admin':
+        return Message.objects.filter(
+            Q(receiver=user) | Q(sender=user) |
+            Q(is_broadcast=True)  # Admins see all broadcasts
+        ).select_related('sender', 'receiver').order_by('timestamp')
+    # Investigator: their messages + broadcasts for all and investigators
+    # Victim: their messages + broadcasts for all and victims
+    # Default: only direct messages + broadcasts for all
+    return Message.objects.filter(
+        Q(receiver=user) | Q(sender=user) |
+        Q(is_broadcast=True, broadcast_type__in=broadcast_types_for(role))
+    ).select_related('sender', 'receiver').order_by('timestamp')
+
+
+def contacts_cache_key(user_id):
+    return f"chat:contacts:{user_id}"
+
+
+def _compute_contact_ids(user):
+    if user.role == 'investigator':
+        # Admins who have messaged them, plus the reporters of their assigned incidents
+        admins = Message.objects.filter(
+            receiver=user, sender__role__in=['admin', 'superadmin']
+        ).order_by().values_list('sender_id', flat=True)
+        reporters = IncidentAssignments.objects.filter(assigned_to=user).exclude(
+            incident__user__role__in=['admin', 'superadmin']
+        ).order_by().values_list('incident__user_id', flat=True)
+        return frozenset(admins.union(reporters))
+    if user.role == 'victim':
+        # Investigators assigned to their incidents
+        return frozenset(
+            IncidentAssignments.objects.filter(
+                incident__user=user, assigned_to__role='investigator'
+            ).values_list('assigned_to_id', flat=True)
+        )
+    return frozenset()
+
+
+def allowed_contact_ids(user):
+    """
+    Ids of the users a non-admin ``user`` may message and whose conversation it
+    may read. Cached for CHAT_CONTACTS_CACHE_TTL seconds and invalidated by
+    chat.signals when an assignment changes or an admin first messages an
+    investigator, so a revoked contact lasts at most one TTL.
+    """
+    key = contacts_cache_key(user.id)
+    contacts = cache.get(key)
+    if contacts is None:
+        contacts = _compute_contact_ids(user)
+        cache.set(key, contacts, settings.CHAT_CONTACTS_CACHE_TTL)
+    return contacts
+
+
+def invalidate_contacts(*user_ids):
+    cache.delete_many([contacts_cache_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def _get_receiver(receiver_id):
+    try:
+        return User.objects.get(id=receiver_id)
+    except (User.DoesNotExist, ValueError, TypeError):
+        raise NotFound("Receiver not found.")
+
+
+def new_message_fields(user, data):
+    """
+    Validate a message ``user`` wants to send (receiver, content, is_broadcast,
+    broadcast_type in ``data``) and return the Message fields to save.
+    Raises PermissionDenied, NotFound or ParseError (400) with the API's error messages.
+    """
+    role = user.role
+
+    receiver_id = data.get('receiver')
+    content = (data.get('content') or '').strip()
+    is_broadcast = bool(data.get('is_broadcast', False))
+    broadcast_type = data.get('broadcast_type', 'all')
+
+    if not content:
+        raise PermissionDenied("Message content required.")
+
+    # ADMIN
+    if role == 'admin':
+        if is_broadcast:
+            if broadcast_type not in dict(Message.BROADCAST_TYPES):
+                raise ParseError(f"broadcast_type must be one of {', '.join(dict(Message.BROADCAST_TYPES))}.")
+            return {'sender': user, 'content': content, 'is_broadcast': True, 'receiver': None, 'broadcast_type': broadcast_type}
+        # admin may send to anyone: receiver must exist
+        if not receiver_id:
+            raise PermissionDenied("Receiver required for non-broadcast message.")
+        return {'sender': user, 'content': content, 'receiver': _get_receiver(receiver_id)}
+
+    # INVESTIGATOR
+    if role == 'investigator':
+        if not receiver_id:
+            raise PermissionDenied("Receiver required.")
+        receiver = _get_receiver(receiver_id)
+
+        # investigators can message admin who have messaged them or their assigned victims
+        if getattr(receiver, 'role', None) in ['admin', 'superadmin']:
+            # Check if the admin has messaged this investigator before
+            if receiver.id not in allowed_contact_ids(user):
+                raise PermissionDenied("Investigator can only message admins who have contacted them first.")
+            return {'sender': user, 'content': content, 'receiver': receiver}
+
+        # check if investigator is assigned to any incident reported by the victim
+        if receiver.id not in allowed_contact_ids(user):
+            raise PermissionDenied("Investigator can only message assigned victims or admins who contacted them.")
+        return {'sender': user, 'content': content, 'receiver': receiver}
+
+    # VICTIM
+    if role == 'victim':
+        if not receiver_id:
+            raise PermissionDenied("Receiver required.")
+        receiver = _get_receiver(receiver_id)
+
+        # victims can only message investigators assigned to their incidents
+        if getattr(receiver, 'role', None) == 'investigator':
+            if receiver.id not in allowed_contact_ids(user):
+                raise PermissionDenied("Victim can only message investigators assigned to their cases.")
+            return {'sender': user, 'content': content, 'receiver': receiver}
+
+        # Victims cannot message admins or other roles
+        raise PermissionDenied("Victim can only message investigators assigned to their cases.")
+
+    raise PermissionDenied("Cannot send message - invalid role.")
+
+
+def check_can_access(user, message):
+    # Broadcasts outside the user's audience are hidden, as in chat.broadcasts.audience_broadcasts
+    if message.is_broadcast:
+        if not in_broadcast_audience(user.role, message):
+            raise NotFound("Message not found.")
+        return
+    # User can only access messages they sent or received
+    if message.sender_id != user.id and message.receiver_id != user.id:
+        raise PermissionDenied("You don't have permission to access this message")
+
+
+def check_can_update(user, message):
+    # Only the receiver can mark a message as read
+    if message.receiver_id != user.id and not message.is_broadcast:
+        raise PermissionDenied("Only the receiver can update this message")
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Message
+from .broadcasts import request_watermark
+from .models import Conversation, Message
 
 class MessageSerializer(serializers.ModelSerializer):
     sender_email = serializers.CharField(source='sender.email', read_only=True)
@@ -11,11 +12,55 @@ class MessageSerializer(serializers.ModelSerializer):
         model = Message
         fields = ['id', 'sender', 'sender_email', 'sender_name', 'receiver', 
                   'receiver_email', 'receiver_name', 'content', 'is_broadcast', 
-                  'broadcast_type', 'timestamp', 'delivered', 'read']
-        read_only_fields = ['sender', 'timestamp', 'delivered', 'read']
+                  'broadcast_type', 'timestamp', 'delivered', 'read', 'read_at']
+        read_only_fields = ['sender', 'timestamp', 'delivered', 'read', 'read_at']
     
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        if obj.is_broadcast:
+            # Broadcast read state is per user, not the shared read flag. Views
+            # without a DRF request (the long poll) pass the watermark itself.
+            watermark = self.context.get('broadcast_watermark')
+            request = self.context.get('request')
+            if watermark is None and request is not None and request.user.is_authenticated:
+                watermark = request_watermark(request)
+            if watermark is not None:
+                data['read'] = obj.id <= watermark
+        return data
+
     def get_sender_name(self, obj):
         return f"{obj.sender.first_name} {obj.sender.last_name}" if obj.sender else None
     
     def get_receiver_name(self, obj):
         return f"{obj.receiver.first_name} {obj.receiver.last_name}" if obj.receiver else None
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    peer = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'peer', 'last_message', 'last_message_at', 'unread_count']
+
+    def get_peer(self, obj):
+        peer = obj.peer
+        return {
+            'id': peer.id,
+            'email': peer.email,
+            'first_name': peer.first_name,
+            'last_name': peer.last_name,
+            'role': peer.role,
+        }
+
+    def get_last_message(self, obj):
+        message = obj.last_message
+        if message is None:
+            return None
+        return {
+            'id': message.id,
+            'sender': message.sender_id,
+            'content': message.content,
+            'timestamp': message.timestamp,
+            'read': message.read,
+        }
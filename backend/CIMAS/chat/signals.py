@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+from django.dispatch import receiver
+
+from .consumers import broadcast_group, send_to_groups, user_group
+from .conversations import forget_message, record_message, refresh_unread
+from incidents.models import Incidents, IncidentAssignments
+from .models import Message
+from .permissions import invalidate_contacts
+from .notifier import broadcast_key, notifier, user_key
+from .serializers import MessageSerializer
+
+
+@receiver(pre_save, sender=Message)
+def stamp_read_at(sender, instance, raw=False, **kwargs):
+    # read_at follows the read flag for every writer (REST, WebSocket, admin)
+    if raw:
+        return
+    if instance.read and instance.read_at is None:
+        instance.read_at = timezone.now()
+    elif not instance.read:
+        instance.read_at = None
+
+
+@receiver(post_save, sender=Message)
+def update_conversations(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.is_broadcast:
+        return
+    if created:
+        record_message(instance)
+    else:
+        refresh_unread(instance.receiver_id, instance.sender_id)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    forget_message(instance)
+
+
+@receiver(post_save, sender=Message)
+def push_message(sender, instance, created, raw=False, **kwargs):
+    """
+    Push new messages to the sender's and receiver's sockets (or to the
+    broadcast audience) and read receipts back to the sender, once the
+    write has committed.
+    """
+    if raw:
+        return
+
+    if created:
+        if instance.is_broadcast:
+            groups = [broadcast_group(instance.broadcast_type)]
+        else:
+            groups = {user_group(instance.sender_id), user_group(instance.receiver_id)}
+        event = {"type": "chat.message", "message": MessageSerializer(instance).data}
+    elif instance.read and not instance.is_broadcast:
+        # Receipts are idempotent on the client; a repeated save of a read message just resends one
+        groups = {user_group(instance.sender_id), user_group(instance.receiver_id)}
+        event = {"type": "chat.read", "id": instance.id, "reader": instance.receiver_id}
+    else:
+        return
+
+    transaction.on_commit(lambda: send_to_groups(groups, event))
+
+
+@receiver(post_save, sender=Message)
+def wake_long_polls(sender, instance, raw=False, **kwargs):
+    # New messages and read-state changes both end a pending long poll
+    if raw:
+        return
+    if instance.is_broadcast:
+        keys = [broadcast_key(instance.broadcast_type)]
+    else:
+        keys = [user_key(instance.sender_id), user_key(instance.receiver_id)]
+    transaction.on_commit(lambda: notifier.notify(keys))
+
+
+@receiver(pre_save, sender=IncidentAssignments)
+def remember_previous_assignee(sender, instance, raw=False, **kwargs):
+    instance._previous_assigned_to_id = (
+        IncidentAssignments.objects.filter(pk=instance.pk).values_list('assigned_to_id', flat=True).first()
+        if instance.pk and not raw else None
+    )
+
+
+@receiver(post_save, sender=IncidentAssignments)
+@receiver(post_delete, sender=IncidentAssignments)
+def assignment_changed(sender, instance, **kwargs):
+    # Assignments decide who victims and investigators may chat with
+    reporter_id = Incidents.objects.filter(pk=instance.incident_id).values_list('user_id', flat=True).first()
+    invalidate_contacts(instance.assigned_to_id, reporter_id, getattr(instance, '_previous_assigned_to_id', None))
+
+
+@receiver(post_save, sender=Message)
+def admin_contacted(sender, instance, created, raw=False, **kwargs):
+    # An admin's first message lets the investigator message that admin back
+    if created and not raw and instance.receiver_id and instance.sender.role in ('admin', 'superadmin'):
+        invalidate_contacts(instance.receiver_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def admin_panel_user_changed(sender, instance, **kwargs):
+    from .views import ADMIN_PANEL_EMAIL, reset_admin_panel_user
+
+    if instance.email == ADMIN_PANEL_EMAIL:
+        reset_admin_panel_user()
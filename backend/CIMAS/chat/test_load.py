@@ -0,0 +1,217 @@
+"""
+Load test for chat polling against the local test database.
+
+Simulates victims, investigators and admins running the Messaging page:
+every 5 s the open conversation is polled (GET /api/chat/messages/?chat_with=),
+every 10 s the contact list (GET /api/chat/available-users/) and every
+conversation are refreshed, and a share of clients send a message. Time is
+simulated, so a run takes as long as the requests themselves.
+
+    CHAT_LOAD=1 python manage.py test chat.test_load
+
+It is skipped unless CHAT_LOAD is set, so the normal test run stays fast.
+Sizes and budgets come from the environment:
+
+    CHAT_LOAD_VICTIMS         victims (default 12)
+    CHAT_LOAD_INVESTIGATORS   investigators (default 3)
+    CHAT_LOAD_ADMINS          admins (default 2)
+    CHAT_LOAD_SECONDS         simulated seconds of polling (default 30)
+    CHAT_LOAD_HISTORY         existing messages per victim conversation (default 20)
+    CHAT_LOAD_SYNC            1 to poll with since_id instead of full conversations
+    CHAT_LOAD_MAX_QUERIES     fail if a poll (GET) issues more queries (default 8)
+    CHAT_LOAD_MAX_P95_MS      fail if an endpoint's p95 latency exceeds this (unset)
+    CHAT_LOAD_REPORT          write the report as JSON to this path (unset)
+
+The report (p50/p95/p99 latency, queries per request and throughput per
+endpoint) is written to stderr.
+"""
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, tag
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from incidents.models import IncidentAssignments, Incidents
+from users.models import CustomUser
+from .models import Message
+
+POLL_INTERVAL = 5       # Messaging.jsx: open conversation
+REFRESH_INTERVAL = 10   # Messaging.jsx: all conversations
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class PollingClient:
+    def __init__(self, user, contacts):
+        self.user = user
+        self.contacts = contacts
+        self.since = {contact: 0 for contact in contacts}
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+
+@tag('load')
+@skipUnless(os.environ.get('CHAT_LOAD'), "set CHAT_LOAD=1 to run the chat load test")
+class ChatPollingLoadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        victims = env_int('CHAT_LOAD_VICTIMS', 12)
+        investigators = env_int('CHAT_LOAD_INVESTIGATORS', 3)
+        admins = env_int('CHAT_LOAD_ADMINS', 2)
+        history = env_int('CHAT_LOAD_HISTORY', 20)
+
+        def make(role, count):
+            return CustomUser.objects.bulk_create([
+                CustomUser(email=f"{role}{i}@load.cimas.local", first_name=role.title(), last_name=str(i), role=role)
+                for i in range(count)
+            ])
+
+        cls.admins = make('admin', admins)
+        cls.investigators = make('investigator', investigators)
+        cls.victims = make('victim', victims)
+
+        incidents = Incidents.objects.bulk_create([
+            Incidents(user=victim, title=f"Load incident {i}", description="load test")
+            for i, victim in enumerate(cls.victims)
+        ])
+        IncidentAssignments.objects.bulk_create([
+            IncidentAssignments(incident=incident, assigned_to=cls.investigators[i % investigators])
+            for i, incident in enumerate(incidents)
+        ])
+
+        messages = []
+        for i, victim in enumerate(cls.victims):
+            investigator = cls.investigators[i % investigators]
+            for n in range(history):
+                sender, receiver = (investigator, victim) if n % 2 == 0 else (victim, investigator)
+                messages.append(Message(sender=sender, receiver=receiver, content=f"history {n}", read=n < history - 2))
+        for admin in cls.admins:
+            for investigator in cls.investigators:
+                messages.append(Message(sender=admin, receiver=investigator, content="admin check-in"))
+        Message.objects.bulk_create(messages, batch_size=1000)
+
+    def setUp(self):
+        cache.clear()
+        self.sync = os.getenv('CHAT_LOAD_SYNC') == '1'
+        self.max_queries = env_int('CHAT_LOAD_MAX_QUERIES', 8)
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+
+    def build_clients(self):
+        clients = []
+        for i, victim in enumerate(self.victims):
+            clients.append(PollingClient(victim, [self.investigators[i % len(self.investigators)].id]))
+        for j, investigator in enumerate(self.investigators):
+            assigned = [v.id for i, v in enumerate(self.victims) if i % len(self.investigators) == j]
+            clients.append(PollingClient(investigator, [a.id for a in self.admins] + assigned))
+        for admin in self.admins:
+            clients.append(PollingClient(admin, [inv.id for inv in self.investigators]))
+        return clients
+
+    def timed(self, label, call):
+        count = [0]
+
+        def count_query(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            response = call()
+            elapsed = (time.perf_counter() - start) * 1000
+        self.assertIn(response.status_code, (200, 201), f"{label}: {response.status_code} {response.content[:200]}")
+        self.latencies[label].append(elapsed)
+        self.queries[label].append(count[0])
+        return response
+
+    def poll_conversation(self, client, contact):
+        params = {"chat_with": contact}
+        if self.sync:
+            params["since_id"] = client.since[contact]
+        response = self.timed("GET messages", lambda: client.api.get("/api/chat/messages/", params))
+        if self.sync:
+            client.since[contact] = response.json()["next_since_id"]
+
+    def test_polling_load(self):
+        clients = self.build_clients()
+        seconds = env_int('CHAT_LOAD_SECONDS', 30)
+
+        started = time.perf_counter()
+        for tick in range(0, seconds, POLL_INTERVAL):
+            for n, client in enumerate(clients):
+                if tick % REFRESH_INTERVAL == 0:
+                    self.timed("GET available-users", lambda: client.api.get("/api/chat/available-users/"))
+                    for contact in client.contacts:
+                        self.poll_conversation(client, contact)
+                else:
+                    self.poll_conversation(client, client.contacts[0])
+
+                if (n + tick // POLL_INTERVAL) % 4 == 0:
+                    payload = {"receiver": client.contacts[-1], "content": f"load message at {tick}s"}
+                    self.timed("POST messages", lambda: client.api.post("/api/chat/messages/", payload, format="json"))
+        wall = time.perf_counter() - started
+
+        report = self.report(wall, len(clients), seconds)
+        for label, stats in report["endpoints"].items():
+            # Sends are reported but not budgeted: the first message between two
+            # users also creates their Conversation rows.
+            if label.startswith("GET"):
+                self.assertLessEqual(
+                    stats["max_queries"], self.max_queries,
+                    f"{label} issued {stats['max_queries']} queries in one request (budget {self.max_queries})",
+                )
+            if os.getenv('CHAT_LOAD_MAX_P95_MS'):
+                self.assertLessEqual(stats["p95_ms"], float(os.getenv('CHAT_LOAD_MAX_P95_MS')), f"{label} p95")
+
+    def report(self, wall, client_count, seconds):
+        total = sum(len(samples) for samples in self.latencies.values())
+        report = {
+            "clients": client_count,
+            "simulated_seconds": seconds,
+            "mode": "since_id" if self.sync else "full",
+            "requests": total,
+            "wall_seconds": round(wall, 3),
+            "throughput_rps": round(total / wall, 1) if wall else None,
+            "endpoints": {},
+        }
+        lines = [
+            f"\nChat polling load: {client_count} clients, {seconds}s simulated, {report['mode']} polls, "
+            f"{total} requests in {wall:.2f}s ({report['throughput_rps']} req/s)",
+            f"{'endpoint':<22}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries/req':>13}{'max q':>7}",
+        ]
+        for label, samples in sorted(self.latencies.items()):
+            queries = self.queries[label]
+            stats = {
+                "requests": len(samples),
+                "p50_ms": round(percentile(samples, 0.50), 2),
+                "p95_ms": round(percentile(samples, 0.95), 2),
+                "p99_ms": round(percentile(samples, 0.99), 2),
+                "queries_per_request": round(sum(queries) / len(queries), 2),
+                "max_queries": max(queries),
+            }
+            report["endpoints"][label] = stats
+            lines.append(
+                f"{label:<22}{stats['requests']:>9}{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+                f"{stats['queries_per_request']:>13}{stats['max_queries']:>7}"
+            )
+        sys.stderr.write("\n".join(lines) + "\n")
+
+        if os.getenv('CHAT_LOAD_REPORT'):
+            with open(os.getenv('CHAT_LOAD_REPORT'), 'w') as fh:
+                json.dump(report, fh, indent=2)
+        return report
@@ -1,3 +1,480 @@
+import asyncio
+import time
+from io import StringIO
+from unittest import mock
+
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from incidents.models import IncidentAssignments, Incidents
+from users.models import CustomUser
+from .broadcasts import advance_watermark, unread_broadcast_count
+from .conversations import _touch_conversation
+from .middleware import JWTAuthMiddleware
+from .models import Conversation, Message
+from .views import ADMIN_PANEL_EMAIL, get_admin_panel_user, reset_admin_panel_user
+from .notifier import notifier
+from .routing import websocket_urlpatterns
+
+application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+
+class ChatWebSocketTests(TestCase):
+    """Messages and read receipts are pushed to the sockets of the right users."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        incident = Incidents.objects.create(user=self.victim, title="Fake bank SMS", description="desc")
+        IncidentAssignments.objects.create(incident=incident, assigned_to=self.investigator)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(application, f"/ws/chat/?token={AccessToken.for_user(user)}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    @database_sync_to_async
+    def post_message(self, user, payload):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post("/api/chat/messages/", payload, format="json")
+
+    @database_sync_to_async
+    def mark_read(self, user, message_id):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.patch(f"/api/chat/messages/{message_id}/", {"read": True}, format="json")
+
+    async def test_rejects_anonymous_socket(self):
+        communicator = WebsocketCommunicator(application, "/ws/chat/?token=garbage")
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_direct_message_and_read_receipt(self):
+        victim_socket = await self.connect(self.victim)
+        investigator_socket = await self.connect(self.investigator)
+
+        response = await self.post_message(self.investigator, {"receiver": self.victim.id, "content": "Hello"})
+        self.assertEqual(response.status_code, 201)
+        pushed = await victim_socket.receive_json_from()
+        self.assertEqual((pushed["type"], pushed["message"]["content"]), ("message", "Hello"))
+        await investigator_socket.receive_json_from()
+
+        await self.mark_read(self.victim, pushed["message"]["id"])
+        receipt = await investigator_socket.receive_json_from()
+        self.assertEqual(receipt, {"type": "read", "id": pushed["message"]["id"], "reader": self.victim.id})
+
+        await victim_socket.disconnect()
+        await investigator_socket.disconnect()
+
+    async def test_broadcast_reaches_only_its_audience(self):
+        victim_socket = await self.connect(self.victim)
+        investigator_socket = await self.connect(self.investigator)
+
+        await self.post_message(self.admin, {"content": "Maintenance tonight", "is_broadcast": True, "broadcast_type": "victims"})
+        pushed = await victim_socket.receive_json_from()
+        self.assertEqual(pushed["message"]["content"], "Maintenance tonight")
+        self.assertTrue(await investigator_socket.receive_nothing())
+
+        await victim_socket.disconnect()
+        await investigator_socket.disconnect()
+
+    async def test_socket_send_uses_rest_rules(self):
+        victim_socket = await self.connect(self.victim)
+        await victim_socket.send_json_to({"type": "message.send", "receiver": self.admin.id, "content": "Hi admin"})
+        error = await victim_socket.receive_json_from()
+        self.assertEqual(error["type"], "error")
+        self.assertFalse(await database_sync_to_async(Message.objects.exists)())
+        await victim_socket.disconnect()
+
+
+class MessageSinceSyncTests(TestCase):
+    """GET /api/chat/messages/?since_id= returns only what changed."""
+
+    def setUp(self):
+        cache.clear()
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        incident = Incidents.objects.create(user=self.victim, title="Fake bank SMS", description="desc")
+        IncidentAssignments.objects.create(incident=incident, assigned_to=self.investigator)
+        self.client = APIClient()
+        self.client.force_authenticate(self.investigator)
+
+    def send(self, content):
+        return Message.objects.create(sender=self.investigator, receiver=self.victim, content=content)
+
+    def poll(self, **params):
+        response = self.client.get("/api/chat/messages/", {"chat_with": self.victim.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_poll_returns_new_messages_and_read_changes(self):
+        first = self.send("one")
+        body = self.poll(since_id=0)
+        self.assertEqual([m["content"] for m in body["results"]], ["one"])
+
+        empty = self.poll(since_id=body["next_since_id"], since=body["server_time"])
+        self.assertEqual((empty["results"], empty["read_updates"]), ([], []))
+
+        first.read = True
+        first.save()
+        self.send("two")
+        body = self.poll(since_id=empty["next_since_id"], since=empty["server_time"])
+        self.assertEqual([m["content"] for m in body["results"]], ["two"])
+        self.assertEqual([(u["id"], u["read"]) for u in body["read_updates"]], [(first.id, True)])
+
+    def test_page_limit(self):
+        for i in range(5):
+            self.send(f"m{i}")
+        body = self.poll(since_id=0, limit=2)
+        self.assertEqual([m["content"] for m in body["results"]], ["m0", "m1"])
+        self.assertTrue(body["has_more"])
+        body = self.poll(since_id=body["next_since_id"], limit=10)
+        self.assertEqual(len(body["results"]), 3)
+        self.assertFalse(body["has_more"])
+
+    def test_invalid_since(self):
+        response = self.client.get("/api/chat/messages/", {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+
+class LongPollTests(TestCase):
+    """GET /api/chat/messages/wait/ holds until a message arrives or it times out."""
+
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.auth = {"headers": {"authorization": f"Bearer {AccessToken.for_user(self.victim)}"}}
+
+    @database_sync_to_async
+    def send(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=self.investigator, receiver=self.victim, content=content)
+
+    async def test_requires_token(self):
+        response = await self.async_client.get("/api/chat/messages/wait/")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_times_out_without_messages(self):
+        response = await self.async_client.get("/api/chat/messages/wait/", {"timeout": "0.2"}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["timed_out"])
+
+    async def test_returns_pending_message_immediately(self):
+        message = await self.send("already here")
+        response = await self.async_client.get("/api/chat/messages/wait/", {"since_id": message.id - 1}, **self.auth)
+        self.assertEqual([m["content"] for m in response.json()["results"]], ["already here"])
+
+    async def test_broadcast_read_state_is_the_callers(self):
+        admin = await database_sync_to_async(CustomUser.objects.create_user)(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        seen = await database_sync_to_async(Message.objects.create)(
+            sender=admin, content="seen", is_broadcast=True, broadcast_type="victims"
+        )
+        await database_sync_to_async(Message.objects.create)(
+            sender=admin, content="unseen", is_broadcast=True, broadcast_type="victims"
+        )
+        await database_sync_to_async(advance_watermark)(self.victim, seen.id)
+
+        response = await self.async_client.get("/api/chat/messages/wait/", {"since_id": seen.id - 1}, **self.auth)
+        self.assertEqual([(m["content"], m["read"]) for m in response.json()["results"]], [("seen", True), ("unseen", False)])
+
+    async def test_wakes_on_new_message(self):
+        started = time.monotonic()
+        poll = asyncio.ensure_future(
+            self.async_client.get("/api/chat/messages/wait/", {"timeout": "10"}, **self.auth)
+        )
+        for _ in range(200):
+            if notifier.waiter_count():
+                break
+            await asyncio.sleep(0.01)
+        await self.send("ping")
+
+        body = (await poll).json()
+        self.assertFalse(body["timed_out"])
+        self.assertEqual([m["content"] for m in body["results"]], ["ping"])
+        self.assertLess(time.monotonic() - started, 5)
+
+
+class ConversationSummaryTests(TestCase):
+    """Conversation rows follow message writes and reads."""
+
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.victim)
+
+    def send(self, sender, receiver, content):
+        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def inbox(self):
+        response = self.client.get("/api/chat/conversations/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_follow_messages_and_reads(self):
+        first = self.send(self.investigator, self.victim, "one")
+        self.send(self.investigator, self.victim, "two")
+        self.send(self.victim, self.investigator, "reply")
+
+        inbox = self.inbox()
+        self.assertEqual(len(inbox), 1)
+        self.assertEqual(inbox[0]["peer"]["id"], self.investigator.id)
+        self.assertEqual(inbox[0]["last_message"]["content"], "reply")
+        self.assertEqual(inbox[0]["unread_count"], 2)
+        self.assertEqual(Conversation.objects.get(owner=self.investigator).unread_count, 1)
+
+        self.client.patch(f"/api/chat/messages/{first.id}/", {"read": True}, format="json")
+        self.assertEqual(self.inbox()[0]["unread_count"], 1)
+
+    def test_deleting_messages_updates_the_summary(self):
+        self.send(self.investigator, self.victim, "one")
+        second = self.send(self.investigator, self.victim, "two")
+        second.delete()
+
+        inbox = self.inbox()
+        self.assertEqual((inbox[0]["last_message"]["content"], inbox[0]["unread_count"]), ("one", 1))
+        self.assertEqual(Conversation.objects.get(owner=self.investigator).last_message.content, "one")
+
+        Message.objects.all().delete()
+        self.assertEqual(self.inbox(), [])
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_row_created_concurrently_still_gets_the_message(self):
+        message = self.send(self.investigator, self.victim, "one")
+        Conversation.objects.filter(owner=self.victim).update(unread_count=3, last_message=None)
+        # The UPDATE misses, as if the row were inserted right after it ran
+        real_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", update):
+            _touch_conversation(self.victim.id, self.investigator.id, message, 1)
+        row = Conversation.objects.get(owner=self.victim)
+        self.assertEqual((row.unread_count, row.last_message_id, len(calls)), (4, message.id, 2))
+
+    def test_backfill_matches_incremental_rows(self):
+        self.send(self.investigator, self.victim, "one")
+        self.send(self.victim, self.investigator, "reply")
+        expected = sorted(Conversation.objects.values_list("owner", "peer", "last_message", "unread_count"))
+
+        Conversation.objects.all().delete()
+        call_command("backfill_conversations", stdout=StringIO())
+        rebuilt = sorted(Conversation.objects.values_list("owner", "peer", "last_message", "unread_count"))
+        self.assertEqual(rebuilt, expected)
+
+
+class BroadcastWatermarkTests(TestCase):
+    """Broadcasts are single rows with per-user read state."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.other_victim = CustomUser.objects.create_user(
+            email="victim2@example.com", password="pw", first_name="Val", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.client = APIClient()
+
+    def broadcast(self, content, audience):
+        return Message.objects.create(sender=self.admin, content=content, is_broadcast=True, broadcast_type=audience)
+
+    def panel(self, user):
+        self.client.force_authenticate(user)
+        return [(m["content"], m["read"]) for m in self.client.get("/api/chat/admin-panel-broadcasts/").json()]
+
+    def test_audience_and_per_user_read_state(self):
+        everyone = self.broadcast("to all", "all")
+        self.broadcast("to victims", "victims")
+        self.assertEqual(self.panel(self.investigator), [("to all", False)])
+
+        self.client.force_authenticate(self.victim)
+        self.client.patch(f"/api/chat/messages/{everyone.id}/", {"read": True}, format="json")
+
+        self.assertEqual(self.panel(self.victim), [("to victims", False), ("to all", True)])
+        self.assertEqual(self.panel(self.other_victim), [("to victims", False), ("to all", False)])
+        everyone.refresh_from_db()
+        self.assertFalse(everyone.read)
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(unread_broadcast_count(self.victim), 1)
+
+    def test_unknown_broadcast_type_is_rejected(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(
+            "/api/chat/messages/", {"content": "hi", "is_broadcast": True, "broadcast_type": "everyone"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Message.objects.exists())
+
+    def test_broadcast_outside_audience_cannot_be_read(self):
+        to_victims = self.broadcast("to victims", "victims")
+        to_investigators = self.broadcast("to investigators", "investigators")
+
+        self.client.force_authenticate(self.victim)
+        response = self.client.patch(f"/api/chat/messages/{to_investigators.id}/", {"read": True}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(f"/api/chat/messages/{to_investigators.id}/").status_code, 404)
+        self.assertEqual(self.panel(self.victim), [("to victims", False)])
+        self.assertLess(to_victims.id, to_investigators.id)
+
+    def test_watermark_never_moves_back(self):
+        first = self.broadcast("one", "all")
+        second = self.broadcast("two", "all")
+        self.assertEqual(advance_watermark(self.victim, second.id), second.id)
+        self.assertEqual(advance_watermark(self.victim, first.id), second.id)
+
+
+class BulkMarkReadTests(TestCase):
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.victim)
+
+    def test_marks_up_to_id_in_one_update(self):
+        messages = [
+            Message.objects.create(sender=self.investigator, receiver=self.victim, content=f"m{i}") for i in range(4)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                "/api/chat/messages/mark-read/",
+                {"chat_with": self.investigator.id, "up_to_id": messages[2].id},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["marked"], response.json()["unread_count"]), (3, 1))
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "chat_message"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(list(Message.objects.filter(read=False).values_list("id", flat=True)), [messages[3].id])
+        self.assertEqual(Conversation.objects.get(owner=self.victim).unread_count, 1)
+
+    def test_rejects_bad_input(self):
+        response = self.client.post("/api/chat/messages/mark-read/", {"chat_with": "x"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_panel_up_to_id_is_clamped_to_visible_broadcasts(self):
+        reset_admin_panel_user()
+        self.addCleanup(reset_admin_panel_user)
+        panel = get_admin_panel_user()
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        seen = Message.objects.create(sender=admin, content="old", is_broadcast=True, broadcast_type="all")
+
+        response = self.client.post(
+            "/api/chat/messages/mark-read/", {"chat_with": panel.id, "up_to_id": seen.id + 1000}, format="json"
+        )
+        self.assertEqual((response.status_code, response.json()["up_to_id"]), (200, seen.id))
+
+        later = Message.objects.create(sender=admin, content="new", is_broadcast=True, broadcast_type="victims")
+        self.assertLess(later.id, seen.id + 1000)
+        self.assertEqual(unread_broadcast_count(self.victim), 1)
+
+        response = self.client.post(
+            "/api/chat/messages/mark-read/", {"chat_with": panel.id, "up_to_id": seen.id - 1}, format="json"
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ChatPermissionCacheTests(TestCase):
+    """The Admin Panel user and allowed contacts are cached and invalidated on change."""
+
+    def setUp(self):
+        cache.clear()
+        reset_admin_panel_user()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.incident = Incidents.objects.create(user=self.victim, title="Fake bank SMS", description="desc")
+        self.client = APIClient()
+
+    def tearDown(self):
+        reset_admin_panel_user()
+
+    def test_admin_panel_user_is_looked_up_once(self):
+        first = get_admin_panel_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_admin_panel_user(), first)
+        self.assertEqual(first.email, ADMIN_PANEL_EMAIL)
+
+    def test_assignment_changes_invalidate_contacts(self):
+        self.client.force_authenticate(self.victim)
+        payload = {"receiver": self.investigator.id, "content": "hi"}
+        self.assertEqual(self.client.post("/api/chat/messages/", payload, format="json").status_code, 403)
+
+        assignment = IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        self.assertEqual(self.client.post("/api/chat/messages/", payload, format="json").status_code, 201)
+
+        assignment.delete()
+        self.assertEqual(self.client.post("/api/chat/messages/", payload, format="json").status_code, 403)
+
+    def test_admin_message_opens_reply_path(self):
+        self.client.force_authenticate(self.investigator)
+        payload = {"receiver": self.admin.id, "content": "hello"}
+        self.assertEqual(self.client.post("/api/chat/messages/", payload, format="json").status_code, 403)
+        Message.objects.create(sender=self.admin, receiver=self.investigator, content="ping")
+        self.assertEqual(self.client.post("/api/chat/messages/", payload, format="json").status_code, 201)
 
-# Create your tests here.
+    def test_conversation_poll_is_cheap(self):
+        IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        self.client.force_authenticate(self.victim)
+        params = {"chat_with": self.investigator.id, "since_id": 0}
+        self.client.get("/api/chat/messages/", params)
+        # Other user + messages; the contact check is served from cache
+        with self.assertNumQueries(2):
+            self.client.get("/api/chat/messages/", params)
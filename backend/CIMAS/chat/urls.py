@@ -1,9 +1,15 @@
 from django.urls import path
-from .views import MessageListCreateView, AvailableUsersView, MessageDetailView, AdminPanelBroadcastsView
+from .views import (
+    MessageListCreateView, AvailableUsersView, MessageDetailView, AdminPanelBroadcastsView,
+    ConversationListView, MarkReadView, wait_for_messages,
+)
 
 urlpatterns = [
     path('api/chat/messages/', MessageListCreateView.as_view(), name='message-list-create'),
+    path('api/chat/messages/mark-read/', MarkReadView.as_view(), name='message-mark-read'),
+    path('api/chat/messages/wait/', wait_for_messages, name='message-wait'),
     path('api/chat/messages/<int:pk>/', MessageDetailView.as_view(), name='message-detail'),
+    path('api/chat/conversations/', ConversationListView.as_view(), name='conversation-list'),
     path('api/chat/available-users/', AvailableUsersView.as_view(), name='available-users'),
     path('api/chat/admin-panel-broadcasts/', AdminPanelBroadcastsView.as_view(), name='admin-panel-broadcasts'),
 ]
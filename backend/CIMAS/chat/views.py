@@ -1,12 +1,26 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied, NotFound
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, NotFound
 from rest_framework.views import APIView
-from django.db.models import Q
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db.models import Max, Q
 from django.contrib.auth import get_user_model
-from .models import Message
-from .serializers import MessageSerializer
-from incidents.models import Incidents, IncidentAssignments
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from .broadcasts import advance_watermark, audience_broadcasts, unread_broadcast_count, watermark_for
+from .conversations import mark_conversation_read
+from .models import Conversation, Message
+from .notifier import broadcast_key, notifier, user_key
+from .permissions import (
+    allowed_contact_ids, broadcast_types_for, check_can_access, check_can_update, inbox_messages,
+    new_message_fields,
+)
+from .serializers import ConversationSerializer, MessageSerializer
+from .sync import is_sync_request, parse_since_id, sync_page
 
 User = get_user_model()
 
@@ -14,8 +28,24 @@ User = get_user_model()
 ADMIN_PANEL_EMAIL = 'admin.panel@system.internal'
 
 
+# Per-process cache of the Admin Panel user; cleared by chat.signals if the row changes
+_admin_panel_user = None
+
+
 def get_admin_panel_user():
-    """Get or create the Admin Panel system user"""
+    """Get or create the Admin Panel system user (looked up once per process)"""
+    global _admin_panel_user
+    if _admin_panel_user is None:
+        _admin_panel_user = _get_or_create_admin_panel_user()
+    return _admin_panel_user
+
+
+def reset_admin_panel_user():
+    global _admin_panel_user
+    _admin_panel_user = None
+
+
+def _get_or_create_admin_panel_user():
     user, created = User.objects.get_or_create(
         email=ADMIN_PANEL_EMAIL,
         defaults={
@@ -43,26 +73,21 @@ class MessageDetailView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         message = super().get_object()
-        user = self.request.user
-        
-        # User can only access messages they sent or received
-        if message.sender != user and message.receiver != user and not message.is_broadcast:
-            raise PermissionDenied("You don't have permission to access this message")
-        
+        check_can_access(self.request.user, message)
         return message
 
     def perform_update(self, serializer):
         # Only allow updating 'read' and 'delivered' fields
         message = self.get_object()
-        user = self.request.user
-        
-        # Only the receiver can mark a message as read
-        if message.receiver != user and not message.is_broadcast:
-            raise PermissionDenied("Only the receiver can update this message")
-        
+        check_can_update(self.request.user, message)
+
         # Only allow updating read/delivered status
         allowed_fields = {'read', 'delivered'}
         update_fields = {k: v for k, v in self.request.data.items() if k in allowed_fields}
+        if message.is_broadcast and 'read' in update_fields:
+            # Reading a broadcast advances this user's watermark; the row itself is shared
+            if update_fields.pop('read'):
+                self.request._broadcast_watermark = advance_watermark(self.request.user, message.id)
         serializer.save(**update_fields)
 
 
@@ -70,6 +95,8 @@ class MessageListCreateView(generics.ListCreateAPIView):
     """
     GET: /api/messages/?chat_with=<user_id>  -> gets conversation between current user and chat_with,
          plus broadcasts (for non-chat list calls you may want separate endpoints).
+         Add since_id=<last seen id> (and since=<previous server_time>) to get only new
+         messages and read-state changes: { results, read_updates, next_since_id, has_more, server_time }
     POST: create message. Body: { receiver: <id|null>, content: "...", is_broadcast: bool (admin only) }
     """
     permission_classes = [permissions.IsAuthenticated]
@@ -89,29 +116,8 @@ class MessageListCreateView(generics.ListCreateAPIView):
 
             # Special case: If chat_with is Admin Panel, return filtered broadcasts based on user role
             if other.email == ADMIN_PANEL_EMAIL:
-                broadcasts = Message.objects.filter(
-                    is_broadcast=True
-                ).order_by('timestamp')
-                
-                # Filter based on user role and broadcast_type
-                if role == 'admin' or role == 'superadmin':
-                    # Admins can see all broadcasts
-                    pass
-                elif role == 'investigator':
-                    # Investigators can only see broadcasts for 'all' or 'investigators'
-                    broadcasts = broadcasts.filter(
-                        Q(broadcast_type='all') | Q(broadcast_type='investigators')
-                    )
-                elif role == 'victim':
-                    # Victims can only see broadcasts for 'all' or 'victims'
-                    broadcasts = broadcasts.filter(
-                        Q(broadcast_type='all') | Q(broadcast_type='victims')
-                    )
-                else:
-                    # Unknown role, show only 'all' broadcasts
-                    broadcasts = broadcasts.filter(broadcast_type='all')
-                
-                return broadcasts
+                # Broadcasts are stored once and filtered by the user's role/broadcast_type
+                return audience_broadcasts(role).select_related('sender', 'receiver').order_by('timestamp')
 
             # enforce that the current user can view this conversation
             if role == 'admin':
@@ -121,33 +127,17 @@ class MessageListCreateView(generics.ListCreateAPIView):
                 # investigator can view if other is admin who messaged them OR is one of their assigned victims
                 if other == user:
                     pass
-                elif getattr(other, 'role', None) in ['admin', 'superadmin']:
-                    # Check if admin has messaged the investigator
-                    admin_has_messaged = Message.objects.filter(
-                        sender=other,
-                        receiver=user
-                    ).exists()
-                    if not admin_has_messaged:
-                        raise PermissionDenied("Not allowed to view this conversation")
                 else:
-                    # check if the investigator is assigned to any incident reported by the victim
-                    linked = IncidentAssignments.objects.filter(
-                        assigned_to=user,
-                        incident__user=other
-                    ).exists()
-                    if not linked:
+                    # Admins who messaged them and reporters of their assigned incidents (cached)
+                    if other.id not in allowed_contact_ids(user):
                         raise PermissionDenied("Not allowed to view this conversation")
             elif role == 'victim':
                 # victim can only view conversations with their assigned investigators
                 if other == user:
                     pass
                 elif getattr(other, 'role', None) == 'investigator':
-                    # check if the other user is an investigator assigned to the victim's incidents
-                    linked = IncidentAssignments.objects.filter(
-                        incident__user=user,
-                        assigned_to=other
-                    ).exists()
-                    if not linked:
+                    # check if the other user is an investigator assigned to the victim's incidents (cached)
+                    if other.id not in allowed_contact_ids(user):
                         raise PermissionDenied("Not allowed to view this conversation")
                 else:
                     # Victims cannot view conversations with admins or other roles
@@ -157,117 +147,79 @@ class MessageListCreateView(generics.ListCreateAPIView):
 
             return Message.objects.filter(
                 Q(sender=user, receiver=other) | Q(sender=other, receiver=user)
-            ).order_by('timestamp')
+            ).select_related('sender', 'receiver').order_by('timestamp')
 
-        # If no chat_with param, maybe return messages relevant to user (inbox + broadcasts)
-        # Admin: all messages (or only broadcasts and those sent to admin)
-        if role == 'admin':
-            return Message.objects.filter(
-                Q(receiver=user) | Q(sender=user) |
-                Q(is_broadcast=True)  # Admins see all broadcasts
-            ).order_by('timestamp')
-        # Investigator: their messages + broadcasts for all and investigators
-        elif role == 'investigator':
-            return Message.objects.filter(
-                Q(receiver=user) | Q(sender=user) |
-                Q(is_broadcast=True, broadcast_type__in=['all', 'investigators'])
-            ).order_by('timestamp')
-        # Victim: their messages + broadcasts for all and victims
-        elif role == 'victim':
-            return Message.objects.filter(
-                Q(receiver=user) | Q(sender=user) |
-                Q(is_broadcast=True, broadcast_type__in=['all', 'victims'])
-            ).order_by('timestamp')
-        # Default: only direct messages + broadcasts for all
-        return Message.objects.filter(
-            Q(receiver=user) | Q(sender=user) |
-            Q(is_broadcast=True, broadcast_type='all')
-        ).order_by('timestamp')
+        # If no chat_with param, return messages relevant to user (inbox + broadcasts)
+        return inbox_messages(user)
+
+    def list(self, request, *args, **kwargs):
+        if not is_sync_request(request.query_params):
+            return super().list(request, *args, **kwargs)
+
+        try:
+            new, read_updates, meta = sync_page(self.get_queryset(), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "results": self.get_serializer(new, many=True).data,
+            "read_updates": read_updates,
+            **meta,
+        })
 
     def perform_create(self, serializer):
-        user = self.request.user
-        role = user.role
+        # Same rules as messages sent over the WebSocket (chat/permissions.py)
+        serializer.save(**new_message_fields(self.request.user, self.request.data))
 
-        receiver_id = self.request.data.get('receiver')
-        content = self.request.data.get('content', '').strip()
-        is_broadcast = bool(self.request.data.get('is_broadcast', False))
-        broadcast_type = self.request.data.get('broadcast_type', 'all')
-
-        if not content:
-            raise PermissionDenied("Message content required.")
-
-        # ADMIN
-        if role == 'admin':
-            if is_broadcast:
-                # Save the broadcast message
-                serializer.save(sender=user, is_broadcast=True, receiver=None, broadcast_type=broadcast_type)
-                return
-            # admin may send to anyone: receiver must exist
-            if not receiver_id:
-                raise PermissionDenied("Receiver required for non-broadcast message.")
-            try:
-                receiver = User.objects.get(id=receiver_id)
-            except User.DoesNotExist:
-                raise NotFound("Receiver not found.")
-            serializer.save(sender=user, receiver=receiver)
-            return
-
-        # INVESTIGATOR
-        if role == 'investigator':
-            if not receiver_id:
-                raise PermissionDenied("Receiver required.")
-            try:
-                receiver = User.objects.get(id=receiver_id)
-            except User.DoesNotExist:
-                raise NotFound("Receiver not found.")
-
-            # investigators can message admin who have messaged them or their assigned victims
-            if getattr(receiver, 'role', None) in ['admin', 'superadmin']:
-                # Check if the admin has messaged this investigator before
-                admin_has_messaged = Message.objects.filter(
-                    sender=receiver,
-                    receiver=user
-                ).exists()
-                if not admin_has_messaged:
-                    raise PermissionDenied("Investigator can only message admins who have contacted them first.")
-                serializer.save(sender=user, receiver=receiver)
-                return
-
-            # check if investigator is assigned to any incident reported by the victim
-            assigned = IncidentAssignments.objects.filter(
-                assigned_to=user,
-                incident__user=receiver
-            ).exists()
-            if not assigned:
-                raise PermissionDenied("Investigator can only message assigned victims or admins who contacted them.")
-            serializer.save(sender=user, receiver=receiver)
-            return
-
-        # VICTIM
-        if role == 'victim':
-            if not receiver_id:
-                raise PermissionDenied("Receiver required.")
-            try:
-                receiver = User.objects.get(id=receiver_id)
-            except User.DoesNotExist:
-                raise NotFound("Receiver not found.")
-
-            # victims can only message investigators assigned to their incidents
-            if getattr(receiver, 'role', None) == 'investigator':
-                # check if the receiver is an investigator assigned to the victim's incidents
-                assigned = IncidentAssignments.objects.filter(
-                    incident__user=user,
-                    assigned_to=receiver
-                ).exists()
-                if not assigned:
-                    raise PermissionDenied("Victim can only message investigators assigned to their cases.")
-                serializer.save(sender=user, receiver=receiver)
-                return
-            
-            # Victims cannot message admins or other roles
-            raise PermissionDenied("Victim can only message investigators assigned to their cases.")
-
-        raise PermissionDenied("Cannot send message - invalid role.")
+
+class MarkReadView(APIView):
+    """
+    POST: /api/chat/messages/mark-read/  Body: { chat_with: <user id>, up_to_id: <message id> }
+    Marks every message chat_with sent to the current user, up to and including
+    up_to_id, as read in one UPDATE and returns the remaining unread count.
+    With chat_with = the Admin Panel user it advances the broadcast watermark instead.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        try:
+            peer_id = int(request.data.get('chat_with'))
+            up_to_id = int(request.data.get('up_to_id'))
+        except (TypeError, ValueError):
+            return Response({"error": "chat_with and up_to_id must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        peer = User.objects.filter(id=peer_id).only('id', 'email').first()
+        if peer is None:
+            raise NotFound("User not found")
+
+        if peer.email == ADMIN_PANEL_EMAIL:
+            # Clamp to the last broadcast this user can see, so an oversized id
+            # cannot mark broadcasts that do not exist yet as read.
+            up_to_id = audience_broadcasts(user.role).filter(id__lte=up_to_id).aggregate(last=Max('id'))['last']
+            if up_to_id is None:
+                raise NotFound("No broadcast up to that id")
+            advance_watermark(user, up_to_id)
+            return Response({"chat_with": peer_id, "up_to_id": up_to_id, "unread_count": unread_broadcast_count(user)})
+
+        marked, unread = mark_conversation_read(user.id, peer_id, up_to_id)
+        return Response({"chat_with": peer_id, "up_to_id": up_to_id, "marked": marked, "unread_count": unread})
+
+
+class ConversationListView(generics.ListAPIView):
+    """
+    GET: /api/chat/conversations/
+    The current user's direct-message conversations, most recent first, with the
+    last message and unread count precomputed in Conversation (one indexed read).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ConversationSerializer
+
+    def get_queryset(self):
+        return (
+            Conversation.objects.filter(owner=self.request.user)
+            .select_related('peer', 'last_message')
+            .order_by('-last_message_at')
+        )
 
 
 class AvailableUsersView(APIView):
@@ -293,37 +245,21 @@ class AvailableUsersView(APIView):
         elif role == 'investigator':
             # Investigators can chat with:
             # 1. Admins who have messaged them (exclude Admin Panel)
-            admin_ids_who_messaged = Message.objects.filter(
-                receiver=user,
-                sender__role__in=['admin', 'superadmin']
-            ).exclude(sender__email=ADMIN_PANEL_EMAIL).values_list('sender_id', flat=True).distinct()
-            
-            admins = User.objects.filter(
-                id__in=admin_ids_who_messaged
-            ).values('id', 'email', 'first_name', 'last_name', 'role')
-            
             # 2. Victims whose incidents they're assigned to
-            assigned_victim_ids = IncidentAssignments.objects.filter(
-                assigned_to=user
-            ).values_list('incident__user_id', flat=True).distinct()
-            
-            victims = User.objects.filter(
-                id__in=assigned_victim_ids
-            ).values('id', 'email', 'first_name', 'last_name', 'role')
-
-            available_users = list(admins) + list(victims)
+            available_users = list(
+                User.objects.filter(id__in=allowed_contact_ids(user))
+                .exclude(email=ADMIN_PANEL_EMAIL)
+                .order_by('role', 'id')
+                .values('id', 'email', 'first_name', 'last_name', 'role')
+            )
 
         elif role == 'victim':
             # Victims can only chat with investigators assigned to their incidents
-            assigned_investigator_ids = IncidentAssignments.objects.filter(
-                incident__user=user
-            ).values_list('assigned_to_id', flat=True).distinct()
-            
-            investigators = User.objects.filter(
-                id__in=assigned_investigator_ids
-            ).values('id', 'email', 'first_name', 'last_name', 'role')
-
-            available_users = list(investigators)
+            available_users = list(
+                User.objects.filter(id__in=allowed_contact_ids(user))
+                .order_by('id')
+                .values('id', 'email', 'first_name', 'last_name', 'role')
+            )
 
         # Remove duplicates and add status (you can enhance this with real-time status)
         seen = set()
@@ -364,40 +300,91 @@ class AdminPanelBroadcastsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        role = getattr(user, 'role', None)
-        
-        # Get the Admin Panel system user
-        try:
-            admin_panel_user = User.objects.get(email=ADMIN_PANEL_EMAIL)
-        except User.DoesNotExist:
-            # If Admin Panel user doesn't exist, create it
-            admin_panel_user = get_admin_panel_user()
-        
-        # Get all broadcast messages (the original broadcasts, not copies)
-        broadcasts = Message.objects.filter(
-            is_broadcast=True
-        ).select_related('sender').order_by('-timestamp')
-        
-        # Filter based on user role and broadcast_type
-        if role == 'admin' or role == 'superadmin':
-            # Admins can see all broadcasts
-            pass
-        elif role == 'investigator':
-            # Investigators can only see broadcasts for 'all' or 'investigators'
-            broadcasts = broadcasts.filter(
-                Q(broadcast_type='all') | Q(broadcast_type='investigators')
-            )
-        elif role == 'victim':
-            # Victims can only see broadcasts for 'all' or 'victims'
-            broadcasts = broadcasts.filter(
-                Q(broadcast_type='all') | Q(broadcast_type='victims')
-            )
-        else:
-            # Unknown role, show only 'all' broadcasts
-            broadcasts = broadcasts.filter(broadcast_type='all')
-        
-        # Serialize and return
-        serializer = MessageSerializer(broadcasts, many=True)
+        role = getattr(request.user, 'role', None)
+
+        # The original broadcasts for the user's audience, never per-user copies
+        broadcasts = audience_broadcasts(role).select_related('sender').order_by('-timestamp')
+
+        # Serialize and return; "read" reflects this user's broadcast watermark
+        serializer = MessageSerializer(broadcasts, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+
+
+LONG_POLL_TIMEOUT = 25
+MAX_LONG_POLL_TIMEOUT = 55
+# Wake-ups are in-process; re-check the database this often for writes made elsewhere
+LONG_POLL_RECHECK_SECONDS = 5
+
+
+def _authenticate(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _poll_once(user, params):
+    new, read_updates, meta = sync_page(inbox_messages(user), params)
+    if not new and not read_updates:
+        return None
+    return {
+        # Resolved on every pass, as the user may read broadcasts while we wait
+        "results": MessageSerializer(new, many=True, context={'broadcast_watermark': watermark_for(user)}).data,
+        "read_updates": read_updates,
+        **meta,
+    }
+
+
+@require_GET
+async def wait_for_messages(request):
+    """
+    GET: /api/chat/messages/wait/?since_id=<last seen id>&since=<server_time>&timeout=<seconds>
+    Long-poll fallback for clients that cannot open the chat WebSocket. Returns as
+    soon as the caller has new inbox messages or read-state changes (same payload as
+    GET /api/chat/messages/?since_id=...), or an empty page with timed_out=true.
+    Async so a waiting request holds no worker thread under ASGI.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    params = request.GET.copy()
+    params.setdefault("since_id", "0")
+    try:
+        timeout = min(float(params.get("timeout") or LONG_POLL_TIMEOUT), MAX_LONG_POLL_TIMEOUT)
+    except ValueError:
+        return JsonResponse({"error": "timeout must be a number"}, status=400)
+
+    keys = [user_key(user.id)] + [broadcast_key(t) for t in broadcast_types_for(user.role)]
+    deadline = asyncio.get_running_loop().time() + max(timeout, 0)
+    while True:
+        # Subscribe before querying so a message committed in between still wakes us
+        waiter = notifier.subscribe(keys)
+        try:
+            try:
+                payload = await sync_to_async(_poll_once)(user, params)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
+            if payload is not None:
+                return JsonResponse({**payload, "timed_out": False})
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(waiter.future, min(remaining, LONG_POLL_RECHECK_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            notifier.unsubscribe(waiter)
+
+    return JsonResponse({
+        "results": [],
+        "read_updates": [],
+        "next_since_id": parse_since_id(params["since_id"]),
+        "has_more": False,
+        "server_time": timezone.now(),
+        "timed_out": True,
+    })
@@ -0,0 +1,73 @@
+"""
+Content-addressed evidence storage.
+
+Every uploaded file is stored once per SHA-256 as an EvidenceBlob, under
+evidence_blobs/<ab>/<cd>/<sha256><ext>. Evidence rows with the same content
+point at the same blob, and their ``file`` names its file. Re-uploading a
+screenshot to another incident therefore writes nothing new to storage.
+
+References are counted by evidence.signals whenever an Evidence row gains,
+changes or loses its blob. The last release deletes the blob and its file.
+The dedupe_evidence command moves older, per-row files into blobs and
+recounts references. Each new blob is queued for a preview (evidence/previews.py).
+"""
+import os
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EvidenceBlob
+from .previews import enqueue_preview
+
+
+def store_blob(file, metadata):
+    """
+    The EvidenceBlob holding ``file``'s content (``metadata`` as returned by
+    evidence.files.file_metadata). The file is only written when no blob with
+    that SHA-256 exists yet.
+    """
+    sha256 = metadata['sha256']
+    blob = EvidenceBlob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        if not blob.ref_count:
+            # About to gain a reference: restart the dedupe_evidence grace period
+            EvidenceBlob.objects.filter(pk=blob.pk, ref_count=0).update(created_at=timezone.now())
+        return blob
+
+    blob = EvidenceBlob(sha256=sha256, size_bytes=metadata['size_bytes'])
+    file.seek(0)
+    blob.file.save(os.path.basename(file.name), file, save=False)
+    try:
+        with transaction.atomic():
+            blob.save(force_insert=True)
+    except IntegrityError:
+        # The same content was stored concurrently: keep that copy.
+        blob.file.storage.delete(blob.file.name)
+        return EvidenceBlob.objects.get(sha256=sha256)
+    transaction.on_commit(lambda: enqueue_preview(sha256))
+    return blob
+
+
+def add_reference(blob_id):
+    EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(blob_id):
+    """Drop one reference to a blob, deleting it and its file after the last one."""
+    with transaction.atomic():
+        blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1 or blob.evidences.exists():
+            EvidenceBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+            return
+
+        storage = blob.file.storage
+        names = [blob.file.name] + ([blob.preview.name] if blob.preview else [])
+        blob.delete()
+
+        def delete_files():
+            for name in names:
+                storage.delete(name)
+        transaction.on_commit(delete_files)
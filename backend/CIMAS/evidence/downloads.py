@@ -0,0 +1,167 @@
+"""
+Authorized evidence downloads (GET /api/evidence/<eid>/download).
+
+Access is checked by Django. The bytes are sent by whichever way
+EVIDENCE_DOWNLOAD_BACKEND selects:
+
+    "nginx"     X-Accel-Redirect to EVIDENCE_ACCEL_REDIRECT_PREFIX + file name;
+                nginx serves the file (including Range requests) from an
+                ``internal`` location aliased to MEDIA_ROOT.
+    "sendfile"  X-Sendfile with the file's path (Apache mod_xsendfile, lighttpd).
+    "django"    the worker streams the file itself, honouring a single
+                ``Range: bytes=`` request so media players can seek.
+
+Evidence files never have a public URL (evidence/urls.py keeps them out of
+the media route); this endpoint is the only way to them. The stored MIME
+type is detected from the content (evidence/files.py), only images and PDFs
+may be shown inline, and every response carries ``nosniff`` and a sandbox
+CSP so an uploaded document cannot run script on the API's origin.
+"""
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from django.utils.encoding import iri_to_uri
+
+READ_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# Types a browser may render inline; SVG is left out as it can carry script
+INLINE_CONTENT_TYPES = {
+    'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/bmp', 'application/pdf',
+}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def can_download(user, evidence):
+    """Admins, the submitter, the incident's reporter and its assigned investigator."""
+    if user.is_superuser or getattr(user, 'role', None) in ('admin', 'superadmin'):
+        return True
+    incident = evidence.incident
+    if user.id in (evidence.submitted_by_id, incident.user_id):
+        return True
+    assignment = getattr(incident, 'assignment', None)
+    return assignment is not None and assignment.assigned_to_id == user.id
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single ``bytes=`` range, inclusive, or None to send the
+    whole file (no header, several ranges, or a malformed one).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if size == 0:
+        # No byte of an empty file can be addressed
+        raise RangeNotSatisfiable()
+    if not first:
+        # bytes=-N: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _read_range(fh, start, length):
+    fh.seek(start)
+    try:
+        while length > 0:
+            data = fh.read(min(READ_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fh.close()
+
+
+def _file_headers(response, content_type, filename, etag, as_attachment):
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if response['Content-Type'] not in INLINE_CONTENT_TYPES:
+        as_attachment = True
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Content-Security-Policy'] = 'sandbox'
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def file_response(request, file, size, content_type, filename, etag=None, as_attachment=True):
+    """Send a stored ``file`` through the EVIDENCE_DOWNLOAD_BACKEND."""
+    backend = settings.EVIDENCE_DOWNLOAD_BACKEND
+    name = file.name
+
+    def headers(response):
+        return _file_headers(response, content_type, filename, etag, as_attachment)
+
+    if backend == 'nginx':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = iri_to_uri(settings.EVIDENCE_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + name)
+        return headers(response)
+
+    storage = file.storage
+    if backend == 'sendfile':
+        try:
+            path = storage.path(name)
+        except NotImplementedError:
+            path = None  # not on a local disk: stream it below instead
+        if path:
+            response = HttpResponse()
+            response['X-Sendfile'] = path
+            return headers(response)
+
+    if size is None:
+        size = storage.size(name)
+    if_range = request.headers.get('If-Range')
+    try:
+        # A stale If-Range means the client's partial copy is outdated: send everything.
+        byte_range = parse_range(request.headers.get('Range'), size) if not if_range or if_range == etag else None
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    fh = storage.open(name, 'rb')
+    if byte_range is None:
+        response = FileResponse(fh)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(fh, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return headers(response)
+
+
+def evidence_file_response(request, evidence, as_attachment=True):
+    return file_response(
+        request,
+        evidence.file,
+        evidence.size_bytes,
+        evidence.content_type,
+        evidence.original_name or evidence.file.name.rsplit('/', 1)[-1],
+        etag=f'"{evidence.sha256}"' if evidence.sha256 else None,
+        as_attachment=as_attachment,
+    )
+
+
+def evidence_preview_response(request, evidence):
+    blob = evidence.blob
+    return file_response(
+        request, blob.preview, None, 'image/jpeg', 'preview.jpg', etag=f'"{blob.sha256}-preview"', as_attachment=False,
+    )
@@ -0,0 +1,85 @@
+"""
+Evidence file metadata.
+
+Size, SHA-256 and MIME type are computed once, when a file is uploaded (or by
+the backfill_evidence_metadata command for older rows), and stored on
+Evidence, so listings and totals never have to stat or read the storage.
+The MIME type is detected from the content, never taken from the client:
+only a file whose bytes are an image or a PDF is typed as one.
+The same hash picks the shared blob the file is stored in (evidence/blobs.py).
+"""
+import hashlib
+import mimetypes
+import os
+
+from PIL import Image, UnidentifiedImageError
+
+from .blobs import store_blob
+from .models import Evidence
+
+
+def detect_content_type(file, name):
+    """
+    MIME type of ``file``: images (by Pillow) and PDFs (by their magic bytes)
+    from the content, anything else from ``name``. A name alone never yields
+    an image or PDF type, since those are the types served inline.
+    """
+    file.seek(0)
+    head = file.read(5)
+    file.seek(0)
+    if head == b'%PDF-':
+        return 'application/pdf'
+    try:
+        with Image.open(file) as image:  # reads the header only
+            detected = Image.MIME.get(image.format)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        detected = None
+    file.seek(0)
+    if detected:
+        return detected
+
+    guessed = mimetypes.guess_type(name)[0]
+    if not guessed or guessed.startswith('image/') or guessed == 'application/pdf':
+        return 'application/octet-stream'
+    return guessed
+
+
+def file_metadata(file):
+    """size_bytes, sha256 and content_type of an uploaded or stored file."""
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+
+    return {
+        'size_bytes': size,
+        'sha256': digest.hexdigest(),
+        'content_type': detect_content_type(file, file.name),
+    }
+
+
+def set_evidence_file(evidence, file, metadata=None):
+    """
+    Attach ``file`` to ``evidence`` along with its metadata (not saved).
+    ``metadata`` skips reading the file when the caller already hashed it.
+    The content is stored in its blob, written only if it is new.
+    """
+    metadata = metadata or file_metadata(file)
+    blob = store_blob(file, metadata)
+    evidence.blob = blob
+    evidence.file = blob.file.name
+    evidence.original_name = os.path.basename(file.name)
+    for field, value in metadata.items():
+        setattr(evidence, field, value)
+
+
+def create_evidence(file=None, metadata=None, **fields):
+    """Evidence.objects.create() that records the file's metadata."""
+    evidence = Evidence(**fields)
+    if file:
+        set_evidence_file(evidence, file, metadata)
+    evidence.save()
+    return evidence
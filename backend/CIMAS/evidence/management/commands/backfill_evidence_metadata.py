@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from evidence.files import file_metadata
+from evidence.models import Evidence
+
+
+class Command(BaseCommand):
+    help = "Store size, SHA-256 and MIME type for evidence uploaded before they were recorded"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Evidence rows read per query')
+        parser.add_argument('--all', action='store_true', help='Recompute metadata for every evidence file')
+
+    def handle(self, *args, **options):
+        evidences = Evidence.objects.exclude(file='').exclude(file__isnull=True).order_by('evidence_id')
+        if not options['all']:
+            evidences = evidences.filter(size_bytes__isnull=True)
+
+        last_id = 0
+        updated = missing = 0
+        while True:
+            batch = list(evidences.filter(evidence_id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+
+            for evidence in batch:
+                try:
+                    with evidence.file.open('rb') as fh:
+                        metadata = file_metadata(fh)
+                except (FileNotFoundError, OSError):
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f"⚠️ Evidence {evidence.evidence_id}: {evidence.file.name} not found"))
+                    continue
+                Evidence.objects.filter(pk=evidence.pk).update(**metadata)
+                updated += 1
+
+            last_id = batch[-1].evidence_id
+            self.stdout.write(f"Checked {updated + missing} evidence files...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Stored metadata for {updated} evidence files ({missing} missing from storage)"))
@@ -0,0 +1,108 @@
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from evidence.blobs import store_blob
+from evidence.files import file_metadata
+from evidence.models import Evidence, EvidenceBlob
+
+
+class Command(BaseCommand):
+    help = "Move evidence files stored per row into shared content-addressed blobs and recount blob references"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Evidence rows read per query')
+        parser.add_argument('--recount-only', action='store_true', help='Only recount references and drop unused blobs')
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Keep unused blobs stored more recently than this: an upload may be about to reference them',
+        )
+
+    def handle(self, *args, **options):
+        if not options['recount_only']:
+            self.move_into_blobs(options['batch_size'])
+        self.recount(timezone.now() - timedelta(minutes=options['grace_minutes']))
+
+    def move_into_blobs(self, batch_size):
+        evidences = Evidence.objects.filter(blob__isnull=True).exclude(file='').exclude(file__isnull=True).order_by('evidence_id')
+
+        last_id = 0
+        moved = missing = freed = 0
+        while True:
+            batch = list(evidences.filter(evidence_id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            for evidence in batch:
+                old_name = evidence.file.name
+                storage = evidence.file.storage
+                try:
+                    with storage.open(old_name, 'rb') as fh:
+                        metadata = file_metadata(fh)
+                        duplicate = EvidenceBlob.objects.filter(sha256=metadata['sha256']).exists()
+                        blob = store_blob(File(fh, name=old_name), metadata)
+                except (FileNotFoundError, OSError):
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f"⚠️ Evidence {evidence.evidence_id}: {old_name} not found"))
+                    continue
+
+                evidence.blob = blob
+                evidence.file = blob.file.name
+                evidence.original_name = evidence.original_name or os.path.basename(old_name)
+                for field, value in metadata.items():
+                    setattr(evidence, field, value)
+                evidence.save(update_fields=['blob', 'file', 'original_name', 'size_bytes', 'sha256', 'content_type'])
+                moved += 1
+
+                if old_name != blob.file.name and not Evidence.objects.filter(file=old_name).exists():
+                    storage.delete(old_name)
+                    if duplicate:
+                        freed += metadata['size_bytes']
+
+            last_id = batch[-1].evidence_id
+            self.stdout.write(f"Checked {moved + missing} evidence files...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Moved {moved} evidence files into blobs ({missing} missing from storage, {freed} bytes of duplicate copies freed)"
+        ))
+
+    def recount(self, cutoff):
+        """
+        Fix ref_count from the actual references and delete blobs nothing
+        references. An upload stores its blob before the transaction that
+        creates the Evidence row (evidence/uploads.py), so only blobs stored
+        before ``cutoff`` are deleted, each re-checked under a row lock.
+        """
+        fixed = kept = 0
+        for blob in EvidenceBlob.objects.annotate(refs=Count('evidences')).iterator():
+            if blob.refs == 0:
+                if blob.created_at >= cutoff or not self.delete_unused(blob.pk, cutoff):
+                    kept += 1
+                    continue
+                fixed += 1
+            elif blob.refs != blob.ref_count:
+                EvidenceBlob.objects.filter(pk=blob.pk).update(ref_count=blob.refs)
+                fixed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Blob references recounted ({fixed} blobs fixed or removed, {kept} recent unused blobs kept)"
+        ))
+
+    def delete_unused(self, blob_id, cutoff):
+        with transaction.atomic():
+            blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id, created_at__lt=cutoff).first()
+            if blob is None or blob.evidences.exists():
+                return False
+            storage = blob.file.storage
+            names = [blob.file.name] + ([blob.preview.name] if blob.preview else [])
+            blob.delete()
+
+            def delete_files():
+                for name in names:
+                    storage.delete(name)
+            transaction.on_commit(delete_files)
+        return True
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from evidence.models import EvidenceBlob
+from evidence.previews import generate_preview
+
+
+class Command(BaseCommand):
+    help = "Render previews for evidence blobs that do not have one yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry blobs whose preview failed before')
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        hashes = list(EvidenceBlob.objects.filter(preview_status__in=statuses).values_list('sha256', flat=True))
+
+        for done, sha256 in enumerate(hashes, start=1):
+            generate_preview(sha256)
+            if done % 100 == 0:
+                self.stdout.write(f"Rendered {done} of {len(hashes)} previews...")
+
+        counts = {
+            status: EvidenceBlob.objects.filter(sha256__in=hashes, preview_status=status).count()
+            for status in ('ready', 'unsupported', 'failed')
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Previews processed for {len(hashes)} blobs "
+            f"({counts['ready']} ready, {counts['unsupported']} unsupported, {counts['failed']} failed)"
+        ))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from evidence.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete unfinished chunked evidence uploads and their staging files once they go stale"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=settings.EVIDENCE_UPLOAD_TTL_HOURS,
+            help='Purge uploads not touched for this many hours (default: EVIDENCE_UPLOAD_TTL_HOURS)',
+        )
+
+    def handle(self, *args, **options):
+        uploads, orphans = purge_stale_uploads(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Purged {uploads} stale uploads and {orphans} orphaned staging files"
+        ))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0006_evidence_tags'),
+        ('incidents', '0019_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evidence',
+            index=models.Index(fields=['incident', 'submitted_at'], name='evidence_incident_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:46
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0008_evidence_file_metadata'),
+        ('incidents', '0021_incidentassignments_one_per_incident'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceUpload',
+            fields=[
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('title', models.CharField(blank=True, max_length=255, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('expected_sha256', models.CharField(blank=True, max_length=64, null=True)),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('evidence', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='evidence.evidence')),
+                ('incident', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evidence_uploads', to='incidents.incidents')),
+                ('submitted_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evidence_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'evidence_upload',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:48
+
+import django.db.models.deletion
+import evidence.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0009_evidenceupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to=evidence.models.blob_upload_to)),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'evidence_blob',
+            },
+        ),
+        migrations.AddField(
+            model_name='evidence',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='evidence',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='evidences', to='evidence.evidenceblob'),
+        ),
+    ]
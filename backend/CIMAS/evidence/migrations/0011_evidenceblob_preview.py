@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:52
+
+import evidence.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0010_evidence_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenceblob',
+            name='preview',
+            field=models.FileField(blank=True, null=True, upload_to=evidence.models.preview_upload_to),
+        ),
+        migrations.AddField(
+            model_name='evidenceblob',
+            name='preview_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=12),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0011_evidenceblob_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenceupload',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,50 @@
+import os
+import uuid
+
 from django.db import models
 from incidents.models import Incidents
 from django.conf import settings
 from django.utils import timezone
 
 
+def blob_upload_to(blob, filename):
+    # evidence_blobs/ab/cd/abcd...<ext>: the name is the content's SHA-256
+    ext = os.path.splitext(filename)[1].lower()[:10]
+    return f"evidence_blobs/{blob.sha256[:2]}/{blob.sha256[2:4]}/{blob.sha256}{ext}"
+
+
+def preview_upload_to(blob, filename):
+    return f"evidence_previews/{blob.sha256[:2]}/{blob.sha256}.jpg"
+
+
+class EvidenceBlob(models.Model):
+    """
+    One stored copy of a file, shared by every Evidence row with the same
+    content (evidence/blobs.py). ref_count is the number of those rows; the
+    blob and its file are deleted when it drops to zero.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to=blob_upload_to)
+    size_bytes = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bounded-size JPEG thumbnail / first PDF page, made in the background (evidence/previews.py)
+    PREVIEW_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+    preview = models.FileField(upload_to=preview_upload_to, null=True, blank=True)
+    preview_status = models.CharField(max_length=12, choices=PREVIEW_STATUS_CHOICES, default='pending')
+
+    class Meta:
+        db_table = 'evidence_blob'
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.ref_count} refs)"
+
+
 class Evidence(models.Model):
     evidence_id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=255,default="Evidence File "+str(evidence_id))
@@ -18,13 +59,55 @@ class Evidence(models.Model):
         db_column='submitted_by'
     )
     file = models.FileField(upload_to='evidences/', null=True, blank=True)  # File upload field
+    # Uploads are stored once per content: file then names the blob's file.
+    blob = models.ForeignKey(EvidenceBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="evidences")
+    original_name = models.CharField(max_length=255, blank=True, null=True)
+    # Stored at upload time (evidence.files) so listings never stat the storage;
+    # null until backfill_evidence_metadata has run for older rows.
+    size_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, null=True)
+    content_type = models.CharField(max_length=100, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     submitted_at = models.DateTimeField(default=timezone.now)
     tags = models.CharField(max_length=255, blank=True, null=True)
 
     class Meta:
         db_table = 'evidence'
+        indexes = [
+            # Evidence of an incident in upload order (incident timeline, evidence lists)
+            models.Index(fields=['incident', 'submitted_at'], name='evidence_incident_ts_idx'),
+        ]
 
     def __str__(self):
         return f"Evidence {self.evidence_id} for Incident {self.incident_id}"
-    
\ No newline at end of file
+    
+
+class EvidenceUpload(models.Model):
+    """
+    A resumable, chunked evidence upload (evidence/uploads.py). Chunks must
+    arrive in order; the Evidence row is created when received_bytes reaches size.
+    """
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    incident = models.ForeignKey(Incidents, on_delete=models.CASCADE, related_name="evidence_uploads")
+    submitted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="evidence_uploads")
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True, null=True)
+    title = models.CharField(max_length=255, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    size = models.PositiveBigIntegerField()
+    expected_sha256 = models.CharField(max_length=64, blank=True, null=True)  # optional client checksum
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)  # set while a PUT is writing a chunk
+    evidence = models.OneToOneField(Evidence, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'evidence_upload'
+
+    @property
+    def complete(self):
+        return self.evidence_id is not None
+
+    def __str__(self):
+        return f"Upload {self.upload_id} ({self.received_bytes}/{self.size} bytes) for Incident {self.incident_id}"
@@ -0,0 +1,111 @@
+"""
+Evidence previews: a JPEG no larger than EVIDENCE_PREVIEW_SIZE pixels on its
+longest edge, made from an image or from a PDF's first page.
+
+Previews belong to the content-addressed EvidenceBlob, so a file uploaded to
+several incidents gets one preview. New blobs are queued on commit
+(evidence/blobs.py) and rendered off the request by the evidence task queue.
+The generate_evidence_previews command covers blobs stored before previews
+existed or that failed.
+
+Images are rendered with Pillow and PDFs with PyMuPDF (in requirements.txt);
+an install without PyMuPDF marks PDFs "unsupported". So are images larger than
+EVIDENCE_PREVIEW_MAX_PIXELS and, on storages without local paths, PDFs larger
+than EVIDENCE_PREVIEW_MAX_PDF_BYTES, which would otherwise be read into memory.
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError
+
+from .models import EvidenceBlob, preview_upload_to
+from .tasks import enqueue
+
+try:
+    import pymupdf as fitz
+except ImportError:  # PDF previews are skipped without it
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_preview(sha256):
+    enqueue(generate_preview, sha256)
+
+
+def _open_pdf(fh, path, file_size):
+    if path is not None:
+        return fitz.open(path, filetype='pdf')  # PyMuPDF reads pages from disk on demand
+    if file_size is None or file_size > settings.EVIDENCE_PREVIEW_MAX_PDF_BYTES:
+        return None
+    return fitz.open(stream=fh.read(), filetype='pdf')
+
+
+def _pdf_first_page(fh, size, path, file_size):
+    if fitz is None:
+        return None
+    document = _open_pdf(fh, path, file_size)
+    if document is None:
+        return None
+    with document:
+        if not document.page_count:
+            return None
+        page = document.load_page(0)
+        zoom = size / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def render_preview(fh, size, path=None, file_size=None):
+    """
+    A PIL image of at most ``size`` x ``size`` for ``fh``, or None if it has no
+    preview. ``path`` is the file's local path when the storage has one.
+    """
+    if fh.read(5) == b'%PDF-':
+        fh.seek(0)
+        image = _pdf_first_page(fh, size, path, file_size)
+    else:
+        fh.seek(0)
+        try:
+            image = Image.open(fh)
+        except UnidentifiedImageError:
+            return None
+        # open() only reads the header: refuse to decode huge images at all
+        if image.width * image.height > settings.EVIDENCE_PREVIEW_MAX_PIXELS:
+            return None
+        image.draft('RGB', (size, size))  # JPEG: decode at a reduced scale
+    if image is None:
+        return None
+    image.thumbnail((size, size))
+    return image.convert('RGB')
+
+
+def generate_preview(sha256):
+    blob = EvidenceBlob.objects.filter(pk=sha256).first()
+    if blob is None or blob.preview_status == 'ready':
+        return
+
+    try:
+        path = blob.file.path
+    except NotImplementedError:  # remote storage
+        path = None
+
+    fields = {}
+    try:
+        with blob.file.open('rb') as fh:
+            image = render_preview(fh, settings.EVIDENCE_PREVIEW_SIZE, path=path, file_size=blob.size_bytes)
+        if image is None:
+            fields['preview_status'] = 'unsupported'
+        else:
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=80, optimize=True)
+            name = blob.file.storage.save(preview_upload_to(blob, ''), ContentFile(buffer.getvalue()))
+            fields.update(preview=name, preview_status='ready')
+    except Exception:
+        logger.exception("Could not render a preview for evidence blob %s", sha256)
+        fields['preview_status'] = 'failed'
+
+    # update(), not save(): ref_count may have changed while the preview rendered
+    EvidenceBlob.objects.filter(pk=sha256).update(**fields)
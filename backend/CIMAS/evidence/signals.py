@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .blobs import add_reference, release_blob
+from .models import Evidence
+
+
+@receiver(pre_save, sender=Evidence)
+def remember_previous_blob(sender, instance, raw=False, **kwargs):
+    # post_save needs to know which blob a replaced file pointed at
+    instance._previous_blob_id = None
+    if instance.pk and not raw:
+        instance._previous_blob_id = Evidence.objects.filter(pk=instance.pk).values_list('blob_id', flat=True).first()
+
+
+@receiver(post_save, sender=Evidence)
+def count_blob_reference(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_blob_id', None)
+    if instance.blob_id == previous:
+        return
+    if instance.blob_id:
+        add_reference(instance.blob_id)
+    if previous:
+        release_blob(previous)
+
+
+@receiver(post_delete, sender=Evidence)
+def release_blob_reference(sender, instance, **kwargs):
+    if instance.blob_id:
+        release_blob(instance.blob_id)
@@ -0,0 +1,73 @@
+"""
+In-process background queue for evidence work (previews, evidence/previews.py).
+
+EVIDENCE_TASK_QUEUE names the backend class:
+
+    evidence.tasks.ThreadQueue  one daemon worker thread per process (default)
+    evidence.tasks.SyncQueue    runs each job immediately (tests, commands)
+
+Any class with an ``enqueue(func, *args)`` method can be plugged in, e.g. one
+that hands jobs to Celery or RQ. Jobs must therefore take plain, picklable
+arguments (ids, hashes), never model instances.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class SyncQueue:
+    def enqueue(self, func, *args):
+        func(*args)
+
+
+class ThreadQueue:
+    """Jobs run one at a time, in order, on a worker thread started on first use."""
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, func, *args):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="evidence-tasks", daemon=True)
+                self._worker.start()
+        self._jobs.put((func, args))
+
+    def join(self):
+        """Block until every queued job has run."""
+        self._jobs.join()
+
+    def _run(self):
+        while True:
+            func, args = self._jobs.get()
+            try:
+                func(*args)
+            except Exception:
+                logger.exception("Evidence task %s%r failed", getattr(func, '__name__', func), args)
+            finally:
+                close_old_connections()
+                self._jobs.task_done()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue():
+    path = settings.EVIDENCE_TASK_QUEUE
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = import_string(path)()
+        return _queues[path]
+
+
+def enqueue(func, *args):
+    get_queue().enqueue(func, *args)
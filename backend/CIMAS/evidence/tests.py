@@ -1,3 +1,456 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from incidents.models import IncidentAssignments, Incidents
+from users.models import CustomUser
+from . import downloads, previews, uploads
+from .blobs import store_blob
+from .tasks import ThreadQueue
+from .models import Evidence, EvidenceBlob, EvidenceUpload
+
+MEDIA_ROOT = tempfile.mkdtemp()
+UPLOAD_DIR = os.path.join(MEDIA_ROOT, "staging")
+SYNC_QUEUE = "evidence.tasks.SyncQueue"
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, EVIDENCE_TASK_QUEUE=SYNC_QUEUE)
+class EvidenceMetadataTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.incident = Incidents.objects.create(user=self.victim, title="Fake bank SMS", description="desc")
+        IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        self.client = APIClient()
+
+    def test_upload_stores_metadata(self):
+        content = b"%PDF-1.4 statement"
+        self.client.force_authenticate(self.victim)
+        response = self.client.post(
+            f"/api/incidents/{self.incident.id}/evidence",
+            {"file": SimpleUploadedFile("statement.pdf", content, content_type="application/pdf")},
+        )
+        self.assertEqual(response.status_code, 201)
+
+        evidence = Evidence.objects.get(pk=response.json()["evidence_id"])
+        self.assertEqual(evidence.size_bytes, len(content))
+        self.assertEqual(evidence.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(evidence.content_type, "application/pdf")
+
+    def test_listing_uses_stored_sizes(self):
+        # The files do not exist in storage: a listing that stat()ed them would fail.
+        Evidence.objects.create(incident=self.incident, submitted_by=self.victim, file="evidences/gone.png", size_bytes=300)
+        Evidence.objects.create(incident=self.incident, submitted_by=self.victim, file="evidences/gone.txt", size_bytes=45)
+        self.client.force_authenticate(self.investigator)
+
+        with self.assertNumQueries(2):
+            data = self.client.get("/api/evidence").json()
+        self.assertEqual(data["total_size"], 345)
+        self.assertEqual(sorted(ev["file_size"] for ev in data["evidences"]), [45, 300])
+
+    def test_backfill_command(self):
+        evidence = Evidence(incident=self.incident, submitted_by=self.victim)
+        evidence.file.save("notes.txt", ContentFile(b"call log"), save=True)
+        missing = Evidence.objects.create(incident=self.incident, submitted_by=self.victim, file="evidences/gone.jpg")
+
+        call_command("backfill_evidence_metadata", stdout=open("/dev/null", "w"))
+
+        evidence.refresh_from_db()
+        self.assertEqual(
+            (evidence.size_bytes, evidence.sha256, evidence.content_type),
+            (8, hashlib.sha256(b"call log").hexdigest(), "text/plain"),
+        )
+        missing.refresh_from_db()
+        self.assertIsNone(missing.size_bytes)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, EVIDENCE_TASK_QUEUE=SYNC_QUEUE, EVIDENCE_UPLOAD_DIR=UPLOAD_DIR)
+class ChunkedEvidenceUploadTests(TestCase):
+    data = bytes(range(256)) * 40  # 10240 bytes
+
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.incident = Incidents.objects.create(user=self.victim, title="Ransomware", description="desc")
+        self.client = APIClient()
+        self.client.force_authenticate(self.victim)
+        self.addCleanup(shutil.rmtree, UPLOAD_DIR, ignore_errors=True)
+
+    def start(self, **extra):
+        response = self.client.post(
+            f"/api/incidents/{self.incident.id}/evidence/uploads",
+            {"filename": "disk.img", "size": len(self.data), "content_type": "application/octet-stream", **extra},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return f"/api/evidence/uploads/{response.json()['upload_id']}"
+
+    def put_chunk(self, url, start, end):
+        return self.client.generic(
+            "PUT", url, self.data[start:end], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.data)}",
+        )
+
+    def test_chunks_are_assembled_into_evidence(self):
+        url = self.start(title="Disk image")
+        self.assertEqual(self.put_chunk(url, 0, 4096).json()["received_bytes"], 4096)
+
+        # A chunk at the wrong offset is refused with the offset to resume from.
+        response = self.put_chunk(url, 8192, 10240)
+        self.assertEqual((response.status_code, response.json()["received_bytes"]), (409, 4096))
+        self.assertEqual(self.client.get(url).json()["received_bytes"], 4096)
+
+        # Another process picks the upload up: the hash is rebuilt from the staged bytes.
+        uploads._hashers.clear()
+        self.assertEqual(self.put_chunk(url, 4096, 8192).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put_chunk(url, 8192, 10240)
+        self.assertEqual(response.status_code, 201)
+
+        evidence = Evidence.objects.get(pk=response.json()["evidence_id"])
+        self.assertEqual((evidence.title, evidence.size_bytes), ("Disk image", len(self.data)))
+        self.assertEqual(evidence.sha256, hashlib.sha256(self.data).hexdigest())
+        with evidence.file.open("rb") as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertEqual(os.listdir(UPLOAD_DIR), [])
+
+    def test_malformed_content_length_is_rejected(self):
+        url = self.start()
+        response = self.client.generic(
+            "PUT", url, self.data[:10], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes 0-9/{len(self.data)}", CONTENT_LENGTH="ten",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_checksum_mismatch_discards_upload(self):
+        url = self.start(sha256="0" * 64)
+        response = self.put_chunk(url, 0, len(self.data))
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(EvidenceUpload.objects.exists())
+        self.assertFalse(Evidence.objects.exists())
+        self.assertEqual(os.listdir(UPLOAD_DIR), [])
+
+    def test_chunk_is_refused_while_another_is_being_received(self):
+        url = self.start()
+        EvidenceUpload.objects.update(lease_expires_at=timezone.now() + timedelta(minutes=5))
+        response = self.put_chunk(url, 0, 4096)
+        self.assertEqual((response.status_code, response.json()["received_bytes"]), (409, 0))
+
+        # A lease left behind by a dead process expires.
+        EvidenceUpload.objects.update(lease_expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.put_chunk(url, 0, 4096).status_code, 200)
+        self.assertIsNone(EvidenceUpload.objects.get().lease_expires_at)
+
+    def test_purge_command_removes_stale_uploads(self):
+        stale_url = self.start()
+        self.put_chunk(stale_url, 0, 4096)
+        fresh_url = self.start()
+        self.put_chunk(fresh_url, 0, 4096)
+        stale_id = stale_url.rsplit("/", 1)[1]
+        EvidenceUpload.objects.filter(upload_id=stale_id).update(updated_at=timezone.now() - timedelta(days=2))
+        with open(os.path.join(UPLOAD_DIR, "orphan.part"), "wb") as fh:
+            fh.write(b"left over")
+        os.utime(os.path.join(UPLOAD_DIR, "orphan.part"), (0, 0))
+
+        call_command("purge_evidence_uploads", "--hours", "24", stdout=io.StringIO())
+        self.assertEqual(self.client.get(stale_url).status_code, 404)
+        self.assertEqual(self.client.get(fresh_url).json()["received_bytes"], 4096)
+        self.assertNotIn(uuid.UUID(stale_id), uploads._hashers)
+        self.assertEqual(os.listdir(UPLOAD_DIR), [f"{fresh_url.rsplit('/', 1)[1]}.part"])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, EVIDENCE_TASK_QUEUE=SYNC_QUEUE)
+class EvidenceBlobTests(TestCase):
+    content = b"\x89PNG same screenshot"
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.incidents = [
+            Incidents.objects.create(user=self.victim, title=f"Scam {i}", description="desc") for i in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.victim)
+
+    def upload(self, incident, name):
+        response = self.client.post(
+            f"/api/incidents/{incident.id}/evidence",
+            {"file": SimpleUploadedFile(name, self.content, content_type="image/png")},
+        )
+        return Evidence.objects.get(pk=response.json()["evidence_id"])
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(self.incidents[0], "screenshot.png")
+        second = self.upload(self.incidents[1], "copy.PNG")
+
+        blob = EvidenceBlob.objects.get()
+        self.assertEqual((first.blob, second.blob, blob.ref_count), (blob, blob, 2))
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual((first.original_name, second.original_name), ("screenshot.png", "copy.PNG"))
+
+        self.client.force_authenticate(self.admin)
+        self.client.delete(f"/api/evidence/{first.evidence_id}")
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/evidence/{second.evidence_id}")
+        self.assertFalse(EvidenceBlob.objects.exists())
+        self.assertFalse(blob.file.storage.exists(blob.file.name))
+
+    def test_dedupe_command_moves_existing_files(self):
+        legacy = []
+        for incident in self.incidents:
+            evidence = Evidence(incident=incident, submitted_by=self.victim)
+            evidence.file.save("legacy.png", ContentFile(self.content), save=True)
+            legacy.append(evidence)
+
+        call_command("dedupe_evidence", stdout=open("/dev/null", "w"))
+
+        blob = EvidenceBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        for evidence in legacy:
+            old_name = evidence.file.name
+            evidence.refresh_from_db()
+            self.assertEqual((evidence.blob, evidence.file.name), (blob, blob.file.name))
+            self.assertFalse(blob.file.storage.exists(old_name))
+        with blob.file.open("rb") as fh:
+            self.assertEqual(fh.read(), self.content)
+
+
+    def test_recount_keeps_blobs_an_upload_is_about_to_use(self):
+        # An upload in flight has stored its blob but not yet created its Evidence row.
+        metadata = {"sha256": hashlib.sha256(self.content).hexdigest(), "size_bytes": len(self.content)}
+        in_flight = store_blob(ContentFile(self.content, name="screenshot.png"), metadata)
+        stale = store_blob(ContentFile(b"abandoned", name="old.png"), {
+            "sha256": hashlib.sha256(b"abandoned").hexdigest(), "size_bytes": 9,
+        })
+        EvidenceBlob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_evidence", "--recount-only", stdout=open("/dev/null", "w"))
+
+        self.assertEqual(list(EvidenceBlob.objects.all()), [in_flight])
+        self.assertTrue(in_flight.file.storage.exists(in_flight.file.name))
+        self.assertFalse(stale.file.storage.exists(stale.file.name))
+
+        evidence = self.upload(self.incidents[0], "screenshot.png")
+        self.assertEqual(evidence.blob, in_flight)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, EVIDENCE_TASK_QUEUE=SYNC_QUEUE, EVIDENCE_DOWNLOAD_BACKEND="django")
+class EvidenceDownloadTests(TestCase):
+    content = b"0123456789" * 10
+
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.other = CustomUser.objects.create_user(
+            email="other@example.com", password="pw", first_name="Oth", last_name="Er", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        incident = Incidents.objects.create(user=self.victim, title="Sextortion", description="desc")
+        IncidentAssignments.objects.create(incident=incident, assigned_to=self.investigator)
+        self.client = APIClient()
+        self.client.force_authenticate(self.victim)
+        response = self.client.post(
+            f"/api/incidents/{incident.id}/evidence",
+            {"file": SimpleUploadedFile("call.mp4", self.content, content_type="video/mp4")},
+        )
+        self.url = f"/api/evidence/{response.json()['evidence_id']}/download"
+
+    def get(self, user, **headers):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url, headers=headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_only_people_on_the_case_can_download(self):
+        self.assertEqual(self.get(self.other)[0].status_code, 403)
+
+        response, body = self.get(self.investigator)
+        self.assertEqual((response.status_code, body), (200, self.content))
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="call.mp4"')
+
+    def test_range_requests(self):
+        response, body = self.get(self.victim, Range="bytes=10-19")
+        self.assertEqual((response.status_code, body), (206, self.content[10:20]))
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+
+        response, body = self.get(self.victim, Range="bytes=-5")
+        self.assertEqual((response.status_code, body), (206, self.content[-5:]))
+
+        response, _ = self.get(self.victim, Range="bytes=100-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */100"))
+
+        # A stale If-Range means the whole file is sent again.
+        response, body = self.get(self.victim, Range="bytes=10-19", **{"If-Range": '"stale"'})
+        self.assertEqual((response.status_code, body), (200, self.content))
+
+        # An empty file has no satisfiable range.
+        for header in ("bytes=-5", "bytes=0-"):
+            with self.assertRaises(downloads.RangeNotSatisfiable):
+                downloads.parse_range(header, 0)
+
+    @override_settings(EVIDENCE_DOWNLOAD_BACKEND="nginx", EVIDENCE_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_accel_redirect_hands_off_to_nginx(self):
+        response, body = self.get(self.victim)
+        self.assertEqual(body, b"")
+        self.assertTrue(response["X-Accel-Redirect"].startswith("/protected-media/evidence_blobs/"))
+        self.assertEqual(response["Content-Type"], "video/mp4")
+
+    def upload(self, name, content, content_type):
+        self.client.force_authenticate(self.victim)
+        incident = Incidents.objects.get(user=self.victim)
+        response = self.client.post(
+            f"/api/incidents/{incident.id}/evidence",
+            {"file": SimpleUploadedFile(name, content, content_type=content_type)},
+        )
+        return f"/api/evidence/{response.json()['evidence_id']}/download"
+
+    def test_only_images_and_pdfs_are_served_inline(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (4, 4), "red").save(buffer, format="PNG")
+        self.url = self.upload("photo.png", buffer.getvalue(), "image/png") + "?inline=1"
+        response, _ = self.get(self.victim)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Content-Disposition"], 'inline; filename="photo.png"')
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertEqual(response["Content-Security-Policy"], "sandbox")
+
+        # The client's claimed type is ignored: HTML named and typed as a PNG is a download.
+        self.url = self.upload("photo.png", b"<script>alert(1)</script>", "image/png") + "?inline=1"
+        response, _ = self.get(self.victim)
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="photo.png"')
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+        self.url = self.upload("page.html", b"<script>alert(1)</script>", "image/png") + "?inline=1"
+        response, _ = self.get(self.victim)
+        self.assertEqual(response["Content-Type"], "text/html")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="page.html"')
+        self.assertEqual(response["Content-Security-Policy"], "sandbox")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, EVIDENCE_TASK_QUEUE=SYNC_QUEUE, EVIDENCE_PREVIEW_SIZE=64)
+class EvidencePreviewTests(TestCase):
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.incident = Incidents.objects.create(user=self.victim, title="Phishing", description="desc")
+        IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        self.client = APIClient()
+
+    def upload(self, name, content, content_type):
+        self.client.force_authenticate(self.victim)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/incidents/{self.incident.id}/evidence",
+                {"file": SimpleUploadedFile(name, content, content_type=content_type)},
+            )
+        return Evidence.objects.select_related("blob").get(pk=response.json()["evidence_id"])
+
+    def test_image_preview_is_bounded_and_listed(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 400), "red").save(buffer, format="PNG")
+        evidence = self.upload("photo.png", buffer.getvalue(), "image/png")
+
+        self.assertEqual(evidence.blob.preview_status, "ready")
+        with evidence.blob.preview.open("rb") as fh, Image.open(fh) as preview:
+            self.assertEqual((preview.format, preview.size), ("JPEG", (64, 32)))
+
+        self.client.force_authenticate(self.investigator)
+        listed = self.client.get("/api/evidence").json()["evidences"][0]
+        self.assertEqual(listed["file_url"], f"/api/evidence/{evidence.evidence_id}/download")
+        self.assertEqual(listed["preview_url"], f"/api/evidence/{evidence.evidence_id}/preview")
+        response = self.client.get(listed["preview_url"])
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "image/jpeg"))
+        response.close()
+
+    def test_other_files_are_marked_unsupported(self):
+        evidence = self.upload("notes.txt", b"plain text", "text/plain")
+        self.assertEqual((evidence.blob.preview_status, bool(evidence.blob.preview)), ("unsupported", False))
+
+    @override_settings(EVIDENCE_PREVIEW_MAX_PIXELS=100_000)
+    def test_oversized_images_are_marked_unsupported(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 400), "red").save(buffer, format="PNG")
+        evidence = self.upload("huge.png", buffer.getvalue(), "image/png")
+        self.assertEqual((evidence.blob.preview_status, bool(evidence.blob.preview)), ("unsupported", False))
+
+    @skipUnless(previews.fitz, "PyMuPDF is not installed")
+    def test_pdf_preview_is_its_first_page(self):
+        document = previews.fitz.open()
+        page = document.new_page(width=600, height=300)  # points; landscape like the image test
+        page.draw_rect(page.rect, color=(1, 0, 0), fill=(1, 0, 0))
+        evidence = self.upload("statement.pdf", document.tobytes(), "application/pdf")
+        document.close()
+
+        self.assertEqual((evidence.content_type, evidence.blob.preview_status), ("application/pdf", "ready"))
+        with evidence.blob.preview.open("rb") as fh, Image.open(fh) as preview:
+            self.assertEqual((preview.format, preview.size), ("JPEG", (64, 32)))
+            red, green, blue = preview.convert("RGB").getpixel((32, 16))
+            self.assertGreater(red, 200)
+            self.assertLess(green, 60)
+
+    @override_settings(EVIDENCE_PREVIEW_MAX_PDF_BYTES=10)
+    def test_large_pdfs_without_a_local_path_are_not_read(self):
+        fh = io.BytesIO(b"%PDF-1.7 " + b"x" * 100)
+        with mock.patch.object(previews, "fitz") as fitz:
+            self.assertIsNone(previews.render_preview(fh, 64, file_size=109))
+        fitz.open.assert_not_called()
+
+        # With a local path PyMuPDF opens the file itself instead of a copy in memory.
+        fh.seek(0)
+        with mock.patch.object(previews, "fitz") as fitz:
+            fitz.open.return_value.page_count = 0
+            self.assertIsNone(previews.render_preview(fh, 64, path="/evidence/report.pdf", file_size=109))
+        fitz.open.assert_called_once_with("/evidence/report.pdf", filetype="pdf")
+
+
+class ThreadQueueTests(SimpleTestCase):
+    def test_jobs_run_in_order_on_the_worker_thread(self):
+        ran = []
+        worker = ThreadQueue()
+        for n in range(3):
+            worker.enqueue(lambda n: ran.append((n, threading.current_thread().name)), n)
+        worker.join()
+        self.assertEqual(ran, [(n, "evidence-tasks") for n in range(3)])
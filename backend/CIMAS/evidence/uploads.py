@@ -0,0 +1,247 @@
+"""
+Resumable, chunked evidence uploads.
+
+    POST   /api/incidents/<id>/evidence/uploads   {"filename", "size", ...} -> upload_id
+    PUT    /api/evidence/uploads/<upload_id>       raw bytes + Content-Range: bytes <start>-<end>/<size>
+    GET    /api/evidence/uploads/<upload_id>       how many bytes the server has (to resume)
+    DELETE /api/evidence/uploads/<upload_id>       abandon the upload
+
+Each chunk is streamed from the request straight into a staging file under
+EVIDENCE_UPLOAD_DIR, never buffered whole in memory, and fed to a SHA-256
+that is kept between requests. A PUT claims the upload with a short lease
+rather than a row lock, so no transaction stays open while a client sends a
+chunk. When the last byte arrives the staging file is streamed to the
+evidence storage and the Evidence row is created in the same transaction that
+marks the upload complete. purge_evidence_uploads removes abandoned uploads.
+
+Storage backends cannot append, which is why chunks are staged locally and
+the file reaches the storage exactly once.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .blobs import store_blob
+from .files import create_evidence, detect_content_type
+from .models import EvidenceUpload
+
+READ_SIZE = 64 * 1024
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """A rejected chunk; ``status`` is the HTTP status the API answers with."""
+
+    def __init__(self, message, status=400, received_bytes=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.received_bytes = received_bytes
+
+
+# upload_id -> (offset, hashlib.sha256 object, last used) for uploads this process has
+# hashed so far. A resumed upload served by another process rebuilds it from the
+# staging file; entries idle for EVIDENCE_UPLOAD_TTL_HOURS are dropped.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+# How long one PUT may hold an upload before another request can take it over
+CHUNK_LEASE = timedelta(minutes=15)
+
+
+def staging_path(upload):
+    return os.path.join(settings.EVIDENCE_UPLOAD_DIR, f"{upload.upload_id}.part")
+
+
+def parse_content_range(header, size):
+    """(start, length) of a ``bytes <start>-<end>/<size>`` header."""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise UploadError("Content-Range header must be 'bytes <start>-<end>/<size>'.")
+    start, end, total = (int(value) for value in match.groups())
+    if total != size:
+        raise UploadError(f"Content-Range size {total} does not match the upload size {size}.")
+    if end < start or end >= size:
+        raise UploadError("Content-Range is outside the upload.")
+    return start, end - start + 1
+
+
+def _keep_hasher(upload, hasher):
+    now = time.monotonic()
+    idle_limit = settings.EVIDENCE_UPLOAD_TTL_HOURS * 3600
+    with _hashers_lock:
+        for upload_id in [key for key, entry in _hashers.items() if now - entry[2] > idle_limit]:
+            del _hashers[upload_id]
+        _hashers[upload.upload_id] = (upload.received_bytes, hasher, now)
+
+
+def _take_hasher(upload):
+    with _hashers_lock:
+        offset, hasher, _ = _hashers.pop(upload.upload_id, (None, None, None))
+    if offset == upload.received_bytes:
+        return hasher
+
+    hasher = hashlib.sha256()
+    remaining = upload.received_bytes
+    if remaining:
+        with open(staging_path(upload), 'rb') as fh:
+            while remaining:
+                data = fh.read(min(READ_SIZE, remaining))
+                if not data:
+                    raise UploadError("Staged upload data is missing; start a new upload.", status=410)
+                hasher.update(data)
+                remaining -= len(data)
+    return hasher
+
+
+def _discard_staging(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.upload_id, None)
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def _release_lease(upload_id):
+    EvidenceUpload.objects.filter(upload_id=upload_id).update(lease_expires_at=None)
+
+
+def receive_chunk(upload_id, stream, content_range, content_length, user):
+    """
+    Append one chunk of ``upload_id`` read from ``stream``. Returns the
+    EvidenceUpload, with ``evidence`` set once the last chunk has been stored.
+    """
+    upload = EvidenceUpload.objects.filter(upload_id=upload_id, submitted_by=user).first()
+    if upload is None:
+        raise UploadError("Upload not found.", status=404)
+    if upload.complete:
+        return upload
+
+    start, length = parse_content_range(content_range, upload.size)
+    if start != upload.received_bytes:
+        raise UploadError(
+            f"Expected the chunk at offset {upload.received_bytes}.", status=409, received_bytes=upload.received_bytes
+        )
+    if length > settings.EVIDENCE_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f"Chunks may be at most {settings.EVIDENCE_UPLOAD_MAX_CHUNK_SIZE} bytes.", status=413)
+    if content_length != length:
+        raise UploadError("Content-Length does not match Content-Range.")
+
+    # Claim the upload with one UPDATE instead of holding a row lock (and a
+    # transaction) while the client sends the chunk. The lease expires in
+    # case the process dies mid-chunk.
+    now = timezone.now()
+    claimed = EvidenceUpload.objects.filter(
+        Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now),
+        upload_id=upload_id, received_bytes=start, evidence__isnull=True,
+    ).update(lease_expires_at=now + CHUNK_LEASE)
+    if not claimed:
+        raise UploadError("Another chunk of this upload is being received.", status=409, received_bytes=start)
+
+    try:
+        path = staging_path(upload)
+        if start and not os.path.exists(path):
+            raise UploadError("Staged upload data is missing; start a new upload.", status=410)
+        hasher = _take_hasher(upload)
+        os.makedirs(settings.EVIDENCE_UPLOAD_DIR, exist_ok=True)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as fh:
+            # Drop whatever an interrupted earlier attempt left past the last good byte.
+            fh.truncate(start)
+            fh.seek(start)
+            remaining = length
+            while remaining:
+                data = stream.read(min(READ_SIZE, remaining)) if stream is not None else b''
+                if not data:
+                    fh.truncate(start)
+                    raise UploadError("Request body ended before the end of the chunk.")
+                fh.write(data)
+                hasher.update(data)
+                remaining -= len(data)
+    except BaseException:
+        _release_lease(upload_id)
+        raise
+
+    upload.received_bytes = start + length
+    if upload.received_bytes < upload.size:
+        EvidenceUpload.objects.filter(upload_id=upload_id).update(
+            received_bytes=upload.received_bytes, lease_expires_at=None, updated_at=timezone.now()
+        )
+        _keep_hasher(upload, hasher)
+        return upload
+
+    sha256 = hasher.hexdigest()
+    if upload.expected_sha256 and upload.expected_sha256 != sha256:
+        abort_upload(upload)
+        raise UploadError("Uploaded data does not match the expected SHA-256; the upload was discarded.", status=422)
+    try:
+        _finalize(upload, sha256)
+    except BaseException:
+        _release_lease(upload_id)
+        raise
+    return upload
+
+
+def _finalize(upload, sha256):
+    with open(staging_path(upload), 'rb') as fh:
+        staged = File(fh, name=upload.filename)
+        metadata = {
+            'size_bytes': upload.size,
+            'sha256': sha256,
+            'content_type': detect_content_type(staged, upload.filename),  # not the client's claim
+        }
+        # Copy to storage outside the transaction; create_evidence then finds the blob.
+        # If the rows below roll back, dedupe_evidence --recount-only drops the unused blob.
+        store_blob(staged, metadata)
+        with transaction.atomic():
+            fields = {'title': upload.title} if upload.title else {}
+            evidence = create_evidence(
+                file=staged,
+                metadata=metadata,
+                incident_id=upload.incident_id,
+                submitted_by_id=upload.submitted_by_id,
+                description=upload.description or '',
+                **fields,
+            )
+            upload.evidence = evidence
+            upload.lease_expires_at = None
+            upload.save(update_fields=['received_bytes', 'evidence', 'lease_expires_at', 'updated_at'])
+            transaction.on_commit(lambda: _discard_staging(upload))
+
+
+def abort_upload(upload):
+    _discard_staging(upload)  # before delete(), which clears upload_id
+    upload.delete()
+
+
+def purge_stale_uploads(older_than):
+    """
+    Delete unfinished uploads untouched since ``older_than`` with their staging
+    files, plus staging files no upload owns any more. Returns (uploads, files).
+    """
+    stale = list(
+        EvidenceUpload.objects.filter(evidence__isnull=True, updated_at__lt=older_than)
+        .exclude(lease_expires_at__gt=timezone.now())
+    )
+    for upload in stale:
+        abort_upload(upload)
+
+    orphans = 0
+    if os.path.isdir(settings.EVIDENCE_UPLOAD_DIR):
+        live = {f"{upload_id}.part" for upload_id in EvidenceUpload.objects.values_list('upload_id', flat=True)}
+        cutoff = older_than.timestamp()
+        for entry in os.scandir(settings.EVIDENCE_UPLOAD_DIR):
+            if entry.name.endswith('.part') and entry.name not in live and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                orphans += 1
+    return len(stale), orphans
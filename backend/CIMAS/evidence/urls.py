@@ -1,14 +1,33 @@
-from django.urls import path
+import re
+
+from django.urls import path, re_path
+from django.views.static import serve
 from . import views
 from django.conf import settings
-from django.conf.urls.static import static
 
 
 urlpatterns = [
     path('api/evidence', views.user_evidence, name='user_evidence'),
 	path('api/incidents/<int:id>/evidence', views.incident_evidence, name='incident_evidence'),
 	path('api/evidence/<int:eid>', views.evidence_detail, name='evidence_detail'),
+	path('api/evidence/<int:eid>/download', views.download_evidence, name='download_evidence'),
+	path('api/evidence/<int:eid>/preview', views.evidence_preview, name='evidence_preview'),
+	path('api/incidents/<int:id>/evidence/uploads', views.start_evidence_upload, name='start_evidence_upload'),
+	path('api/evidence/uploads/<uuid:upload_id>', views.evidence_upload_detail, name='evidence_upload_detail'),
 ]
 
+# Evidence files and previews (evidence_blobs/, evidence_previews/ and legacy
+# evidences/) are never served from MEDIA_URL: only download_evidence and
+# evidence_preview, via X-Accel-Redirect/X-Sendfile to an internal location.
+PRIVATE_MEDIA_DIRS = ('evidence_blobs/', 'evidence_previews/', 'evidences/')
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += [
+        re_path(
+            r'^%s(?!%s)(?P<path>.*)$' % (
+                re.escape(settings.MEDIA_URL.lstrip('/')), '|'.join(re.escape(d) for d in PRIVATE_MEDIA_DIRS)
+            ),
+            serve,
+            {'document_root': settings.MEDIA_ROOT},
+        ),
+    ]
\ No newline at end of file
@@ -1,16 +1,33 @@
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Count, Sum
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from incidents.models import IncidentAssignments
-from .models import Evidence
+from .models import Evidence, EvidenceUpload
+from .files import create_evidence, set_evidence_file
+from .uploads import UploadError, abort_upload, receive_chunk
+from .downloads import can_download, evidence_file_response, evidence_preview_response
+from django.conf import settings
+import os
 from incidents.models import Incidents
 from django.contrib.auth import get_user_model
 import random
 
 User = get_user_model()
 
+def file_url(evidence):
+    # Evidence files are only reachable through the permission-checked download endpoint
+    return f"/api/evidence/{evidence.evidence_id}/download" if evidence.file else None
+
+
+def preview_url(evidence):
+    # Thumbnail / first-page preview, once the background worker has made it
+    blob = evidence.blob
+    return f"/api/evidence/{evidence.evidence_id}/preview" if blob is not None and blob.preview else None
+
+
 # -------------------------------
 # GET all evidence for user
 # -------------------------------
@@ -25,9 +42,10 @@ def user_evidence(request):
         pass
     elif role == 'investigator':
         assigned_incidents = IncidentAssignments.objects.filter(assigned_to=request.user).values_list('incident_id', flat=True)
-        evidences = Evidence.objects.filter(incident_id__in=assigned_incidents)
-        total_evidence = evidences.count()
-        total_size = sum(ev.file.size for ev in evidences if ev.file)
+        evidences = Evidence.objects.filter(incident_id__in=assigned_incidents).select_related('incident', 'submitted_by', 'blob')
+        totals = evidences.aggregate(count=Count('pk'), size=Sum('size_bytes'))
+        total_evidence = totals['count']
+        total_size = totals['size'] or 0
         verified_count =random.randint(0, total_evidence)
         unverified_count = total_evidence - verified_count
         unverified_count =0
@@ -42,8 +60,12 @@ def user_evidence(request):
                 "description": ev.description,
                 "submitted_at": ev.submitted_at,
                 "uploaded_by": ev.submitted_by.first_name + ' ' + ev.submitted_by.last_name if ev.submitted_by else None,
-                "file_url": ev.file.url if ev.file else None,
-                "file_size": ev.file.size if ev.file else 0,
+                "file_url": file_url(ev),
+                "download_url": file_url(ev),
+                "preview_url": preview_url(ev),
+                "file_size": ev.size_bytes or 0,
+                "content_type": ev.content_type,
+                "sha256": ev.sha256,
                 "tags": ev.tags.split(",") if ev.tags else []
             } for ev in evidences]
         })
@@ -66,7 +88,7 @@ def incident_evidence(request, id):
         if not file:
             return JsonResponse({"error": "No file uploaded"}, status=400)
 
-        evidence = Evidence.objects.create(
+        evidence = create_evidence(
             incident=incident,
             submitted_by=request.user,
             file=file,
@@ -78,7 +100,7 @@ def incident_evidence(request, id):
             "evidence_id": evidence.evidence_id,   # ✅ fixed
             "incident_id": evidence.incident.id,
             "submitted_by": request.user.email,
-            "file_url": evidence.file.url if evidence.file else None  # ✅ safe file handling
+            "file_url": file_url(evidence)  # ✅ safe file handling
         }, status=201)
 
     elif request.method == 'GET':
@@ -87,7 +109,7 @@ def incident_evidence(request, id):
             "evidence_id": ev.evidence_id,   # ✅ fixed
             "incident_id": ev.incident.id,
             "submitted_by": ev.submitted_by.email if ev.submitted_by else None,
-            "file_url": ev.file.url if ev.file else None,  # ✅ safe
+            "file_url": file_url(ev),  # ✅ safe
             "description": ev.description,
             "submitted_at": ev.submitted_at,
         } for ev in evidences]
@@ -110,7 +132,12 @@ def evidence_detail(request, eid):
             "evidence_id": evidence.evidence_id,  # ✅ fixed
             "incident_id": evidence.incident.id,
             "submitted_by": evidence.submitted_by.email if evidence.submitted_by else None,
-            "file_url": evidence.file.url if evidence.file else None,  # ✅ safe
+            "file_url": file_url(evidence),  # ✅ safe
+            "download_url": file_url(evidence),
+            "preview_url": preview_url(evidence),
+            "file_size": evidence.size_bytes,
+            "content_type": evidence.content_type,
+            "sha256": evidence.sha256,
             "description": evidence.description,
             "submitted_at": evidence.submitted_at,
         })
@@ -123,13 +150,13 @@ def evidence_detail(request, eid):
         description = request.data.get('description', evidence.description)
 
         if file:
-            evidence.file = file
+            set_evidence_file(evidence, file)
         evidence.description = description
         evidence.save()
 
         return JsonResponse({
             "message": "Evidence updated",
-            "file_url": evidence.file.url if evidence.file else None  # ✅ safe
+            "file_url": file_url(evidence)  # ✅ safe
         })
 
     elif request.method == 'DELETE':
@@ -138,3 +165,141 @@ def evidence_detail(request, eid):
 
         evidence.delete()
         return JsonResponse({"message": "Evidence deleted"})
+
+
+# -------------------------------
+# GET evidence file (submitter, reporter, assigned investigator or admin)
+# ?inline=1 to display instead of download; Range requests are supported
+# -------------------------------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_evidence(request, eid):
+    evidence = get_object_or_404(Evidence.objects.select_related('incident__assignment'), pk=eid)
+
+    if not can_download(request.user, evidence):
+        return JsonResponse({"error": "You do not have permission to download this evidence."}, status=403)
+    if not evidence.file:
+        return JsonResponse({"error": "This evidence has no file."}, status=404)
+
+    inline = request.GET.get('inline') in ('1', 'true')
+    try:
+        return evidence_file_response(request, evidence, as_attachment=not inline)
+    except FileNotFoundError:
+        return JsonResponse({"error": "Evidence file is missing from storage."}, status=404)
+
+
+# -------------------------------
+# GET evidence preview image (same people as the download)
+# -------------------------------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def evidence_preview(request, eid):
+    evidence = get_object_or_404(Evidence.objects.select_related('incident__assignment', 'blob'), pk=eid)
+
+    if not can_download(request.user, evidence):
+        return JsonResponse({"error": "You do not have permission to view this evidence."}, status=403)
+    if evidence.blob is None or not evidence.blob.preview:
+        return JsonResponse({"error": "This evidence has no preview."}, status=404)
+
+    try:
+        return evidence_preview_response(request, evidence)
+    except FileNotFoundError:
+        return JsonResponse({"error": "Evidence preview is missing from storage."}, status=404)
+
+
+# -------------------------------
+# Resumable chunked uploads (see evidence/uploads.py)
+# POST start an upload for an incident
+# -------------------------------
+def upload_payload(upload):
+    payload = {
+        "upload_id": str(upload.upload_id),
+        "incident_id": upload.incident_id,
+        "filename": upload.filename,
+        "size": upload.size,
+        "received_bytes": upload.received_bytes,
+        "chunk_size": settings.EVIDENCE_UPLOAD_CHUNK_SIZE,
+        "complete": upload.complete,
+    }
+    if upload.complete:
+        evidence = upload.evidence
+        payload.update({
+            "evidence_id": evidence.evidence_id,
+            "file_url": file_url(evidence),
+            "sha256": evidence.sha256,
+        })
+    return payload
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_evidence_upload(request, id):
+    incident = get_object_or_404(Incidents, pk=id)
+
+    filename = os.path.basename(str(request.data.get('filename') or '').replace('\\', '/'))
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+    expected_sha256 = (request.data.get('sha256') or '').lower() or None
+
+    if not filename:
+        return JsonResponse({"error": "filename is required"}, status=400)
+    if size <= 0:
+        return JsonResponse({"error": "size must be a positive number of bytes"}, status=400)
+    if size > settings.EVIDENCE_UPLOAD_MAX_SIZE:
+        return JsonResponse({"error": f"Evidence files may be at most {settings.EVIDENCE_UPLOAD_MAX_SIZE} bytes"}, status=413)
+    if expected_sha256 and len(expected_sha256) != 64:
+        return JsonResponse({"error": "sha256 must be a hex SHA-256 digest"}, status=400)
+
+    upload = EvidenceUpload.objects.create(
+        incident=incident,
+        submitted_by=request.user,
+        filename=filename,
+        size=size,
+        expected_sha256=expected_sha256,
+        content_type=request.data.get('content_type') or None,
+        title=request.data.get('title') or None,
+        description=request.data.get('description', ''),
+    )
+    return JsonResponse(upload_payload(upload), status=201)
+
+
+# -------------------------------
+# GET upload progress (to resume)
+# PUT next chunk (raw body, Content-Range: bytes <start>-<end>/<size>)
+# DELETE abandon the upload
+# -------------------------------
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def evidence_upload_detail(request, upload_id):
+    if request.method == 'PUT':
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return JsonResponse({"error": "Invalid Content-Length header"}, status=400)
+        try:
+            upload = receive_chunk(
+                upload_id,
+                request.stream,
+                request.META.get('HTTP_CONTENT_RANGE'),
+                content_length,
+                request.user,
+            )
+        except UploadError as exc:
+            body = {"error": exc.message}
+            if exc.received_bytes is not None:
+                body["received_bytes"] = exc.received_bytes
+            return JsonResponse(body, status=exc.status)
+        return JsonResponse(upload_payload(upload), status=201 if upload.complete else 200)
+
+    upload = get_object_or_404(EvidenceUpload.objects.select_related('evidence'), upload_id=upload_id, submitted_by=request.user)
+
+    if request.method == 'GET':
+        return JsonResponse(upload_payload(upload))
+
+    elif request.method == 'DELETE':
+        if upload.complete:
+            return JsonResponse({"error": "Upload already completed"}, status=409)
+        abort_upload(upload)
+        return JsonResponse({"message": "Upload cancelled"})
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from evidence.models import Evidence
+from incidents.models import Incidents, IncidentTimelineEvent
+from incidents.timeline import build_timeline_events
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized incident timeline from incidents, assignments and evidence"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Incidents rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        incidents = Incidents.objects.order_by('id').select_related('assignment__assigned_to').prefetch_related(
+            Prefetch('evidences', queryset=Evidence.objects.order_by('submitted_at'), to_attr='prefetched_evidences'),
+        )
+
+        last_id = 0
+        rebuilt = 0
+        while True:
+            batch = list(incidents.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            events = []
+            for incident in batch:
+                assignment = getattr(incident, 'assignment', None)
+                events.extend(build_timeline_events(incident, assignment, incident.prefetched_evidences, now))
+
+            with transaction.atomic():
+                IncidentTimelineEvent.objects.filter(incident__in=batch).delete()
+                IncidentTimelineEvent.objects.bulk_create(events)
+
+            rebuilt += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Rebuilt timeline for {rebuilt} incidents...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Timeline backfill completed for {rebuilt} incidents"))
@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from activity_logs.models import ActivityLog
+from chat.models import Message
+from evidence.models import Evidence
+from incidents.models import Incidents, IncidentAssignments
+from users.models import CustomUser
+
+SEED_USERS = 50
+
+
+def hot_querysets(user_id=None, incident_id=None):
+    """
+    (label, queryset, index names) for the read paths the indexes in the
+    incidents, chat, activity_logs and evidence migrations are meant to serve.
+    A plan passes when it uses one of the named indexes.
+    """
+    if user_id is None:
+        user_id = CustomUser.objects.order_by('id').values_list('id', flat=True).first() or 1
+    if incident_id is None:
+        incident_id = Incidents.objects.order_by('id').values_list('id', flat=True).first() or 1
+
+    return [
+        # in_progress is a subset of the open-incidents partial index, so either may serve it
+        (
+            'incidents by status', Incidents.objects.filter(status='in_progress'),
+            ('incidents_status_idx', 'incidents_open_reported_idx'),
+        ),
+        (
+            'incidents of a user by status', Incidents.objects.filter(user_id=user_id, status='in_progress'),
+            ('incidents_user_status_idx',),
+        ),
+        ('incident feed page', Incidents.objects.order_by('-reported_at', '-id')[:25], ('incidents_feed_keyset_idx',)),
+        (
+            'open incidents by report date', Incidents.objects.exclude(status='resolved').order_by('reported_at')[:25],
+            ('incidents_open_reported_idx',),
+        ),
+        (
+            'assignments of an investigator by deadline',
+            IncidentAssignments.objects.filter(
+                assigned_to_id=user_id, assigned_deadline__gte=timezone.now()
+            ).order_by('assigned_deadline'),
+            ('assignment_deadline_idx',),
+        ),
+        (
+            'messages received by a user', Message.objects.filter(receiver_id=user_id).order_by('timestamp'),
+            ('message_receiver_ts_idx', 'message_receiver_id_idx'),
+        ),
+        (
+            'new messages since a chat poll', Message.objects.filter(receiver_id=user_id, id__gt=0).order_by('id')[:100],
+            ('message_receiver_id_idx', 'message_receiver_ts_idx'),
+        ),
+        (
+            'broadcasts for an audience',
+            Message.objects.filter(is_broadcast=True, broadcast_type__in=['all', 'victims']).order_by('timestamp'),
+            ('message_broadcast_idx',),
+        ),
+        (
+            'activity on a record', ActivityLog.objects.filter(target_table='incidents', target_id=incident_id),
+            ('activity_log_target_idx',),
+        ),
+        (
+            'evidence of an incident', Evidence.objects.filter(incident_id=incident_id).order_by('submitted_at'),
+            ('evidence_incident_ts_idx',),
+        ),
+    ]
+
+
+def seed_plan_data(rows):
+    """
+    Bulk-insert ``rows`` incidents (and as many messages, activity log entries
+    and evidence rows) shaped like production data, so the planner sees
+    realistic selectivity: most incidents resolved, few broadcasts, data spread
+    over many users. Returns (user_id, incident_id) to EXPLAIN with.
+    """
+    now = timezone.now()
+    users = CustomUser.objects.bulk_create([
+        CustomUser(
+            email=f"plan-check-{i}@example.invalid", first_name="Plan", last_name=f"Check {i}",
+            role='investigator' if i % 5 == 0 else 'victim', password='!',
+        )
+        for i in range(SEED_USERS)
+    ])
+    incidents = Incidents.objects.bulk_create([
+        Incidents(
+            user=users[i % SEED_USERS], title=f"Plan check {i}",
+            status='resolved' if i % 20 else ('in_progress', 'assigned')[i // 20 % 2],
+            reported_at=now - timedelta(minutes=i),
+        )
+        for i in range(rows)
+    ])
+    IncidentAssignments.objects.bulk_create([
+        IncidentAssignments(
+            incident=incident, assigned_to=users[i % SEED_USERS],
+            assigned_deadline=now + timedelta(hours=12 - i % 48),
+        )
+        for i, incident in enumerate(incidents[:rows // 2])
+    ])
+    broadcast_types = [value for value, _ in Message.BROADCAST_TYPES]
+    Message.objects.bulk_create([
+        Message(
+            sender=users[i % SEED_USERS], content="plan check", is_broadcast=True,
+            broadcast_type=broadcast_types[i // 50 % len(broadcast_types)],
+        )
+        if i % 50 == 0 else
+        Message(sender=users[i % SEED_USERS], receiver=users[(i + 1) % SEED_USERS], content="plan check")
+        for i in range(rows)
+    ])
+    ActivityLog.objects.bulk_create([
+        ActivityLog(
+            user=users[i % SEED_USERS], action='update', timestamp=now,
+            target_table=('incidents', 'evidence', 'users')[i % 3], target_id=incidents[i // 3].id,
+        )
+        for i in range(rows)
+    ])
+    Evidence.objects.bulk_create([
+        Evidence(incident=incidents[i % len(incidents)], submitted_by=users[i % SEED_USERS], title=f"Plan check {i}")
+        for i in range(rows)
+    ])
+
+    with connection.cursor() as cursor:
+        for model in (CustomUser, Incidents, IncidentAssignments, Message, ActivityLog, Evidence):
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+    return users[0].id, incidents[0].id
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot query paths with the default planner settings and fail unless each uses "
+        "its index (PostgreSQL only)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-rows', type=int, default=20000,
+            help='Rows of generated data to plan against, rolled back afterwards (0: use the data as it is)',
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failing ones')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f"check_query_plans needs PostgreSQL, not {connection.vendor}")
+
+        failures = []
+        with transaction.atomic():
+            ids = {}
+            if options['seed_rows'] > 0:
+                user_id, incident_id = seed_plan_data(options['seed_rows'])
+                ids = {'user_id': user_id, 'incident_id': incident_id}
+
+            for label, queryset, index_names in hot_querysets(**ids):
+                plan = queryset.explain()
+                ok = any(name in plan for name in index_names)
+                if not ok:
+                    failures.append(label)
+                if not ok or options['verbose_plans']:
+                    self.stdout.write(f"--- {label} (expected {' or '.join(index_names)})\n{plan}")
+                self.stdout.write(f"{'✅' if ok else '❌'} {label}")
+
+            # The seeded rows (and their statistics) were only there to plan against
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query plan(s) do not use their index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("✅ Every hot query path is served by its index"))
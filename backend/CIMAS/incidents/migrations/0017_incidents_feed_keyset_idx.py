@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0016_alter_incidentassignments_assigned_deadline_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidents',
+            index=models.Index(fields=['-reported_at', '-id'], name='incidents_feed_keyset_idx'),
+        ),
+    ]
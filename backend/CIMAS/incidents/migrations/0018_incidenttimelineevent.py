@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0006_evidence_tags'),
+        ('incidents', '0017_incidents_feed_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentTimelineEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('report', 'Reported'), ('assign', 'Assigned'), ('evidence', 'Evidence Uploaded'), ('resolved', 'Resolved')], max_length=20)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('occurred_at', models.DateTimeField()),
+                ('event', models.TextField()),
+                ('evidence', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='timeline_events', to='evidence.evidence')),
+                ('incident', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_events', to='incidents.incidents')),
+            ],
+            options={
+                'db_table': 'incident_timeline_events',
+                'ordering': ['position', 'occurred_at', 'id'],
+                'indexes': [models.Index(fields=['incident', 'position', 'occurred_at'], name='timeline_incident_order_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('evidence__isnull', True)), fields=('incident', 'event_type'), name='unique_incident_milestone'), models.UniqueConstraint(fields=('evidence',), name='unique_evidence_timeline_event')],
+            },
+        ),
+    ]
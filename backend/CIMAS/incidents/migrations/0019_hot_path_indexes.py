@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0018_incidenttimelineevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidentassignments',
+            index=models.Index(fields=['assigned_to', 'assigned_deadline'], name='assignment_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidents',
+            index=models.Index(fields=['status'], name='incidents_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidents',
+            index=models.Index(fields=['user', 'status'], name='incidents_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidents',
+            index=models.Index(condition=models.Q(('status', 'resolved'), _negated=True), fields=['reported_at'], name='incidents_open_reported_idx'),
+        ),
+    ]
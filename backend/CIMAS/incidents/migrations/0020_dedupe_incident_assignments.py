@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def dedupe_assignments(apps, schema_editor):
+    """
+    Keep a single assignment per incident before incident becomes a OneToOne:
+    the oldest row that names an investigator, or the oldest row otherwise.
+    """
+    IncidentAssignments = apps.get_model('incidents', 'IncidentAssignments')
+    duplicated = (
+        IncidentAssignments.objects.values('incident_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+        .values_list('incident_id', flat=True)
+    )
+    for incident_id in list(duplicated):
+        rows = list(
+            IncidentAssignments.objects.filter(incident_id=incident_id)
+            .order_by('id')
+            .values_list('id', 'assigned_to_id')
+        )
+        keep = next((pk for pk, assigned_to_id in rows if assigned_to_id is not None), rows[0][0])
+        IncidentAssignments.objects.filter(incident_id=incident_id).exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_assignments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0020_dedupe_incident_assignments'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='incidentassignments',
+            name='incident',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='assignment', to='incidents.incidents'),
+        ),
+    ]
@@ -31,12 +31,25 @@ class Incidents(models.Model):
 
     class Meta:
         db_table = 'incidents'
+        indexes = [
+            # Keyset pagination of the incident feed walks (reported_at, id) newest first
+            models.Index(fields=['-reported_at', '-id'], name='incidents_feed_keyset_idx'),
+            # Admin/analytics status filters and the victim's own incidents by status
+            models.Index(fields=['status'], name='incidents_status_idx'),
+            models.Index(fields=['user', 'status'], name='incidents_user_status_idx'),
+            # Open (unresolved) incidents, e.g. the unassigned-cases queue
+            models.Index(
+                fields=['reported_at'],
+                condition=~models.Q(status='resolved'),
+                name='incidents_open_reported_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Incident {self.id} - {self.status}"
 
 class IncidentAssignments(models.Model):
-    incident = models.ForeignKey(Incidents, on_delete=models.CASCADE)
+    incident = models.OneToOneField(Incidents, on_delete=models.CASCADE, related_name='assignment')
     assigned_to = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -53,9 +66,71 @@ class IncidentAssignments(models.Model):
     resolved_at = models.DateTimeField(default=timezone.now()+timezone.timedelta(days=7),null=True)
     assigned_deadline = models.DateTimeField(default=timezone.now()+timezone.timedelta(days=7),null=True)
 
+    class Meta:
+        indexes = [
+            # Investigator dashboards: "my cases" ordered/filtered by deadline
+            models.Index(fields=['assigned_to', 'assigned_deadline'], name='assignment_deadline_idx'),
+        ]
 
 
     def __str__(self):
         return f"{self.incident} assigned at {self.assigned_at}"
 
 
+def stamp_resolution(incident):
+    """
+    Record the moment an incident is resolved on its assignment. Call before
+    saving the incident's new status so resolution-time analytics measure
+    resolved_at - assigned_at against the real resolution time.
+    """
+    assignment = IncidentAssignments.objects.filter(incident=incident).first()
+    if assignment is not None:
+        assignment.resolved_at = timezone.now()
+        assignment.save(update_fields=['resolved_at'])
+
+
+
+
+class IncidentTimelineEvent(models.Model):
+    """
+    Materialized incident history shown in the incident feed. Rows are kept in
+    sync by the signal handlers in incidents/signals.py and can be rebuilt with
+    the backfill_timeline management command.
+    """
+    EVENT_TYPES = [
+        ("report", "Reported"),
+        ("assign", "Assigned"),
+        ("evidence", "Evidence Uploaded"),
+        ("resolved", "Resolved"),
+    ]
+
+    incident = models.ForeignKey(Incidents, on_delete=models.CASCADE, related_name="timeline_events")
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    position = models.PositiveSmallIntegerField()  # report < assign < evidence < resolved
+    evidence = models.ForeignKey(
+        'evidence.Evidence',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="timeline_events"
+    )
+    occurred_at = models.DateTimeField()
+    event = models.TextField()
+
+    class Meta:
+        db_table = 'incident_timeline_events'
+        ordering = ['position', 'occurred_at', 'id']
+        indexes = [
+            models.Index(fields=['incident', 'position', 'occurred_at'], name='timeline_incident_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['incident', 'event_type'],
+                condition=models.Q(evidence__isnull=True),
+                name='unique_incident_milestone',
+            ),
+            models.UniqueConstraint(fields=['evidence'], name='unique_evidence_timeline_event'),
+        ]
+
+    def __str__(self):
+        return f"{self.incident} {self.event_type} at {self.occurred_at}"
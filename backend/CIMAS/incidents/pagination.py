@@ -0,0 +1,101 @@
+import base64
+import binascii
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(incident):
+    """Opaque cursor pointing just past ``incident`` in (reported_at, id) order."""
+    raw = f"{incident.reported_at.isoformat()}|{incident.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        reported_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(reported_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_page_size(value):
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _parse_bound(value, end_of_day=False):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def apply_feed_filters(incidents, params):
+    """
+    Narrow the incident queryset with the feed's query parameters:
+    status (comma separated), crime_type (id or name), city,
+    reported_after and reported_before (date or ISO datetime).
+    """
+    status = params.get("status")
+    if status:
+        incidents = incidents.filter(status__in=[s.strip() for s in status.split(",") if s.strip()])
+
+    crime_type = params.get("crime_type")
+    if crime_type:
+        if crime_type.isdigit():
+            incidents = incidents.filter(crime_type_id=int(crime_type))
+        else:
+            incidents = incidents.filter(crime_type__crime_type_name__iexact=crime_type)
+
+    city = params.get("city")
+    if city:
+        incidents = incidents.filter(location__city__iexact=city)
+
+    reported_after = params.get("reported_after")
+    if reported_after:
+        incidents = incidents.filter(reported_at__gte=_parse_bound(reported_after))
+
+    reported_before = params.get("reported_before")
+    if reported_before:
+        incidents = incidents.filter(reported_at__lte=_parse_bound(reported_before, end_of_day=True))
+
+    return incidents
+
+
+def keyset_page(incidents, cursor, page_size):
+    """
+    Return (page, next_cursor) for incidents ordered newest first. The cursor is
+    applied as a WHERE clause on (reported_at, id), so deep pages cost the same
+    as the first one.
+    """
+    incidents = incidents.order_by("-reported_at", "-id")
+    if cursor:
+        reported_at, pk = decode_cursor(cursor)
+        # The plain reported_at__lte bound lets the planner range-scan the index;
+        # the OR only breaks ties inside it.
+        incidents = incidents.filter(reported_at__lte=reported_at).filter(
+            Q(reported_at__lt=reported_at) | Q(reported_at=reported_at, id__lt=pk)
+        )
+
+    page = list(incidents[:page_size + 1])
+    if len(page) > page_size:
+        page = page[:page_size]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from evidence.models import Evidence
+from .models import Incidents, IncidentAssignments, IncidentTimelineEvent
+from . import timeline
+
+
+@receiver(post_save, sender=Incidents)
+def incident_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    timeline.sync_report_event(instance)
+    timeline.sync_resolved_event(instance, timeline.current_assignment(instance))
+
+
+@receiver(post_save, sender=IncidentAssignments)
+def assignment_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    incident = instance.incident
+    assignment = timeline.current_assignment(incident)
+    timeline.sync_assign_event(incident, assignment)
+    timeline.sync_resolved_event(incident, assignment)
+
+
+@receiver(post_delete, sender=IncidentAssignments)
+def assignment_deleted(sender, instance, **kwargs):
+    # Only ever clear or rewrite rows here: when the incident itself is being
+    # deleted its assignments go first, and a freshly inserted timeline row
+    # would then block the incident delete.
+    IncidentTimelineEvent.objects.filter(
+        incident_id=instance.incident_id, event_type="assign", evidence=None
+    ).delete()
+
+
+@receiver(post_save, sender=Evidence)
+def evidence_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    timeline.sync_evidence_event(instance)
@@ -1,3 +1,197 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from awareness.models import CrimeTypes
+from evidence.models import Evidence
+from users.models import CustomUser
+from .management.commands.check_query_plans import hot_querysets, seed_plan_data
+from .models import Incidents, IncidentAssignments, IncidentTimelineEvent, Locations
+
+
+class IncidentFeedQueryCountTests(TestCase):
+    """GET /api/incidents must not issue per-incident queries."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.crime_type = CrimeTypes.objects.create(crime_type_name="Phishing")
+        self.location = Locations.objects.create(address="1 Main St", city="Pune", state="MH", country="IN")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_incidents(self, count):
+        for i in range(count):
+            incident = Incidents.objects.create(
+                user=self.victim,
+                title=f"Incident {i}",
+                description="desc",
+                location=self.location,
+                crime_type=self.crime_type,
+            )
+            IncidentAssignments.objects.create(incident=incident, assigned_to=self.investigator, priority="high")
+            Evidence.objects.create(incident=incident, submitted_by=self.victim, title=f"Screenshot {i}")
+            Evidence.objects.create(incident=incident, submitted_by=self.victim, title=f"Log {i}")
+
+    def count_feed_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/incidents")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_is_constant(self):
+        self.create_incidents(1)
+        single, data = self.count_feed_queries()
+        self.assertEqual(len(data), 1)
+
+        self.create_incidents(9)
+        many, data = self.count_feed_queries()
+        self.assertEqual(len(data), 10)
+        self.assertEqual(single, many)
+
+    def test_feed_payload(self):
+        self.create_incidents(1)
+        _, data = self.count_feed_queries()
+        entry = data[0]
+        self.assertEqual(entry["type"], "Phishing")
+        self.assertEqual(entry["priority"], "high")
+        self.assertEqual(entry["investigator"], "Ivy Vestigator")
+        self.assertEqual(entry["evidenceCount"], 2)
+        self.assertEqual(entry["location"], "1 Main St")
+        self.assertEqual(
+            [event["type"] for event in entry["timeline"]],
+            ["report", "assign", "evidence", "evidence"],
+        )
+
+
+class IncidentFeedCursorTests(TestCase):
+    """Keyset pagination and SQL-side filters of GET /api/incidents."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        phishing = CrimeTypes.objects.create(crime_type_name="Phishing")
+        pune = Locations.objects.create(address="1 Main St", city="Pune", state="MH", country="IN")
+        for i in range(5):
+            Incidents.objects.create(
+                user=self.admin, title=f"Incident {i}", description="desc",
+                crime_type=phishing if i % 2 == 0 else None,
+                location=pune if i < 3 else None,
+                status="resolved" if i == 4 else "in_progress",
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_pages_cover_every_incident_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.client.get("/api/incidents", params).json()
+            self.assertLessEqual(len(body["results"]), 2)
+            seen.extend(entry["title"] for entry in body["results"])
+            cursor = body["next_cursor"]
+            if not body["has_more"]:
+                break
+        self.assertEqual(seen, [f"Incident {i}" for i in range(4, -1, -1)])
+
+    def test_ties_on_reported_at_are_paged_by_id(self):
+        Incidents.objects.update(reported_at=timezone.now())
+        first = self.client.get("/api/incidents", {"limit": 3}).json()
+        rest = self.client.get("/api/incidents", {"limit": 3, "cursor": first["next_cursor"]}).json()
+        titles = [entry["title"] for entry in first["results"] + rest["results"]]
+        self.assertEqual(titles, [f"Incident {i}" for i in range(4, -1, -1)])
+
+    def test_filters(self):
+        body = self.client.get("/api/incidents", {"limit": 10, "crime_type": "phishing", "city": "pune"}).json()
+        self.assertEqual([entry["title"] for entry in body["results"]], ["Incident 2", "Incident 0"])
+
+        legacy = self.client.get("/api/incidents", {"status": "resolved"}).json()
+        self.assertEqual([entry["title"] for entry in legacy], ["Incident 4"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/incidents", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class IncidentTimelineTests(TestCase):
+    """The materialized timeline follows incident, assignment and evidence writes."""
+
+    def setUp(self):
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        self.incident = Incidents.objects.create(user=self.victim, title="Fake bank SMS", description="desc")
+
+    def event_types(self):
+        return list(self.incident.timeline_events.values_list("event_type", flat=True))
+
+    def test_signals_maintain_timeline(self):
+        self.assertEqual(self.event_types(), ["report"])
+
+        assignment = IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        Evidence.objects.create(incident=self.incident, submitted_by=self.victim, title="Screenshot")
+        self.assertEqual(self.event_types(), ["report", "assign", "evidence"])
+
+        self.incident.status = "resolved"
+        self.incident.save()
+        self.assertEqual(self.event_types(), ["report", "assign", "evidence", "resolved"])
+
+        assignment.delete()
+        self.incident.status = "in_progress"
+        self.incident.save()
+        self.assertEqual(self.event_types(), ["report", "evidence"])
+
+    def test_incident_delete_cascades(self):
+        IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        self.incident.status = "resolved"
+        self.incident.save()
+        self.incident.delete()
+        self.assertFalse(IncidentTimelineEvent.objects.exists())
+
+    def test_backfill_rebuilds_rows(self):
+        IncidentAssignments.objects.create(incident=self.incident, assigned_to=self.investigator)
+        IncidentTimelineEvent.objects.all().delete()
+        call_command("backfill_timeline", stdout=StringIO())
+        self.assertEqual(self.event_types(), ["report", "assign"])
+
+
+class QueryPlanCheckTests(TestCase):
+    def test_refuses_non_postgres(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("check_query_plans runs on PostgreSQL")
+        with self.assertRaises(CommandError):
+            call_command("check_query_plans", stdout=StringIO())
+
+    def test_seeded_data_covers_every_hot_query(self):
+        user_id, incident_id = seed_plan_data(500)
+        for label, queryset, index_names in hot_querysets(user_id=user_id, incident_id=incident_id):
+            self.assertTrue(list(queryset), label)
+            self.assertTrue(index_names, label)
+
+    @tag("postgres")
+    @skipUnless(connection.vendor == "postgresql", "EXPLAIN output is PostgreSQL specific")
+    def test_hot_queries_use_their_indexes(self):
+        out = StringIO()
+        call_command("check_query_plans", "--seed-rows", "20000", stdout=out)
+        self.assertIn("Every hot query path is served by its index", out.getvalue())
+        self.assertFalse(Incidents.objects.filter(title__startswith="Plan check").exists())
@@ -0,0 +1,121 @@
+from django.utils import timezone
+
+from .models import IncidentAssignments, IncidentTimelineEvent
+
+POSITIONS = {"report": 0, "assign": 1, "evidence": 2, "resolved": 3}
+
+
+def current_assignment(incident):
+    """The incident's assignment (one per incident), or None."""
+    return IncidentAssignments.objects.filter(incident=incident).select_related('assigned_to').first()
+
+
+def investigator_name(user):
+    return f"{user.first_name} {user.last_name}".strip() or user.email
+
+
+def evidence_label(evidence):
+    return evidence.title or evidence.file.name if evidence.file else 'Document'
+
+
+def _set_milestone(incident, event_type, occurred_at, event):
+    IncidentTimelineEvent.objects.update_or_create(
+        incident=incident,
+        event_type=event_type,
+        evidence=None,
+        defaults={"position": POSITIONS[event_type], "occurred_at": occurred_at, "event": event},
+    )
+
+
+def _clear_milestone(incident, event_type):
+    IncidentTimelineEvent.objects.filter(incident=incident, event_type=event_type, evidence=None).delete()
+
+
+def sync_report_event(incident):
+    _set_milestone(incident, "report", incident.reported_at, f"Incident reported: {incident.title or 'Untitled'}")
+
+
+def sync_assign_event(incident, assignment):
+    if assignment and assignment.assigned_to:
+        _set_milestone(
+            incident,
+            "assign",
+            assignment.assigned_at or incident.reported_at,
+            f"Case assigned to {investigator_name(assignment.assigned_to)}",
+        )
+    else:
+        _clear_milestone(incident, "assign")
+
+
+def sync_resolved_event(incident, assignment):
+    if incident.status != "resolved":
+        _clear_milestone(incident, "resolved")
+        return
+
+    if assignment and assignment.resolved_at:
+        resolved_at = assignment.resolved_at
+    else:
+        # Keep the moment the resolution was first recorded rather than moving it on every save
+        existing = IncidentTimelineEvent.objects.filter(
+            incident=incident, event_type="resolved", evidence=None
+        ).first()
+        resolved_at = existing.occurred_at if existing else timezone.now()
+    _set_milestone(incident, "resolved", resolved_at, "Case resolved")
+
+
+def sync_evidence_event(evidence):
+    IncidentTimelineEvent.objects.update_or_create(
+        evidence=evidence,
+        defaults={
+            "incident_id": evidence.incident_id,
+            "event_type": "evidence",
+            "position": POSITIONS["evidence"],
+            "occurred_at": evidence.submitted_at,
+            "event": f"Evidence uploaded: {evidence_label(evidence)}",
+        },
+    )
+
+
+def build_timeline_events(incident, assignment, evidences, now):
+    """Unsaved timeline rows for an incident, used by the backfill command."""
+    events = [IncidentTimelineEvent(
+        incident=incident,
+        event_type="report",
+        position=POSITIONS["report"],
+        occurred_at=incident.reported_at,
+        event=f"Incident reported: {incident.title or 'Untitled'}",
+    )]
+    if assignment and assignment.assigned_to:
+        events.append(IncidentTimelineEvent(
+            incident=incident,
+            event_type="assign",
+            position=POSITIONS["assign"],
+            occurred_at=assignment.assigned_at or incident.reported_at,
+            event=f"Case assigned to {investigator_name(assignment.assigned_to)}",
+        ))
+    for evidence in evidences:
+        events.append(IncidentTimelineEvent(
+            incident=incident,
+            evidence=evidence,
+            event_type="evidence",
+            position=POSITIONS["evidence"],
+            occurred_at=evidence.submitted_at,
+            event=f"Evidence uploaded: {evidence_label(evidence)}",
+        ))
+    if incident.status == "resolved":
+        events.append(IncidentTimelineEvent(
+            incident=incident,
+            event_type="resolved",
+            position=POSITIONS["resolved"],
+            occurred_at=assignment.resolved_at if assignment and assignment.resolved_at else now,
+            event="Case resolved",
+        ))
+    return events
+
+
+def serialize_timeline(events):
+    return [{
+        "date": ev.occurred_at.strftime('%Y-%m-%d'),
+        "event": ev.event,
+        "type": ev.event_type,
+    } for ev in events]
@@ -93,11 +93,128 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import json
-from .models import Incidents as Incident,IncidentAssignments
-from .models import Locations
+from .models import Incidents as Incident,IncidentTimelineEvent
+from .models import Locations, stamp_resolution
+from .pagination import apply_feed_filters, keyset_page, parse_page_size
+from .timeline import serialize_timeline
+from evidence.files import create_evidence
 from evidence.models import Evidence
 from awareness.models import CrimeTypes
+from CIMAS.streaming import STREAM_CHUNK_SIZE, stream_format, streaming_json_response
+
+
+def incident_feed_queryset(user):
+    """
+    Incidents visible to ``user`` with every relation the feed touches loaded
+    up front, so the listing costs the same number of queries for 1 or 10k rows.
+    """
+    if getattr(user, "role", None) == "admin":
+        incidents = Incident.objects.all()
+    else:
+        incidents = Incident.objects.filter(user=user)
+
+    return (
+        incidents
+        .select_related('user', 'crime_type', 'location', 'assignment__assigned_to')
+        # A correlated subquery rather than JOIN + GROUP BY, so the page LIMIT applies before counting
+        .annotate(evidence_count=Coalesce(
+            Subquery(
+                Evidence.objects.filter(incident=OuterRef('pk'))
+                .order_by().values('incident').annotate(count=Count('pk')).values('count')
+            ),
+            0,
+        ))
+        .prefetch_related(
+            Prefetch(
+                'timeline_events',
+                queryset=IncidentTimelineEvent.objects.order_by('position', 'occurred_at', 'id'),
+                to_attr='prefetched_timeline',
+            ),
+        )
+    )
+
+
+def serialize_incident(inc, now):
+    """Build the feed entry (with timeline and progress) for a prefetched incident."""
+    # Assignment, timeline and evidence count come preloaded by incident_feed_queryset
+    assignment = getattr(inc, 'assignment', None)
+    evidence_count = inc.evidence_count
+
+    # The timeline is materialized by incidents.signals; incidents that predate
+    # it (before backfill_timeline has run) fall back to their report event.
+    timeline = serialize_timeline(inc.prefetched_timeline)
+    if not timeline:
+        timeline = [{
+            "date": inc.reported_at.strftime('%Y-%m-%d'),
+            "event": f"Incident reported: {inc.title or 'Untitled'}",
+            "type": "report"
+        }]
+
+    # Calculate progress based on timeline and status
+    if inc.status == "resolved":
+        progress = 100
+    elif assignment and assignment.assigned_to:
+        progress = 50 + (evidence_count * 10 if evidence_count > 0 else 0)
+        progress = min(progress, 95)  # Cap at 95% until resolved
+    elif evidence_count > 0:
+        progress = 30 + (evidence_count * 5)
+        progress = min(progress, 45)
+    else:
+        progress = 10
+
+    # Format status for display
+    status_map = {
+        "in_progress": "In Progress",
+        "assigned": "Assigned",
+        "resolved": "Resolved"
+    }
+    display_status = status_map.get(inc.status, inc.status)
+
+    # Calculate last update time
+    time_diff = now - inc.reported_at
+    if time_diff.days == 0:
+        if time_diff.seconds < 3600:
+            last_update = f"{time_diff.seconds // 60} minutes ago" if time_diff.seconds >= 60 else "Just now"
+        elif time_diff.seconds < 7200:
+            last_update = "1 hour ago"
+        else:
+            last_update = f"{time_diff.seconds // 3600} hours ago"
+    elif time_diff.days == 1:
+        last_update = "1 day ago"
+    elif time_diff.days < 7:
+        last_update = f"{time_diff.days} days ago"
+    elif time_diff.days < 14:
+        last_update = "1 week ago"
+    else:
+        last_update = f"{time_diff.days // 7} weeks ago"
+
+    incident_data = {
+        "id": f"INC-{inc.reported_at.year}-{str(inc.id).zfill(3)}",
+        "caseId": f"CASE-{inc.reported_at.year}-{str(inc.id).zfill(3)}",
+        "title": inc.title or "Untitled Incident",
+        "type": inc.crime_type.crime_type_name if inc.crime_type else "Unknown",
+        "status": display_status,
+        "reportedBy": f"{inc.user.first_name} {inc.user.last_name}".strip() or inc.user.email,
+        "priority": assignment.priority if assignment else "medium",
+        "reportedDate": inc.reported_at.strftime('%Y-%m-%d'),
+        "investigator": f"{assignment.assigned_to.first_name} {assignment.assigned_to.last_name}".strip() if assignment and assignment.assigned_to else None,
+        "description": inc.description or "No description provided",
+        "location": inc.location.address if inc.location else "Not specified",
+        "evidenceCount": evidence_count,
+        "lastUpdate": last_update,
+        "progress": progress,
+        "timeline": timeline
+    }
+
+    # Add resolution if resolved
+    if inc.status == "resolved":
+        incident_data["resolution"] = "Case resolved successfully"
+
+    return incident_data
 
 
 # -------------------------------
@@ -178,7 +295,7 @@ def incidents_list(request):
         for key in request.FILES:
             if key.startswith('evidence_'):
                 file = request.FILES[key]
-                evidence = Evidence.objects.create(
+                evidence = create_evidence(
                     incident=incident,
                     submitted_by=request.user,
                     file=file,
@@ -200,123 +317,31 @@ def incidents_list(request):
         )
 
     elif request.method == 'GET':
-        from django.utils import timezone
-        
-        if getattr(request.user, "role", None) == "admin":
-            incidents = Incident.objects.all()
-        else:
-            incidents = Incident.objects.filter(user=request.user)
-
-        data = []
-        for idx, inc in enumerate(incidents):
-            # Get assignment details
-            assignment = IncidentAssignments.objects.filter(incident=inc).first()
-            
-            # Get evidence submissions
-            evidences = Evidence.objects.filter(incident=inc).order_by('submitted_at')
-            evidence_count = evidences.count()
-            
-            # Build timeline dynamically
-            timeline = []
-            
-            # 1. Case reported
-            timeline.append({
-                "date": inc.reported_at.strftime('%Y-%m-%d'),
-                "event": f"Incident reported: {inc.title or 'Untitled'}",
-                "type": "report"
-            })
-            
-            # 2. Case assigned (if exists)
-            if assignment and assignment.assigned_to:
-                assigned_date = assignment.assigned_at if assignment.assigned_at else inc.reported_at
-                investigator_name = f"{assignment.assigned_to.first_name} {assignment.assigned_to.last_name}".strip()
-                if not investigator_name:
-                    investigator_name = assignment.assigned_to.email
-                timeline.append({
-                    "date": assigned_date.strftime('%Y-%m-%d'),
-                    "event": f"Case assigned to {investigator_name}",
-                    "type": "assign"
-                })
-            
-            # 3. Evidence uploaded (for each evidence)
-            for evidence in evidences:
-                timeline.append({
-                    "date": evidence.submitted_at.strftime('%Y-%m-%d'),
-                    "event": f"Evidence uploaded: {evidence.title or evidence.file.name if evidence.file else 'Document'}",
-                    "type": "evidence"
+        now = timezone.now()
+        try:
+            incidents = apply_feed_filters(incident_feed_queryset(request.user), request.GET)
+
+            # Cursor mode: ?cursor=<token> and/or ?limit=<n> returns one keyset page.
+            # Without either, the full list is returned as before.
+            if "cursor" in request.GET or "limit" in request.GET:
+                page_size = parse_page_size(request.GET.get("limit"))
+                page, next_cursor = keyset_page(incidents, request.GET.get("cursor"), page_size)
+                return JsonResponse({
+                    "results": [serialize_incident(inc, now) for inc in page],
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None,
                 })
-            
-            # 4. Case resolved (if resolved)
-            if inc.status == "resolved":
-                resolved_date = assignment.resolved_at if assignment and assignment.resolved_at else timezone.now()
-                timeline.append({
-                    "date": resolved_date.strftime('%Y-%m-%d'),
-                    "event": "Case resolved",
-                    "type": "resolved"
-                })
-            
-            # Calculate progress based on timeline and status
-            if inc.status == "resolved":
-                progress = 100
-            elif assignment and assignment.assigned_to:
-                progress = 50 + (evidence_count * 10 if evidence_count > 0 else 0)
-                progress = min(progress, 95)  # Cap at 95% until resolved
-            elif evidence_count > 0:
-                progress = 30 + (evidence_count * 5)
-                progress = min(progress, 45)
-            else:
-                progress = 10
-            
-            # Format status for display
-            status_map = {
-                "in_progress": "In Progress",
-                "assigned": "Assigned",
-                "resolved": "Resolved"
-            }
-            display_status = status_map.get(inc.status, inc.status)
-            
-            # Calculate last update time
-            time_diff = timezone.now() - inc.reported_at
-            if time_diff.days == 0:
-                if time_diff.seconds < 3600:
-                    last_update = f"{time_diff.seconds // 60} minutes ago" if time_diff.seconds >= 60 else "Just now"
-                elif time_diff.seconds < 7200:
-                    last_update = "1 hour ago"
-                else:
-                    last_update = f"{time_diff.seconds // 3600} hours ago"
-            elif time_diff.days == 1:
-                last_update = "1 day ago"
-            elif time_diff.days < 7:
-                last_update = f"{time_diff.days} days ago"
-            elif time_diff.days < 14:
-                last_update = "1 week ago"
-            else:
-                last_update = f"{time_diff.days // 7} weeks ago"
-            
-            incident_data = {
-                "id": f"INC-{inc.reported_at.year}-{str(inc.id).zfill(3)}",
-                "caseId": f"CASE-{inc.reported_at.year}-{str(inc.id).zfill(3)}",
-                "title": inc.title or "Untitled Incident",
-                "type": inc.crime_type.crime_type_name if inc.crime_type else "Unknown",
-                "status": display_status,
-                "reportedBy": f"{inc.user.first_name} {inc.user.last_name}".strip() or inc.user.email,
-                "priority": assignment.priority if assignment else "medium",
-                "reportedDate": inc.reported_at.strftime('%Y-%m-%d'),
-                "investigator": f"{assignment.assigned_to.first_name} {assignment.assigned_to.last_name}".strip() if assignment and assignment.assigned_to else None,
-                "description": inc.description or "No description provided",
-                "location": inc.location.address if inc.location else "Not specified",
-                "evidenceCount": evidence_count,
-                "lastUpdate": last_update,
-                "progress": progress,
-                "timeline": timeline
-            }
-            
-            # Add resolution if resolved
-            if inc.status == "resolved":
-                incident_data["resolution"] = "Case resolved successfully"
-            
-            data.append(incident_data)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
+        fmt = stream_format(request)
+        if fmt:
+            return streaming_json_response(
+                (serialize_incident(inc, now) for inc in incidents.iterator(chunk_size=STREAM_CHUNK_SIZE)),
+                fmt,
+            )
+
+        data = [serialize_incident(inc, now) for inc in incidents]
         return JsonResponse(data, safe=False)
 
 
@@ -349,8 +374,11 @@ def incident_detail(request, id):
             return JsonResponse({"error": "Not allowed"}, status=403)
 
         data = json.loads(request.body)
+        previous_status = incident.status
         incident.description = data.get("description", incident.description)
         incident.status = data.get("status", incident.status)
+        if incident.status == "resolved" and previous_status != "resolved":
+            stamp_resolution(incident)
         incident.save()
         return JsonResponse({"message": "Incident updated"})
 
@@ -372,5 +400,9 @@ def get_user_incidents(request, id):
         return JsonResponse({"error": "Not allowed"}, status=403)
 
     data = Incident.objects.filter(user__id=id).values()
+
+    fmt = stream_format(request)
+    if fmt:
+        return streaming_json_response(data.iterator(chunk_size=STREAM_CHUNK_SIZE), fmt)
     return JsonResponse(list(data), safe=False)
 
@@ -0,0 +1,112 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from incidents.models import Incidents, IncidentAssignments
+from users.models import CustomUser
+from users.views import get_users
+
+BENCH_DOMAIN = "bench.cimas.local"
+
+
+def legacy_get_users_payload():
+    """The pre-annotation get_users body: three count queries per user."""
+    return [{
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'role': user.role,
+        'date_joined': user.date_joined.isoformat() if user.date_joined else None,
+        'last_login': user.last_login.isoformat() if user.last_login else None,
+        'is_active': user.is_active,
+        'cases_assigned': IncidentAssignments.objects.filter(assigned_to=user).count(),
+        'cases_resolved': IncidentAssignments.objects.filter(assigned_to=user, incident__status='resolved').count(),
+        'cases_pending': IncidentAssignments.objects.filter(assigned_to=user, incident__status='pending').count(),
+    } for user in CustomUser.objects.all()]
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic users and compare GET /api/users latency with the legacy per-user count queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Number of synthetic users to seed')
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs per variant')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows after the run')
+
+    def handle(self, *args, **options):
+        self.seed(options['users'])
+        try:
+            admin = CustomUser.objects.get(email=f"admin@{BENCH_DOMAIN}")
+            factory = APIRequestFactory()
+
+            def annotated():
+                request = factory.get('/api/users')
+                force_authenticate(request, user=admin)
+                get_users(request)
+
+            self.report("before (per-user counts)", legacy_get_users_payload, options['runs'])
+            self.report("after (annotated counts)", annotated, options['runs'])
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed(self, count):
+        self.cleanup()
+        self.stdout.write(f"Seeding {count} users...")
+        password = make_password(None)
+        roles = ['victim', 'victim', 'victim', 'investigator']
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f"user{i}@{BENCH_DOMAIN}",
+                password=password,
+                first_name="Bench",
+                last_name=str(i),
+                role=roles[i % len(roles)],
+            ) for i in range(count)
+        ], batch_size=2000)
+        CustomUser.objects.create(
+            email=f"admin@{BENCH_DOMAIN}", password=password, first_name="Bench", last_name="Admin", role='admin'
+        )
+
+        users = CustomUser.objects.filter(email__endswith=f"@{BENCH_DOMAIN}")
+        victims = list(users.filter(role='victim').values_list('id', flat=True))
+        investigators = list(users.filter(role='investigator').values_list('id', flat=True))
+        Incidents.objects.bulk_create([
+            Incidents(user_id=victim_id, title="Benchmark incident", status='resolved' if i % 3 == 0 else 'in_progress')
+            for i, victim_id in enumerate(victims)
+        ], batch_size=2000)
+        incident_ids = Incidents.objects.filter(user_id__in=victims).values_list('id', flat=True)
+        if investigators:
+            IncidentAssignments.objects.bulk_create([
+                IncidentAssignments(incident_id=incident_id, assigned_to_id=investigators[i % len(investigators)])
+                for i, incident_id in enumerate(incident_ids)
+            ], batch_size=2000)
+
+    def report(self, label, fn, runs):
+        timings = []
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        for _ in range(runs):
+            queries[0] = 0
+            with connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"{label:<28} median {statistics.median(timings):9.1f} ms   "
+            f"min {min(timings):9.1f} ms   queries {queries[0]}"
+        )
+
+    def cleanup(self):
+        users = CustomUser.objects.filter(email__endswith=f"@{BENCH_DOMAIN}")
+        Incidents.objects.filter(user__in=users).delete()
+        users.delete()
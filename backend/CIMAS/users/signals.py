@@ -0,0 +1,16 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from incidents.models import Incidents, IncidentAssignments
+from .models import Investigators
+from .views import WORKLOAD_CACHE_KEY
+
+
+@receiver(post_save, sender=IncidentAssignments)
+@receiver(post_delete, sender=IncidentAssignments)
+@receiver(post_save, sender=Incidents)
+@receiver(post_save, sender=Investigators)
+@receiver(post_delete, sender=Investigators)
+def invalidate_investigator_workload(sender, **kwargs):
+    cache.delete(WORKLOAD_CACHE_KEY)
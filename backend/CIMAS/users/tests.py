@@ -1,3 +1,100 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from incidents.models import Incidents, IncidentAssignments
+from .models import CustomUser, Investigators
+
+
+class GetUsersTests(TestCase):
+    """GET /api/users computes case counters in one query and supports paging/filters."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.investigator = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        CustomUser.objects.create_user(
+            email="gone@example.com", password="pw", first_name="Old", last_name="Inv",
+            role="investigator", is_active=False,
+        )
+        for status in ["resolved", "in_progress", "assigned"]:
+            incident = Incidents.objects.create(user=self.victim, description="desc", status=status)
+            IncidentAssignments.objects.create(incident=incident, assigned_to=self.investigator)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_counts_in_single_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/users")
+        self.assertEqual(len(ctx.captured_queries), 1)
+        users = {user["email"]: user for user in response.json()["users"]}
+        investigator = users["inv@example.com"]
+        self.assertEqual(
+            (investigator["cases_assigned"], investigator["cases_resolved"], investigator["cases_pending"]),
+            (3, 1, 2),
+        )
+        self.assertEqual(users["victim@example.com"]["cases_assigned"], 0)
+
+    def test_filters_and_pagination(self):
+        body = self.client.get("/api/users", {"role": "investigator", "is_active": "true"}).json()
+        self.assertEqual([user["email"] for user in body["users"]], ["inv@example.com"])
+
+        body = self.client.get("/api/users", {"page": 2, "page_size": 3}).json()
+        self.assertEqual((body["count"], body["num_pages"], body["page"]), (4, 2, 2))
+        self.assertEqual([user["email"] for user in body["users"]], ["gone@example.com"])
+
+
+class InvestigatorWorkloadTests(TestCase):
+    """GET /api/users/investigators/workload is one grouped query, cached until assignments change."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", first_name="Ada", last_name="Admin", role="admin"
+        )
+        self.victim = CustomUser.objects.create_user(
+            email="victim@example.com", password="pw", first_name="Vic", last_name="Tim", role="victim"
+        )
+        self.inv_user = CustomUser.objects.create_user(
+            email="inv@example.com", password="pw", first_name="Ivy", last_name="Vestigator", role="investigator"
+        )
+        Investigators.objects.create(user=self.inv_user, department="Cyber")
+        past = timezone.now() - timedelta(days=1)
+        for status, priority in [("resolved", "high"), ("in_progress", "high"), ("assigned", "low")]:
+            incident = Incidents.objects.create(user=self.victim, description="desc", status=status)
+            IncidentAssignments.objects.create(
+                incident=incident, assigned_to=self.inv_user, priority=priority, assigned_deadline=past
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_workload(self):
+        return self.client.get("/api/users/investigators/workload").json()["investigators"][0]
+
+    def test_counts_and_cache(self):
+        with CaptureQueriesContext(connection) as ctx:
+            row = self.get_workload()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            (row["open_cases"], row["high_priority_cases"], row["overdue_cases"], row["cases_resolved"]),
+            (2, 1, 2, 1),
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_workload()
+        self.assertEqual(len(ctx.captured_queries), 0)
 
-# Create your tests here.
+        incident = Incidents.objects.create(user=self.victim, description="desc")
+        IncidentAssignments.objects.create(incident=incident, assigned_to=self.inv_user)
+        self.assertEqual(self.get_workload()["open_cases"], 3)
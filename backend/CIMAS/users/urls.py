@@ -18,4 +18,5 @@ urlpatterns = [
 	path('api/users/<int:id>', views.manage_user, name='update_user'),
 	path('api/users/<int:id>', views.manage_user, name='delete_user'),
     path('api/users/investigators', views.get_investigators, name='get_investigators'),
+    path('api/users/investigators/workload', views.get_investigator_workload, name='get_investigator_workload'),
 ]
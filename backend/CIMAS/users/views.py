@@ -1,34 +1,96 @@
 from datetime import datetime
 from django.contrib.auth import authenticate, get_user_model
 from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
 from django.http import JsonResponse
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 import json
 from .models import Investigators
 from incidents.models import IncidentAssignments
+from CIMAS.streaming import STREAM_CHUNK_SIZE, stream_format, streaming_json_response
 
 User = get_user_model()
 
+USERS_PAGE_SIZE = 50
+MAX_USERS_PAGE_SIZE = 500
+
+WORKLOAD_CACHE_KEY = 'users:investigator_workload'
+WORKLOAD_CACHE_TTL = 30  # seconds
+
+def investigator_workload():
+    """
+    Per-investigator case counters from a single grouped query over
+    Investigators -> CustomUser -> IncidentAssignments -> Incidents.
+    Cached for WORKLOAD_CACHE_TTL seconds; users.signals drops the entry
+    whenever an assignment or incident changes.
+    """
+    cached = cache.get(WORKLOAD_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    resolved = Q(user__incidentassignments__incident__status='resolved')
+    open_case = ~resolved
+    investigators = Investigators.objects.select_related('user').annotate(
+        cases_assigned=Count('user__incidentassignments'),
+        cases_resolved=Count('user__incidentassignments', filter=resolved),
+        open_cases=Count('user__incidentassignments', filter=open_case),
+        high_priority_cases=Count(
+            'user__incidentassignments',
+            filter=open_case & Q(user__incidentassignments__priority='high'),
+        ),
+        overdue_cases=Count(
+            'user__incidentassignments',
+            filter=open_case & Q(user__incidentassignments__assigned_deadline__lt=timezone.now()),
+        ),
+    ).order_by('investigator_id')
+
+    workload = [{
+        'id': inv.investigator_id,
+        'user_id': inv.user_id,
+        'email': inv.user.email,
+        'first_name': inv.user.first_name,
+        'last_name': inv.user.last_name,
+        'department': inv.department or '',
+        'cases_assigned': inv.cases_assigned,
+        'cases_resolved': inv.cases_resolved,
+        'open_cases': inv.open_cases,
+        'high_priority_cases': inv.high_priority_cases,
+        'overdue_cases': inv.overdue_cases,
+    } for inv in investigators]
+    cache.set(WORKLOAD_CACHE_KEY, workload, WORKLOAD_CACHE_TTL)
+    return workload
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_investigators(request):
     if request.user.role != 'admin':
         return JsonResponse({'error': 'You do not have permission to view this.'}, status=403)
-    investigators = Investigators.objects.select_related('user').all()
     investigators_data = [{
-        'id': inv.investigator_id,
-        'email': inv.user.email,
-        'first_name': inv.user.first_name,
-        'last_name': inv.user.last_name,
-        "department": inv.department if hasattr(inv, 'department') else '',
-        'cases_assigned': IncidentAssignments.objects.filter(assigned_to=inv.user).count(),
-        'cases_resolved': IncidentAssignments.objects.filter(assigned_to=inv.user, incident__status='resolved').count(),
-    } for inv in investigators]
+        'id': inv['id'],
+        'email': inv['email'],
+        'first_name': inv['first_name'],
+        'last_name': inv['last_name'],
+        'department': inv['department'],
+        'cases_assigned': inv['cases_assigned'],
+        'cases_resolved': inv['cases_resolved'],
+    } for inv in investigator_workload()]
 
     return JsonResponse({'investigators': investigators_data})
 
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_investigator_workload(request):
+    if request.user.role != 'admin':
+        return JsonResponse({'error': 'You do not have permission to view this.'}, status=403)
+    return JsonResponse({'investigators': investigator_workload()})
+
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
     refresh['role'] = user.role
@@ -162,28 +224,69 @@ def get_me__update_me(request):
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
+def annotate_case_counts(users):
+    """
+    Attach cases_assigned / cases_resolved / cases_pending to a user queryset
+    with conditional counts over IncidentAssignments, computed in the same query.
+    """
+    resolved = Q(incidentassignments__incident__status='resolved')
+    return users.annotate(
+        cases_assigned=Count('incidentassignments'),
+        cases_resolved=Count('incidentassignments', filter=resolved),
+        cases_pending=Count('incidentassignments', filter=~resolved),
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_users(request):
     role = request.user.role
     if role != 'admin':
         return JsonResponse({'error': 'You do not have permission to view this.'}, status=403)
+
     users = User.objects.all()
-    users_data = [{
-        'id': user.id,
-        'email': user.email,
-        'first_name': user.first_name,
-        'last_name': user.last_name,
-        'role': user.role,
-        'date_joined': user.date_joined.isoformat() if user.date_joined else None,
-        'last_login': user.last_login.isoformat() if user.last_login else None,
-        'is_active': user.is_active,
-        'cases_assigned': IncidentAssignments.objects.filter(assigned_to=user).count() if hasattr(user, 'id') else 0,
-        'cases_resolved': IncidentAssignments.objects.filter(assigned_to=user, incident__status='resolved').count() if hasattr(user, 'id') else 0,
-        'cases_pending': IncidentAssignments.objects.filter(assigned_to=user, incident__status='pending').count() if hasattr(user, 'id') else 0,
-    } for user in users]
-
-    return JsonResponse({'users': users_data})
+    if request.GET.get('role'):
+        users = users.filter(role=request.GET['role'])
+    if request.GET.get('is_active') in ('true', 'false'):
+        users = users.filter(is_active=request.GET['is_active'] == 'true')
+    users = annotate_case_counts(users).order_by('id')
+
+    def serialize(user):
+        return {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'role': user.role,
+            'date_joined': user.date_joined.isoformat() if user.date_joined else None,
+            'last_login': user.last_login.isoformat() if user.last_login else None,
+            'is_active': user.is_active,
+            'cases_assigned': user.cases_assigned,
+            'cases_resolved': user.cases_resolved,
+            'cases_pending': user.cases_pending,
+        }
+
+    fmt = stream_format(request)
+    if fmt:
+        return streaming_json_response((serialize(user) for user in users.iterator(chunk_size=STREAM_CHUNK_SIZE)), fmt)
+
+    # ?page=<n>&page_size=<m> returns one page plus paging metadata
+    if 'page' in request.GET:
+        try:
+            page_size = max(1, min(int(request.GET.get('page_size', USERS_PAGE_SIZE)), MAX_USERS_PAGE_SIZE))
+        except ValueError:
+            return JsonResponse({'error': 'page_size must be an integer'}, status=400)
+        paginator = Paginator(users, page_size)
+        page = paginator.get_page(request.GET.get('page'))
+        return JsonResponse({
+            'users': [serialize(user) for user in page],
+            'count': paginator.count,
+            'page': page.number,
+            'page_size': page_size,
+            'num_pages': paginator.num_pages,
+        })
+
+    return JsonResponse({'users': [serialize(user) for user in users]})
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
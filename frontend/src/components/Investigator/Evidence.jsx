@@ -60,29 +60,69 @@ const Evidence = () => {
     return Math.round((bytes / Math.pow(k, i)) * 100) / 100 + ' ' + sizes[i];
   };
 
-  // Helper function to get file type from URL
-  const getFileTypeFromUrl = (url) => {
-    if (!url) return 'document';
-    const ext = url.split('.').pop().toLowerCase();
-    if (['jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg'].includes(ext)) return 'image';
-    if (['mp4', 'avi', 'mov', 'wmv', 'flv', 'mkv'].includes(ext)) return 'video';
+  // Helper function to get file type from the server-detected MIME type
+  const getFileType = (contentType) => {
+    if (!contentType) return 'document';
+    if (contentType.startsWith('image/')) return 'image';
+    if (contentType.startsWith('video/')) return 'video';
     return 'document';
   };
 
+  // Evidence files are only served by the authenticated download endpoint,
+  // so fetch them with the token and hand the browser a blob URL.
+  const fetchEvidenceFile = async (fileUrl, inline) => {
+    const response = await axiosInstance.get(fileUrl.replace(/^\/api/, ''), {
+      params: inline ? { inline: 1 } : {},
+      responseType: 'blob'
+    });
+    return response.data;
+  };
+
+  const viewEvidence = async (evidence) => {
+    try {
+      const blob = await fetchEvidenceFile(evidence.file_url, true);
+      // Only the types the server serves inline are opened as themselves
+      const inlineTypes = ['image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/bmp', 'application/pdf'];
+      const type = inlineTypes.includes(evidence.content_type) ? evidence.content_type : 'application/octet-stream';
+      const url = URL.createObjectURL(new Blob([blob], { type }));
+      window.open(url, '_blank');
+      setTimeout(() => URL.revokeObjectURL(url), 60000);
+    } catch (err) {
+      console.error('Error opening evidence:', err);
+    }
+  };
+
+  const downloadEvidence = async (evidence) => {
+    try {
+      const blob = await fetchEvidenceFile(evidence.file_url, false);
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = evidence.name;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error('Error downloading evidence:', err);
+    }
+  };
+
   // Transform API data to match component structure
   const transformedEvidenceList = evidenceData.evidences.map((evidence, index) => ({
     id: index + 1,
     case_id: index + 1,
     case_title: evidence.incident || 'Untitled Case',
     name: evidence.title || 'Untitled Evidence',
-    type: getFileTypeFromUrl(evidence.file_url),
+    type: getFileType(evidence.content_type),
     size: formatFileSize(evidence.file_size),
     uploaded_by: evidence.uploaded_by || 'Unknown',
     upload_date: evidence.submitted_at,
     description: evidence.description || 'No description provided',
     status: 'verified', // You can adjust this based on your API data
     tags: evidence.tags || [],
-    file_url: evidence.file_url
+    file_url: evidence.file_url,
+    content_type: evidence.content_type
   }));
 
   // Use API data if available, otherwise fallback to mock data
@@ -319,7 +359,7 @@ const Evidence = () => {
                   whileTap={{ scale: 0.98 }}
                   onClick={() => {
                     if (evidence.file_url) {
-                      window.open(`http://127.0.0.1:8000${evidence.file_url}`, '_blank');
+                      viewEvidence(evidence);
                     }
                   }}
                   className="flex-1 flex items-center justify-center gap-2 px-4 py-2.5 bg-blue-600 hover:bg-blue-700 text-white rounded-lg font-medium transition-colors"
@@ -332,12 +372,7 @@ const Evidence = () => {
                   whileTap={{ scale: 0.98 }}
                   onClick={() => {
                     if (evidence.file_url) {
-                      const link = document.createElement('a');
-                      link.href = `http://127.0.0.1:8000${evidence.file_url}`;
-                      link.download = evidence.name;
-                      document.body.appendChild(link);
-                      link.click();
-                      document.body.removeChild(link);
+                      downloadEvidence(evidence);
                     }
                   }}
                   className="flex items-center justify-center gap-2 px-4 py-2.5 bg-gray-800 hover:bg-gray-700 text-white rounded-lg font-medium transition-colors"